@@ -8,11 +8,131 @@ from ttkbootstrap.scrolled import ScrolledText
 from PIL import Image, ImageTk, ImageFilter, ImageEnhance
 import threading
 import time
+import sys
+import statistics
+import queue
+import itertools
+import re
+import shlex
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# The git backend shared with the web version lives next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lazygit_core import Repository, process as git_process
 
 # Global variables
 repo_directory = ""
 theme_mode = "darkly"  # Default theme mode (using valid ttkbootstrap theme)
-loading = False
+
+# Skip the blur and paint panels with a flat, pre-blended color (--solid)
+solid_backgrounds = "--solid" in sys.argv
+
+# Rendered panel backgrounds keyed by (width, height, theme, radius, transparency)
+BACKGROUND_CACHE_SIZE = 32
+_background_cache = OrderedDict()
+
+# Resize events are coalesced into at most one render per frame
+FRAME_INTERVAL_MS = 16
+
+# Output pane: lines kept before the oldest are trimmed, time per frame spent inserting,
+# lines per insert, and how many read lines may wait before the reader thread blocks
+MAX_OUTPUT_LINES = 5000
+OUTPUT_FRAME_BUDGET_MS = 8
+OUTPUT_BATCH_LINES = 500
+OUTPUT_QUEUE_SIZE = 10000
+
+# How often the output queue is checked while no command is producing output
+OUTPUT_IDLE_POLL_MS = 100
+
+# git subcommands that never change the repository; these run alongside anything else
+READ_ONLY_COMMANDS = {'status', 'log', 'diff', 'show', 'blame', 'shortlog', 'describe', 'rev-parse', 'ls-files', 'grep'}
+
+# Subcommands that only report transfer progress on a pipe when asked to
+PROGRESS_COMMANDS = {'push', 'pull', 'fetch', 'clone'}
+
+# git processes running at once across all repositories
+MAX_CONCURRENT_COMMANDS = 4
+
+# How long a finished command stays in the command list
+FINISHED_COMMAND_LINGER_MS = 4000
+
+# Activity animation tick
+ANIMATION_INTERVAL_MS = 500
+
+# "Receiving objects:  45% (450/1000), 1.20 MiB | 600.00 KiB/s"
+PROGRESS_PATTERN = re.compile(r'^(?:remote: )?([A-Za-z ]+):\s+(\d+)% \((\d+)/(\d+)\)')
+
+# Status panel: how often .git is checked for changes, how often status is re-read regardless
+# (edits to work tree files do not touch .git), and the re-check delay while a read is running
+STATUS_POLL_MS = 1000
+STATUS_FULL_REFRESH_MS = 15000
+STATUS_PENDING_POLL_MS = 100
+
+# Rows shown by each status list; only these rows ever exist in the Treeview
+STATUS_LIST_ROWS = 5
+
+def theme_background():
+    """Panel fill color and base alpha for the current theme"""
+    if theme_mode == "darkly":
+        return '#1a1a1a', 180
+    return '#f0f0f0', 220
+
+def get_background_image(width, height, radius, transparency):
+    """Return a cached blurred background, rendering it only on a cache miss"""
+    key = (width, height, theme_mode, radius, transparency)
+    image = _background_cache.get(key)
+    if image is not None:
+        _background_cache.move_to_end(key)
+        render_stats.cache_hits += 1
+        return image
+    
+    render_stats.cache_misses += 1
+    bg_color, base_alpha = theme_background()
+    alpha = int(base_alpha * transparency)
+    bg_image = Image.new('RGBA', (width, height), bg_color + hex(alpha)[2:].zfill(2))
+    blurred = bg_image.filter(ImageFilter.GaussianBlur(radius=radius))
+    image = ImageTk.PhotoImage(blurred)
+    
+    _background_cache[key] = image
+    while len(_background_cache) > BACKGROUND_CACHE_SIZE:
+        _background_cache.popitem(last=False)
+    return image
+
+def blend_colors(foreground, background, alpha):
+    """Mix two #rrggbb colors the way an RGBA image with this alpha is drawn over a canvas"""
+    fg = [int(foreground[i:i + 2], 16) for i in (1, 3, 5)]
+    bg = [int(background[i:i + 2], 16) for i in (1, 3, 5)]
+    mixed = [round(f * alpha + b * (1 - alpha)) for f, b in zip(fg, bg)]
+    return '#' + ''.join(f'{c:02x}' for c in mixed)
+
+class RenderStats:
+    """Timing of glassmorphic background renders, reported by --measure-resize"""
+    def __init__(self):
+        self.durations = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.skipped = 0
+    
+    def record(self, seconds):
+        self.durations.append(seconds)
+    
+    def report(self, resizes):
+        if not self.durations:
+            return "No renders recorded"
+        ms = sorted(d * 1000 for d in self.durations)
+        total = sum(ms)
+        return (
+            f"{resizes} resizes, {len(ms)} renders ({len(ms) / max(resizes, 1):.2f} per resize), "
+            f"{self.skipped} unchanged skipped\n"
+            f"render: mean {statistics.mean(ms):.2f} ms, p50 {ms[len(ms) // 2]:.2f} ms, "
+            f"p95 {ms[min(len(ms) - 1, int(len(ms) * 0.95))]:.2f} ms, max {ms[-1]:.2f} ms\n"
+            f"per resize: {total / max(resizes, 1):.2f} ms | "
+            f"cache: {self.cache_hits} hits, {self.cache_misses} misses | mode: {'solid' if solid_backgrounds else 'blur'}"
+        )
+
+render_stats = RenderStats()
 
 class GlassmorphicFrame(ttk.Frame):
     """Custom frame with glassmorphism effect"""
@@ -25,49 +145,53 @@ class GlassmorphicFrame(ttk.Frame):
         # Create a background canvas for the blur effect
         self.canvas = tk.Canvas(self, highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
+        self._canvas_bg = self.canvas.cget('background')
+        
+        # Pending render callback and the key of what is currently drawn
+        self._render_after_id = None
+        self._rendered_key = None
         
         # Bind events to update the background
         self.bind("<Configure>", self._update_background)
     
-    def _update_background(self, event=None):
-        """Update the background with blur effect"""
-        if hasattr(self, '_bg_id'):
-            self.canvas.delete(self._bg_id)
-        
-        # Get the position of the frame relative to the root window
-        x = self.winfo_rootx() - self.master.winfo_rootx()
-        y = self.winfo_rooty() - self.master.winfo_rooty()
-        
-        # Take a screenshot of what's behind the frame
+    def _update_background(self, event=None, force=False):
+        """Schedule a background render; bursts of resize events share one render per frame"""
+        if force:
+            self._rendered_key = None
+        if self._render_after_id is None:
+            self._render_after_id = self.after(FRAME_INTERVAL_MS, self._render_background)
+    
+    def _render_background(self):
+        """Draw the background for the current size and theme"""
+        self._render_after_id = None
         try:
-            # Create a background image based on theme
             width, height = self.winfo_width(), self.winfo_height()
             if width <= 1 or height <= 1:
                 return
-                
-            if theme_mode == "darkly":
-                bg_color = '#1a1a1a'
-                alpha = int(180 * self.transparency)
-            else:
-                bg_color = '#f0f0f0'
-                alpha = int(220 * self.transparency)
-                
-            # Create a background image
-            bg_image = Image.new('RGBA', (width, height), bg_color + hex(alpha)[2:].zfill(2))
             
-            # Apply blur effect
-            blurred = bg_image.filter(ImageFilter.GaussianBlur(radius=self.blur_radius))
+            key = (width, height, theme_mode, self.blur_radius, self.transparency, solid_backgrounds)
+            if key == self._rendered_key:
+                # Moved, or a child changed, but nothing about the background did
+                render_stats.skipped += 1
+                return
             
-            # Convert to PhotoImage
-            self.bg_image = ImageTk.PhotoImage(blurred)
+            start = time.perf_counter()
+            if hasattr(self, '_bg_id'):
+                self.canvas.delete(self._bg_id)
+                del self._bg_id
             
-            # Draw the image on the canvas
-            self._bg_id = self.canvas.create_image(0, 0, image=self.bg_image, anchor='nw')
+            if solid_backgrounds:
+                # A uniform fill looks the same blurred or not, so just paint the blended color
+                bg_color, base_alpha = theme_background()
+                self.canvas.configure(background=blend_colors(
+                    bg_color, self._canvas_bg, base_alpha * self.transparency / 255))
+            else:
+                self.bg_image = get_background_image(width, height, self.blur_radius, self.transparency)
+                self._bg_id = self.canvas.create_image(0, 0, image=self.bg_image, anchor='nw')
+                self.canvas.tag_lower(self._bg_id)
             
-            # Raise all child widgets above the background
-            for child in self.winfo_children():
-                if child != self.canvas:
-                    child.lift()
+            self._rendered_key = key
+            render_stats.record(time.perf_counter() - start)
         except Exception as e:
             print(f"Error updating background: {e}")
 
@@ -108,6 +232,222 @@ class HoverButton(ttk.Button):
         # Restore state after click
         self.state(['!pressed'])
 
+class GitCommand:
+    """One git invocation: its argv, the repository it runs in, and its progress so far"""
+    _ids = itertools.count(1)
+    
+    def __init__(self, args, repo, read_only):
+        self.id = str(next(GitCommand._ids))
+        self.args = list(args)
+        self.repo = repo
+        self.read_only = read_only
+        self.state = 'queued'
+        self.phase = None
+        self.percent = None
+        self.lines = 0
+        self.returncode = None
+        self.error = None
+        self.started = None
+        self.finished = None
+    
+    @property
+    def display(self):
+        return 'git ' + shlex.join(self.args)
+    
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class CommandExecutor:
+    """Runs git commands off the Tk thread
+    
+    Read-only commands run concurrently. Commands that change a repository run
+    one at a time per repository, in the order they were requested. Output and
+    completion are reported through `output_queue` and applied on the Tk main loop.
+    """
+    def __init__(self, output_queue, max_workers=MAX_CONCURRENT_COMMANDS):
+        self.output_queue = output_queue
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='git')
+        self.lock = threading.Lock()
+        self.writing = set()
+        self.waiting = {}
+        self.active = OrderedDict()
+    
+    def submit(self, args, repo, read_only=None):
+        """Queue `git <args>` in `repo`; read-only is inferred from the subcommand unless given"""
+        args = list(args)
+        if read_only is None:
+            read_only = bool(args) and args[0] in READ_ONLY_COMMANDS
+        if args and args[0] in PROGRESS_COMMANDS and '--progress' not in args:
+            args.insert(1, '--progress')
+        
+        command = GitCommand(args, os.path.realpath(repo), read_only)
+        with self.lock:
+            self.active[command.id] = command
+            start = read_only or command.repo not in self.writing
+            if not read_only:
+                if start:
+                    self.writing.add(command.repo)
+                else:
+                    self.waiting.setdefault(command.repo, deque()).append(command)
+        if start:
+            self.pool.submit(self._run, command)
+        return command
+    
+    def _run(self, command):
+        command.state = 'running'
+        command.started = time.time()
+        self.output_queue.put(('start', command))
+        try:
+            # Same deadlines, process-group cleanup and terminal-prompt suppression as the web version
+            operation = git_process.start_git(
+                command.args,
+                cwd=command.repo,
+                operation_id=f'tk-{command.id}',
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='replace'
+            )
+            process = operation.process
+            try:
+                with process.stdout:
+                    # put() blocks once the queue is full, which pauses git until the UI catches up
+                    for line in process.stdout:
+                        match = PROGRESS_PATTERN.match(line)
+                        if match:
+                            command.phase = match.group(1).strip()
+                            command.percent = int(match.group(2))
+                            continue
+                        command.lines += 1
+                        self.output_queue.put(('line', (command, line)))
+                process.wait()
+            except BaseException:
+                git_process.stop(operation)
+                raise
+            # Raises if the watchdog had to stop git for running past its deadline
+            git_process.finish(operation)
+            command.returncode = process.returncode
+            command.state = 'done' if process.returncode == 0 else 'failed'
+        except Exception as e:
+            command.error = str(e)
+            command.state = 'failed'
+        finally:
+            command.finished = time.time()
+            self.output_queue.put(('done', command))
+            if not command.read_only:
+                self._start_next(command.repo)
+    
+    def _start_next(self, repo):
+        """Hand the repository to the next mutating command waiting for it"""
+        with self.lock:
+            waiting = self.waiting.get(repo)
+            next_command = waiting.popleft() if waiting else None
+            if waiting is not None and not waiting:
+                del self.waiting[repo]
+            if next_command is None:
+                self.writing.discard(repo)
+        if next_command is not None:
+            self.pool.submit(self._run, next_command)
+    
+    def forget(self, command):
+        with self.lock:
+            self.active.pop(command.id, None)
+    
+    def snapshot(self):
+        with self.lock:
+            return list(self.active.values())
+
+
+def read_status(directory):
+    """Run git status on a worker thread; returns (parsed status, seconds)"""
+    start = time.perf_counter()
+    status = Repository(directory).status()
+    return status, time.perf_counter() - start
+
+def status_rows(entries):
+    """(change, path) rows for a VirtualList, with renames shown as old -> new"""
+    return [(entry['change'], f"{entry['original']} -> {entry['path']}" if 'original' in entry else entry['path'])
+            for entry in entries]
+
+
+class VirtualList(ttk.Frame):
+    """A Treeview that only holds the rows on screen, so lists of any length scroll instantly
+    
+    The items live in a plain list; scrolling moves a window over it and rewrites
+    the visible rows in place.
+    """
+    def __init__(self, master=None, columns=(), rows=10, **kwargs):
+        ttk.Frame.__init__(self, master, **kwargs)
+        self.items = []
+        self.offset = 0
+        self.rows = rows
+        
+        self.tree = ttk.Treeview(
+            self,
+            columns=[column for column, _, _ in columns],
+            show='headings',
+            selectmode='browse',
+            height=rows
+        )
+        for column, heading, width in columns:
+            self.tree.heading(column, text=heading, anchor=W)
+            self.tree.column(column, width=width, stretch=column == columns[-1][0])
+        
+        self.scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self._on_scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=YES)
+        
+        # Wheel events: Windows and macOS send <MouseWheel>, X11 sends buttons 4 and 5
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self._on_wheel)
+        self._render()
+    
+    def set_items(self, items):
+        self.items = items
+        self.offset = max(0, min(self.offset, len(items) - self.rows))
+        self._render()
+    
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.items) - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_remove(self.tree.selection())
+            self._render()
+    
+    def _render(self):
+        visible = self.items[self.offset:self.offset + self.rows]
+        for index in range(self.rows):
+            iid = f'row{index}'
+            if index < len(visible):
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=visible[index])
+                else:
+                    self.tree.insert('', END, iid=iid, values=visible[index])
+            elif self.tree.exists(iid):
+                self.tree.delete(iid)
+        
+        total = len(self.items)
+        if total <= self.rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.rows) / total)
+    
+    def _on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.items)))
+        else:
+            self.scroll_to(self.offset + int(amount) * (self.rows if unit == 'pages' else 1))
+    
+    def _on_wheel(self, event):
+        step = -3 if event.num == 4 or event.delta > 0 else 3
+        self.scroll_to(self.offset + step)
+        return "break"
+
+
 class GitGUI:
     def __init__(self, root):
         self.root = root
@@ -132,6 +472,23 @@ class GitGUI:
         
         # Create loading animation
         self.create_loading_animation()
+        
+        # Command output is read on worker threads and drained here in batches
+        self.output_queue = queue.Queue(OUTPUT_QUEUE_SIZE)
+        self.executor = CommandExecutor(self.output_queue)
+        self._output_owner = None
+        self.root.after(OUTPUT_IDLE_POLL_MS, self._drain_output)
+        
+        # Status panel state: the read in progress, the .git key it was started for,
+        # and the status currently shown
+        self._status_future = None
+        self._status_future_key = None
+        self._status_key = None
+        self._status_shown = None
+        self._status_read_at = 0.0
+        self._status_stale = True
+        self.root.bind("<FocusIn>", self._on_focus_in)
+        self.root.after(STATUS_POLL_MS, self._poll_status)
     
     def configure_styles(self):
         """Configure global styles for the application"""
@@ -254,6 +611,37 @@ class GitGUI:
         self.commit_entry.bind("<FocusIn>", self.clear_commit_placeholder)
         self.commit_entry.bind("<FocusOut>", self.restore_commit_placeholder)
         
+        # Live repository status
+        self.status_frame = GlassmorphicFrame(
+            self.work_area,
+            blur_radius=3,
+            transparency=0.5,
+            bootstyle=SECONDARY
+        )
+        self.status_frame.pack(fill=X, pady=5)
+        
+        # Status summary label
+        self.status_label = ttk.Label(
+            self.status_frame.canvas,
+            text="Repository Status:",
+            font=('Segoe UI', 10, 'bold'),
+            bootstyle=INVERSE + SECONDARY
+        )
+        self.status_label.pack(anchor=W, padx=10, pady=(10, 5))
+        
+        # Staged / unstaged / untracked lists
+        self.status_tabs = ttk.Notebook(self.status_frame.canvas, bootstyle=SECONDARY)
+        self.status_tabs.pack(fill=X, padx=10, pady=(0, 10))
+        self.status_lists = {}
+        for key, title in [('staged', 'Staged'), ('unstaged', 'Unstaged'), ('untracked', 'Untracked')]:
+            view = VirtualList(
+                self.status_tabs,
+                columns=[('change', 'Change', 110), ('path', 'Path', 500)],
+                rows=STATUS_LIST_ROWS
+            )
+            self.status_tabs.add(view, text=f"{title} (0)")
+            self.status_lists[key] = view
+        
         # Output area (log)
         self.output_frame = GlassmorphicFrame(
             self.work_area,
@@ -272,6 +660,19 @@ class GitGUI:
         )
         self.output_label.pack(anchor=W, padx=10, pady=(10, 5))
         
+        # Running and queued commands, one row each; shown only while there are any
+        self.command_list = ttk.Treeview(
+            self.output_frame.canvas,
+            columns=('command', 'state', 'progress', 'time'),
+            show='headings',
+            height=3,
+            bootstyle=INFO
+        )
+        for column, heading, width in [('command', 'Command', 260), ('state', 'State', 70),
+                                       ('progress', 'Progress', 160), ('time', 'Time', 60)]:
+            self.command_list.heading(column, text=heading, anchor=W)
+            self.command_list.column(column, width=width, stretch=column == 'command')
+        
         # Output text area
         self.output_text = ScrolledText(
             self.output_frame.canvas,
@@ -299,8 +700,8 @@ class GitGUI:
             ("Commit", self.git_commit, SUCCESS),
             ("Push", self.git_push, DANGER),
             ("Pull", self.git_pull, WARNING),
-            ("Status", lambda: self.run_git_command("git status"), INFO),
-            ("Log", lambda: self.run_git_command("git log --oneline -n 10"), SECONDARY)
+            ("Status", lambda: self.run_git_command(["status"]), INFO),
+            ("Log", lambda: self.run_git_command(["log", "--oneline", "-n", "10"]), SECONDARY)
         ]
         
         for text, command, style in git_actions:
@@ -314,17 +715,17 @@ class GitGUI:
             btn.pack(pady=5, padx=10, fill=X)
     
     def create_loading_animation(self):
-        """Create a loading animation overlay"""
+        """Create the activity bar shown above the status bar while commands run"""
         self.loading_frame = ttk.Frame(self.root)
         
         # Loading label with dots animation
         self.loading_label = ttk.Label(
             self.loading_frame,
             text="Processing...",
-            font=('Segoe UI', 14, 'bold'),
+            font=('Segoe UI', 10, 'bold'),
             bootstyle=INFO
         )
-        self.loading_label.pack(pady=20)
+        self.loading_label.pack(side=LEFT, padx=(0, 10))
         
         # Progress bar
         self.progress = ttk.Progressbar(
@@ -333,47 +734,86 @@ class GitGUI:
             bootstyle=INFO,
             length=200
         )
-        self.progress.pack(pady=10)
-    
-    def show_loading(self):
-        """Show loading animation overlay"""
-        global loading
-        loading = True
-        
-        # Place loading frame over content
-        self.loading_frame.place(
-            relx=0.5, rely=0.5,
-            anchor=CENTER,
-            width=300, height=150
-        )
+        self.progress.pack(side=LEFT, fill=X, expand=YES)
+        
+        self._animation_id = None
+        self._progress_spinning = False
+        self._dots = 0
+    
+    def _refresh_commands(self):
+        """Sync the command list and the activity bar with the executor"""
+        commands = self.executor.snapshot()
+        for command in commands:
+            values = (command.display, command.state, self._progress_text(command), f"{command.elapsed():.1f}s")
+            if self.command_list.exists(command.id):
+                self.command_list.item(command.id, values=values)
+            else:
+                self.command_list.insert('', END, iid=command.id, values=values)
+        
+        if commands and not self.command_list.winfo_ismapped():
+            self.command_list.pack(fill=X, padx=10, pady=(0, 5), before=self.output_text)
+        elif not commands and self.command_list.winfo_ismapped():
+            self.command_list.pack_forget()
         
-        # Start progress animation
-        self.progress.start()
+        running = [c for c in commands if c.state in ('queued', 'running')]
+        if not running:
+            if self._animation_id is not None:
+                self.root.after_cancel(self._animation_id)
+                self._animation_id = None
+            if self._progress_spinning:
+                self.progress.stop()
+                self._progress_spinning = False
+            self.loading_frame.pack_forget()
+            return
+        
+        if not self.loading_frame.winfo_ismapped():
+            self.loading_frame.pack(fill=X, side=BOTTOM, padx=10, after=self.status_bar)
+        if self._animation_id is None:
+            self._animation_id = self.root.after(ANIMATION_INTERVAL_MS, self._animate_activity)
         
-        # Start dot animation in a separate thread
-        threading.Thread(target=self.animate_dots, daemon=True).start()
+        label = f"Processing{'.' * self._dots} {running[0].display}"
+        if len(running) > 1:
+            label += f" (+{len(running) - 1} more)"
+        self.loading_label.config(text=label)
+        
+        # A single command reporting a percentage gets a real progress bar
+        percent = running[0].percent if len(running) == 1 else None
+        if percent is not None:
+            if self._progress_spinning:
+                self.progress.stop()
+                self._progress_spinning = False
+            self.progress.config(mode='determinate', value=percent)
+        elif not self._progress_spinning:
+            self.progress.config(mode='indeterminate', value=0)
+            self.progress.start()
+            self._progress_spinning = True
     
-    def hide_loading(self):
-        """Hide loading animation"""
-        global loading
-        loading = False
-        self.progress.stop()
-        self.loading_frame.place_forget()
+    def _animate_activity(self):
+        """Advance the dots and elapsed times; rescheduled by _refresh_commands while anything runs"""
+        self._animation_id = None
+        self._dots = (self._dots + 1) % 4
+        self._refresh_commands()
     
-    def animate_dots(self):
-        """Animate the loading dots"""
-        dots = 0
-        while loading:
-            dots = (dots + 1) % 4
-            self.loading_label.config(text=f"Processing{'.' * dots}")
-            time.sleep(0.5)
+    def _progress_text(self, command):
+        if command.error:
+            return command.error[:40]
+        if command.percent is not None and command.state == 'running':
+            return f"{command.phase} {command.percent}%"
+        if command.returncode not in (None, 0):
+            return f"exit {command.returncode}"
+        if command.lines:
+            return f"{command.lines} lines"
+        return "waiting for repository" if command.state == 'queued' else ""
     
     def on_window_resize(self, event=None):
         """Handle window resize events"""
-        # Update glassmorphic effects on resize
-        for widget in [self.sidebar, self.content, self.commit_frame, self.output_frame]:
+        # The root binding also fires for every child's <Configure>; only the window itself matters
+        # here, and each frame already re-renders on its own <Configure> when its size changes
+        if event is not None and event.widget is not self.root:
+            return
+        for widget in [self.sidebar, self.content, self.commit_frame, self.status_frame, self.output_frame]:
             if hasattr(widget, '_update_background'):
-                widget._update_background()
+                widget._update_background(force=event is None)
     
     def toggle_theme(self):
         """Toggle between light and dark themes"""
@@ -408,66 +848,178 @@ class GitGUI:
         selected_directory = filedialog.askdirectory(title="Select Git Repository Directory")
         if selected_directory:
             repo_directory = selected_directory
-            os.chdir(repo_directory)
             self.directory_label.config(text=f"Repository: {os.path.basename(repo_directory)}")
-            self.output_text.insert(END, f"Changed working directory to: {repo_directory}\n")
-            self.output_text.see(END)
+            self._append_output([f"Changed working directory to: {repo_directory}\n"])
             
             # Update status bar
             self.status_bar.config(text=f"Repository: {os.path.basename(repo_directory)} | Ready")
             
             # Check if it's a git repository
-            self.run_git_command("git status")
+            self.run_git_command(["status"])
+            self._reset_status()
     
-    def run_git_command(self, command):
-        """Run Git command with loading animation"""
+    def run_git_command(self, args, read_only=None):
+        """Queue `git <args>` for the selected repository"""
         if not repo_directory:
             messagebox.showwarning("Repository Not Selected", "Please select a Git repository directory first.")
             return
         
-        # Show loading animation
-        self.show_loading()
+        command = self.executor.submit(args, repo_directory, read_only)
         
         # Update status bar
-        self.status_bar.config(text=f"Running: {command}")
+        self.status_bar.config(text=f"Running: {command.display}")
+        self._refresh_commands()
+    
+    def _drain_output(self):
+        """Move queued output into the pane, spending at most one frame budget per call"""
+        deadline = time.perf_counter() + OUTPUT_FRAME_BUDGET_MS / 1000
+        busy = False
+        while time.perf_counter() < deadline:
+            lines = []
+            finished = None
+            while len(lines) < OUTPUT_BATCH_LINES:
+                try:
+                    kind, payload = self.output_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'done':
+                    finished = payload
+                    break
+                command, text = (payload, None) if kind == 'start' else payload
+                if command is not self._output_owner:
+                    # Concurrent commands interleave; label each run of lines with its command
+                    suffix = "" if kind == 'start' else " (continued)"
+                    lines.append(f"\n> {command.display}{suffix}\n")
+                    self._output_owner = command
+                if text is not None:
+                    lines.append(text)
+            
+            if not lines and finished is None:
+                break
+            busy = True
+            self._append_output(lines)
+            if finished is not None:
+                self._command_finished(finished)
         
-        # Run command in a separate thread
-        threading.Thread(target=self._execute_command, args=(command,), daemon=True).start()
+        if busy:
+            self._refresh_commands()
+        self.root.after(FRAME_INTERVAL_MS if busy else OUTPUT_IDLE_POLL_MS, self._drain_output)
     
-    def _execute_command(self, command):
-        """Execute Git command in a background thread"""
-        try:
-            result = subprocess.run(command, capture_output=True, text=True, shell=True)
-            output = result.stdout if result.stdout else result.stderr
+    def _append_output(self, lines):
+        """Insert lines with a single widget call and trim the pane to MAX_OUTPUT_LINES"""
+        if not lines:
+            return
+        # Only follow new output if the user has not scrolled up to read something
+        following = self.output_text.yview()[1] >= 0.999
+        self.output_text.insert(END, ''.join(lines))
+        
+        excess = int(self.output_text.index('end-1c').split('.')[0]) - MAX_OUTPUT_LINES
+        if excess > 0:
+            self.output_text.delete('1.0', f'{excess + 1}.0')
+        if following:
+            self.output_text.see(END)
+    
+    def _command_finished(self, command):
+        """Update status bar once a command's output has been shown"""
+        if command.error:
+            self._show_error(command.error)
+        elif command.returncode == 0:
+            self.status_bar.config(text=f"Completed: {command.display}")
+        else:
+            self.status_bar.config(text=f"Failed (exit {command.returncode}): {command.display}")
+        if not command.read_only:
+            # Commands that change the repository usually move the index or HEAD, but not always
+            # (e.g. a failed pull that touched the work tree); re-read to be sure
+            self._status_stale = True
+        self.root.after(FINISHED_COMMAND_LINGER_MS, self._forget_command, command)
+    
+    def _forget_command(self, command):
+        self.executor.forget(command)
+        if self.command_list.exists(command.id):
+            self.command_list.delete(command.id)
+        self._refresh_commands()
+    
+    def _reset_status(self):
+        """Forget the previous repository's status and read the new one on the next poll"""
+        self._status_key = None
+        self._status_shown = None
+        self._status_stale = True
+        for view in self.status_lists.values():
+            view.set_items([])
+    
+    def _on_focus_in(self, event):
+        # Coming back from an editor is the usual moment files have changed under us
+        if time.time() - self._status_read_at > 2:
+            self._status_stale = True
+    
+    def _poll_status(self):
+        """Re-read status when .git changed, after mutating commands, or every STATUS_FULL_REFRESH_MS"""
+        delay = STATUS_POLL_MS
+        if repo_directory:
+            if self._status_future is not None:
+                if self._status_future.done():
+                    self._finish_status_read()
+                else:
+                    delay = STATUS_PENDING_POLL_MS
             
-            # Update UI in the main thread
-            self.root.after(0, self._update_output, command, output)
-        except Exception as e:
-            # Handle errors in the main thread
-            self.root.after(0, self._show_error, str(e))
+            if self._status_future is None:
+                key = Repository(repo_directory).fingerprint(index=True, refs=True)
+                overdue = (time.time() - self._status_read_at) * 1000 >= STATUS_FULL_REFRESH_MS
+                if self._status_stale or overdue or key != self._status_key:
+                    self._status_stale = False
+                    self._status_future_key = key
+                    self._status_future = self.executor.pool.submit(read_status, repo_directory)
+                    delay = STATUS_PENDING_POLL_MS
+        self.root.after(delay, self._poll_status)
     
-    def _update_output(self, command, output):
-        """Update output text and status bar"""
-        self.output_text.insert(END, f"\n> {command}\n{output}\n")
-        self.output_text.see(END)
-        self.status_bar.config(text=f"Completed: {command}")
-        self.hide_loading()
+    def _finish_status_read(self):
+        future, self._status_future = self._status_future, None
+        self._status_key = self._status_future_key
+        self._status_read_at = time.time()
+        try:
+            status, seconds = future.result()
+        except Exception as e:
+            self._status_shown = None
+            self.status_label.config(text=f"Repository Status: {e}")
+            for view in self.status_lists.values():
+                view.set_items([])
+            return
+        
+        if status == self._status_shown:
+            # Nothing changed since the last read; keep the lists and scroll positions as they are
+            return
+        self._status_shown = status
+        
+        rows = {
+            'staged': status_rows(status['staged']),
+            'unstaged': status_rows(status['conflicts'] + status['unstaged']),
+            'untracked': status_rows(status['untracked'])
+        }
+        for (key, view), title in zip(self.status_lists.items(), ('Staged', 'Unstaged', 'Untracked')):
+            view.set_items(rows[key])
+            self.status_tabs.tab(view, text=f"{title} ({len(rows[key]):,})")
+        
+        summary = f"Repository Status: {status['branch'] or 'unknown branch'}"
+        if status['upstream']:
+            summary += f" ↑{status['ahead']} ↓{status['behind']}"
+        if not any(rows.values()):
+            summary += " · clean"
+        self.status_label.config(text=f"{summary} · read in {seconds * 1000:.0f} ms")
     
     def _show_error(self, error_message):
         """Display error message"""
         messagebox.showerror("Error", error_message)
         self.status_bar.config(text=f"Error: {error_message[:30]}...")
-        self.hide_loading()
     
     def git_add(self):
         """Git add command"""
-        self.run_git_command("git add .")
+        self.run_git_command(["add", "."])
     
     def git_commit(self):
         """Git commit command"""
         commit_message = self.commit_entry.get()
         if commit_message and commit_message != "Enter commit message...":
-            self.run_git_command(f'git commit -m "{commit_message}"')
+            self.run_git_command(["commit", "-m", commit_message])
             # Clear the commit message
             self.commit_entry.delete(0, tk.END)
             self.commit_entry.insert(0, "Enter commit message...")
@@ -476,14 +1028,39 @@ class GitGUI:
     
     def git_push(self):
         """Git push command"""
-        self.run_git_command("git push")
+        self.run_git_command(["push"])
     
     def git_pull(self):
         """Git pull command"""
-        self.run_git_command("git pull")
+        self.run_git_command(["pull"])
+
+
+def measure_resize(root, count=200):
+    """Drive the window through `count` resizes and print background render timings"""
+    sizes = [(900 + (i % 40) * 7, 600 + (i % 25) * 5) for i in range(count)]
+    
+    def step(index=0):
+        if index < len(sizes):
+            root.geometry(f"{sizes[index][0]}x{sizes[index][1]}")
+            # Resize events normally arrive a few ms apart; let coalescing do its work
+            root.after(5, step, index + 1)
+        else:
+            root.after(FRAME_INTERVAL_MS * 4, finish)
+    
+    def finish():
+        print(render_stats.report(count))
+        root.destroy()
+    
+    # Start from a settled window so the first layout is not counted
+    def start():
+        render_stats.__init__()
+        step()
+    root.after(500, start)
 
 
 if __name__ == "__main__":
     root = ttk.Window(themename=theme_mode)
     app = GitGUI(root)
+    if "--measure-resize" in sys.argv:
+        measure_resize(root)
     root.mainloop()
@@ -0,0 +1,213 @@
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Priority classes; lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+# Git-running work admitted at once: in total, per kind, and for background work.
+# Background work also never takes the last slot of a kind, so an interactive
+# pull is not stuck behind a prefetch and a gc.
+GLOBAL_LIMIT = 8
+READ_LIMIT = 6
+WRITE_LIMIT = 2
+BACKGROUND_LIMIT = 4
+
+# Fetches, clones and bulk runs mostly wait on the remote, so they have a budget
+# of their own that counts against neither the global nor the background limit
+NETWORK_LIMIT = 64
+
+# Kinds that load this machine's CPU and disk, and so share GLOBAL_LIMIT
+LOCAL_KINDS = ('read', 'write')
+
+# Requests beyond this many waiting are rejected straight away; background
+# work may only fill half the queue so interactive requests still get in
+MAX_QUEUE = 32
+
+# Seconds a request may wait for a slot before it is rejected
+QUEUE_TIMEOUT = 10
+
+# Queue waits kept per priority class for the percentiles in snapshot()
+WAIT_SAMPLES = 1000
+
+# Bounds for the Retry-After estimate, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(RuntimeError):
+    """No slot became free in time; retry_after is a suggested delay in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionCancelled(RuntimeError):
+    """The caller gave up while still waiting for a slot"""
+
+
+class Ticket:
+    def __init__(self, kind, priority, sequence):
+        self.kind = kind
+        self.priority = priority
+        self.sequence = sequence
+        self.enqueued = time.monotonic()
+        self.admitted = None
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController:
+    """Bounds how much git work runs at once and queues the rest by priority
+
+    A request waits for a slot that fits its kind ('read', 'write' or
+    'network') and class, and is admitted once no request of a higher class, or queued
+    earlier in the same class, could take that slot instead. A queue that is
+    full, or a wait longer than `queue_timeout`, raises Overloaded with a
+    Retry-After estimate drawn from how long slots have recently been held.
+    """
+
+    def __init__(self, global_limit=GLOBAL_LIMIT, read_limit=READ_LIMIT, write_limit=WRITE_LIMIT,
+                 background_limit=BACKGROUND_LIMIT, network_limit=NETWORK_LIMIT, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT):
+        self.global_limit = global_limit
+        self.limits = {'read': read_limit, 'write': write_limit, 'network': network_limit}
+        self.background_limit = background_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.changed = threading.Condition()
+        self.waiting = []
+        self.running = {'read': 0, 'write': 0, 'network': 0}
+        self.background_running = 0
+        self.sequence = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After
+        self.average_hold = 1.0
+        self.counters = {name: {'admitted': 0, 'rejected': 0, 'timed_out': 0} for name in PRIORITY_NAMES.values()}
+        self.waits = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITY_NAMES.values()}
+        self.total_wait = {name: 0.0 for name in PRIORITY_NAMES.values()}
+
+    def _fits(self, ticket):
+        # Background work leaves one slot of its kind, and of the total, to interactive requests
+        reserve = 1 if ticket.priority == BACKGROUND else 0
+        if self.running[ticket.kind] + reserve >= self.limits[ticket.kind]:
+            return False
+        if ticket.kind not in LOCAL_KINDS:
+            return True
+        if sum(self.running[kind] for kind in LOCAL_KINDS) + reserve >= self.global_limit:
+            return False
+        return ticket.priority != BACKGROUND or self.background_running < self.background_limit
+
+    def _can_start(self, ticket):
+        if not self._fits(ticket):
+            return False
+        # Anyone ahead in the queue who could use a free slot goes first; network and
+        # local work draw on separate budgets and never hold each other up
+        return not any(other < ticket and self._competes(other, ticket) and self._fits(other)
+                       for other in self.waiting)
+
+    @staticmethod
+    def _competes(a, b):
+        return a.kind == b.kind or (a.kind in LOCAL_KINDS and b.kind in LOCAL_KINDS)
+
+    def retry_after(self):
+        queued = len(self.waiting) + 1
+        estimate = math.ceil(self.average_hold * queued / self.global_limit)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, estimate))
+
+    def _counts_as_background(self, ticket):
+        return ticket.priority == BACKGROUND and ticket.kind in LOCAL_KINDS
+
+    def acquire(self, kind, priority=INTERACTIVE, timeout=None, cancelled=None):
+        """Wait for a slot and return the ticket to release(); raises Overloaded
+
+        `cancelled` is an optional threading.Event; setting it while the
+        caller is still queued raises AdmissionCancelled within a second.
+        """
+        if kind not in self.limits:
+            raise ValueError(f"Unknown admission kind: {kind}")
+        timeout = self.queue_timeout if timeout is None else timeout
+        name = PRIORITY_NAMES[priority]
+        with self.changed:
+            ticket = Ticket(kind, priority, next(self.sequence))
+            if not self._can_start(ticket):
+                limit = self.max_queue if priority == INTERACTIVE else self.max_queue // 2
+                if len(self.waiting) >= limit:
+                    self.counters[name]['rejected'] += 1
+                    raise Overloaded(f"Too many queued requests ({len(self.waiting)})", self.retry_after())
+                self.waiting.append(ticket)
+                deadline = ticket.enqueued + timeout
+                try:
+                    while not self._can_start(ticket):
+                        if cancelled is not None and cancelled.is_set():
+                            raise AdmissionCancelled(f"Cancelled while waiting for a {kind} slot")
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.counters[name]['rejected'] += 1
+                            self.counters[name]['timed_out'] += 1
+                            raise Overloaded(f"No {kind} slot free after {timeout}s", self.retry_after())
+                        # An Event cannot notify this condition, so a cancellable wait polls it
+                        self.changed.wait(remaining if cancelled is None else min(remaining, 1.0))
+                finally:
+                    self.waiting.remove(ticket)
+                    # Whoever is next may fit now that this ticket left the queue
+                    self.changed.notify_all()
+
+            ticket.admitted = time.monotonic()
+            self.running[kind] += 1
+            if self._counts_as_background(ticket):
+                self.background_running += 1
+            wait = ticket.admitted - ticket.enqueued
+            self.counters[name]['admitted'] += 1
+            self.waits[name].append(wait)
+            self.total_wait[name] += wait
+            return ticket
+
+    def release(self, ticket):
+        with self.changed:
+            self.running[ticket.kind] -= 1
+            if self._counts_as_background(ticket):
+                self.background_running -= 1
+            held = time.monotonic() - ticket.admitted
+            self.average_hold = 0.9 * self.average_hold + 0.1 * held
+            self.changed.notify_all()
+
+    @contextmanager
+    def admit(self, kind, priority=INTERACTIVE, timeout=None, cancelled=None):
+        ticket = self.acquire(kind, priority, timeout, cancelled)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def snapshot(self):
+        with self.changed:
+            classes = {}
+            for name, counters in self.counters.items():
+                waits = sorted(self.waits[name])
+                classes[name] = dict(counters, wait={
+                    'total_seconds': round(self.total_wait[name], 3),
+                    'p50': round(waits[len(waits) // 2], 4) if waits else None,
+                    'p95': round(waits[int(len(waits) * 0.95)], 4) if waits else None,
+                    'max': round(waits[-1], 4) if waits else None,
+                    'samples': len(waits)
+                })
+            return {
+                'limits': {'global': self.global_limit, **self.limits, 'background': self.background_limit,
+                           'queue': self.max_queue, 'queue_timeout': self.queue_timeout},
+                'running': dict(self.running, background=self.background_running),
+                'queued': {name: sum(1 for ticket in self.waiting if ticket.priority == priority)
+                           for priority, name in PRIORITY_NAMES.items()},
+                'average_hold_seconds': round(self.average_hold, 3),
+                'classes': classes
+            }
+
+
+# Shared by HTTP requests, channel commands and the server's own background work
+controller = AdmissionController()
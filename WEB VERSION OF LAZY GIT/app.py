@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, redirect, url_for
+from flask import Flask, request, jsonify, render_template, send_from_directory, redirect, url_for, Response, stream_with_context
 import subprocess
 import os
 import json
@@ -10,9 +10,35 @@ from tkinter import filedialog
 import signal
 import logging
 import traceback
+import tempfile
+import uuid
+import functools
 import webbrowser
 from flask_cors import CORS
 
+# The git backend shared with the Tkinter client lives next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lazygit_core import process as git_process, gitdir, format_status, GitError, Repository, cache_stats
+import blame as git_blame
+import commit_graph
+import fs_browser
+import repo_scanner
+import maintenance
+import status_accel
+import bulk_ops
+import prefetch
+import http_cache
+import serializers
+import ws_channel
+import worktrees
+import clone_jobs
+import repo_analyzer
+import history_stats
+import merge_preview
+import admission
+import static_assets
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -28,9 +54,25 @@ except Exception as e:
     git_available = False
     logger.warning(f"Error importing GitPython: {str(e)}. Some functionality will be limited.")
 
+# The WebSocket command channel needs flask-sock; without it the front-end stays on plain HTTP
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+    logger.warning("flask-sock not installed. The WebSocket command channel is disabled.")
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
 
+# Minified, fingerprinted bundles from build_assets.py; the plain source files when none are built
+asset_manifest = static_assets.AssetManifest(app.static_folder)
+
+@app.context_processor
+def inject_asset_urls():
+    def asset_urls(name):
+        return [url_for(endpoint, filename=filename, **args) for endpoint, filename, args in asset_manifest.files(name)]
+    return {'asset_urls': asset_urls}
+
 # Constants
 CONFIG_FILE = 'config.json'
 REPOS_FILE = 'repositories.json'
@@ -46,13 +88,17 @@ directory_selected_event = threading.Event()
 # Variable to control server shutdown
 server_shutdown_requested = False
 
+# Serializes read-modify-write cycles on the repositories file
+repositories_lock = threading.Lock()
+
 # Check if Git is available on the system
 def check_git_available():
     try:
         # Try to run git version command
         result = subprocess.run(['git', '--version'], 
                                text=True,
-                               capture_output=True)
+                               capture_output=True,
+                               timeout=10)
         if result.returncode == 0:
             logger.info(f"Git found: {result.stdout.strip()}")
             return True
@@ -103,24 +149,196 @@ def get_saved_repositories():
         logger.error(f"Error loading repositories: {str(e)}")
         return []
 
+# Write the repository list atomically so readers never see a half-written file
+def write_repositories(repositories):
+    directory = os.path.dirname(os.path.abspath(REPOS_FILE))
+    fd, temp_path = tempfile.mkstemp(prefix='.repositories-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(repositories, f)
+        os.replace(temp_path, REPOS_FILE)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Function to add several repositories to the list in one write
+def save_repositories(directories):
+    try:
+        with repositories_lock:
+            repositories = get_saved_repositories()
+            added = [d for d in dict.fromkeys(directories) if d not in repositories]
+            
+            if added:
+                write_repositories(repositories + added)
+                logger.info(f"Added {len(added)} repositories to list")
+        return added
+    except Exception as e:
+        logger.error(f"Error saving repositories to list: {str(e)}")
+        return None
+
 # Function to save a new repository to the list
 def save_repository(directory):
-    try:
-        repositories = get_saved_repositories()
-        
-        # Check if directory already exists in the list
-        if directory not in repositories:
-            repositories.append(directory)
+    return save_repositories([directory]) is not None
+
+# Background maintenance for saved repositories, run while no one is using the server
+maintenance_scheduler = maintenance.MaintenanceScheduler(get_saved_repositories)
+
+# Background fetch of remotes into refs/prefetch/ so pulls can stay local
+prefetcher = prefetch.Prefetcher(get_saved_repositories)
+
+@app.before_request
+def record_activity():
+    maintenance_scheduler.note_activity()
+
+@app.before_request
+def tag_operation():
+    # Git processes started for this request can be cancelled with the client's id
+    git_process.set_request_operation_id(request.headers.get('X-Operation-Id'))
+
+@app.after_request
+def expose_operation_id(response):
+    response.headers['X-Operation-Id'] = git_process.get_request_operation_id() or ''
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Gzip or brotli-compress larger text responses for clients that accept it"""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in http_cache.COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < http_cache.COMPRESS_MIN_SIZE:
+        return response
+    
+    encoding = http_cache.choose_encoding(request.headers.get('Accept-Encoding'))
+    if not encoding:
+        return response
+    
+    response.set_data(http_cache.compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag = response.headers.get('ETag')
+    if etag:
+        # A compressed body is a different representation, so it gets its own strong validator
+        response.headers['ETag'] = f'{etag[:-1]}-{encoding}"'
+    return response
+
+# Function to make a read endpoint answer If-None-Match with 304 Not Modified.
+# `fingerprint` returns a cheap description of everything the response depends on,
+# so an unchanged repository is answered without running git at all. When it
+# returns None the ETag is a hash of the body instead, which still saves bandwidth.
+def conditional_response(fingerprint):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if_none_match = request.headers.get('If-None-Match')
+            state = fingerprint() if git_executable_available else None
+            accept = request.headers.get('Accept', '')
+            etag = http_cache.make_etag(request.full_path, accept, state) if state is not None else None
+            if etag and http_cache.etag_matches(if_none_match, etag):
+                return not_modified(etag)
             
-            # Save back to file
-            with open(REPOS_FILE, 'w') as f:
-                json.dump(repositories, f)
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or (response.is_streamed and etag is None):
+                return response
+            if etag is None:
+                etag = http_cache.make_etag(request.full_path, accept, response.get_data())
+                if http_cache.etag_matches(if_none_match, etag):
+                    return not_modified(etag)
             
-            logger.info(f"Added repository to list: {directory}")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving repository to list: {str(e)}")
-        return False
+            response.headers['ETag'] = f'"{etag}"'
+            # Always revalidate; the browser then sends If-None-Match by itself
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Function to run a view under admission control, so a burst of requests queues by
+# priority instead of starting unbounded git processes. `kind` is 'read' or 'write'
+# (default: by HTTP method); a client can lower its own class with X-Priority: background.
+# Streamed responses keep their slot until the stream is closed.
+def admission_controlled(kind=None, priority=admission.INTERACTIVE):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request_kind = kind or ('read' if request.method in ('GET', 'HEAD') else 'write')
+            request_priority = priority
+            if request.headers.get('X-Priority', '').strip().lower() == 'background':
+                request_priority = admission.BACKGROUND
+            try:
+                ticket = admission.controller.acquire(request_kind, request_priority)
+            except admission.Overloaded as e:
+                return overloaded_response(e)
+            
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                admission.controller.release(ticket)
+                raise
+            if response.is_streamed:
+                response.call_on_close(lambda: admission.controller.release(ticket))
+            else:
+                admission.controller.release(ticket)
+            return response
+        return wrapper
+    return decorator
+
+def overloaded_response(error):
+    response = jsonify({"success": False, "error": f"Server busy: {str(error)}", "retry_after": error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+# Function to send a payload in the format the client negotiated (JSON, or MessagePack
+# when installed). List endpoints pass `items_key` so a client that accepts NDJSON
+# gets the list streamed one record per line instead of one large document.
+def api_response(payload, status=200, items_key=None):
+    accept = request.headers.get('Accept')
+    if items_key and serializers.wants_ndjson(accept):
+        response = Response(serializers.iter_ndjson(payload, items_key), status=status,
+                            mimetype=serializers.NDJSON_MIMETYPE)
+    else:
+        body, mimetype = serializers.serialize(payload, accept)
+        response = Response(body, status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+def worktree_token():
+    # Worktree edits are only visible through the file watcher; None when there is none
+    watcher = status_accel.get_watcher(currentDirectory) if currentDirectory else None
+    return watcher and f'{watcher.watcher_id}:{watcher.sequence}'
+
+def status_fingerprint():
+    # Without a watcher, hash the body
+    token = worktree_token()
+    if token is None:
+        return None
+    state = gitdir.repo_fingerprint(currentDirectory, index=True, refs=True)
+    return state and f'{state}|{token}'
+
+def refs_fingerprint():
+    state = currentDirectory and gitdir.repo_fingerprint(currentDirectory, refs=True)
+    if not state:
+        return None
+    # Branch listings also show which worktree each branch is checked out in
+    common_dir = gitdir.find_common_dir(gitdir.find_git_dir(currentDirectory))
+    return state + '|' + gitdir.file_fingerprint(os.path.join(common_dir, 'worktrees'),
+                                                      os.path.join(common_dir, worktrees.STATE_FILE_NAME))
+
+def remotes_fingerprint():
+    return currentDirectory and gitdir.repo_fingerprint(currentDirectory, config=True)
+
+def repositories_fingerprint():
+    return f'{gitdir.file_fingerprint(os.path.abspath(REPOS_FILE))}|{currentDirectory}'
 
 @app.route('/')
 def index():
@@ -134,7 +352,12 @@ def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static'),
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+@app.route('/assets/<path:filename>', endpoint='asset')
+def asset(filename):
+    return static_assets.send_asset(app.static_folder, filename, request.headers.get('Accept-Encoding'))
+
 @app.route('/get-repositories', methods=['GET'])
+@conditional_response(repositories_fingerprint)
 def get_repositories():
     """Get all saved repositories for updating the dropdown"""
     try:
@@ -151,6 +374,54 @@ def get_repositories():
             "error": str(e)
         }), 500
 
+@app.route('/scan-repositories', methods=['POST'])
+def scan_repositories():
+    """Find git repositories under a root folder, streaming each one as it is found"""
+    try:
+        data = request.get_json() or {}
+        root = os.path.abspath(os.path.expanduser(data.get('root', '').strip() or '~'))
+        add = data.get('add', True)
+        try:
+            max_depth = min(32, max(0, int(data.get('max_depth', repo_scanner.DEFAULT_SCAN_DEPTH))))
+            workers = min(64, max(1, int(data.get('workers', repo_scanner.DEFAULT_SCAN_WORKERS))))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "max_depth and workers must be integers"}), 400
+        
+        if not os.path.isdir(root):
+            return jsonify({"success": False, "error": f"Directory does not exist: {root}"}), 400
+        
+        def generate():
+            start = time.time()
+            found = []
+            try:
+                for path in repo_scanner.scan_repositories(root, max_depth, workers, bool(data.get('nested', False))):
+                    found.append(path)
+                    yield json.dumps({"type": "repository", "path": path}) + '\n'
+            except Exception as e:
+                logger.error(f"Error scanning {root}: {str(e)}")
+                yield json.dumps({"type": "error", "error": str(e)}) + '\n'
+                return
+            
+            added = []
+            if add and found:
+                added = save_repositories(found)
+                if added is None:
+                    yield json.dumps({"type": "error", "error": "Failed to save repositories"}) + '\n'
+                    return
+            
+            yield json.dumps({
+                "type": "done",
+                "found": len(found),
+                "added": len(added),
+                "elapsed": round(time.time() - start, 3)
+            }) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Exception in scan repositories: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/select-directory-dialog', methods=['GET'])
 def select_directory_dialog():
     """Open a dialog to select a directory and add it to the repository list"""
@@ -210,6 +481,56 @@ def select_directory_dialog():
         logger.error(f"Error in directory selection: {str(e)}")
         return redirect(url_for('index'))
 
+@app.route('/browse', methods=['GET'])
+def browse_directory():
+    """Show the in-browser directory picker (works without a desktop session)"""
+    repositories = get_saved_repositories()
+    return render_template('browse_directory.html', repositories=repositories, current_directory=currentDirectory)
+
+@app.route('/fs/list', methods=['GET'])
+def fs_list():
+    """List one directory level, a page at a time, flagging git repositories"""
+    try:
+        path = request.args.get('path', '').strip()
+        show_hidden = request.args.get('hidden', '0') == '1'
+        include_files = request.args.get('files', '0') == '1'
+        try:
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = min(1000, max(1, int(request.args.get('limit', 200))))
+        except ValueError:
+            return jsonify({"success": False, "error": "offset and limit must be integers"}), 400
+        
+        if not path:
+            path = currentDirectory or os.path.expanduser('~')
+        path = os.path.abspath(os.path.expanduser(path))
+        
+        if not os.path.isdir(path):
+            return jsonify({"success": False, "error": f"Directory does not exist: {path}"}), 400
+        
+        try:
+            listing = fs_browser.get_listing(path, show_hidden, include_files)
+        except PermissionError:
+            return jsonify({"success": False, "error": f"Permission denied: {path}"}), 403
+        
+        entries = listing.page(offset, limit)
+        total = len(listing.entries)
+        parent = os.path.dirname(path)
+        
+        return jsonify({
+            "success": True,
+            "path": path,
+            "parent": parent if parent != path else None,
+            "is_repo": fs_browser.is_git_repository(path),
+            "entries": entries,
+            "total": total,
+            "next_offset": offset + limit if offset + limit < total else None,
+            "roots": fs_browser.list_roots() if offset == 0 else []
+        })
+    except Exception as e:
+        logger.error(f"Exception in fs list: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/set-directory', methods=['POST'])
 def set_directory():
     global currentDirectory, isProcessing
@@ -233,9 +554,6 @@ def set_directory():
             isProcessing = False
             return jsonify({"error": f"Directory does not exist: {directory}"}), 400
         
-        # Change to the directory to verify it's a git repository
-        os.chdir(directory)
-        
         try:
             if not git_executable_available:
                 logger.warning("Git executable not found, but still setting directory")
@@ -249,7 +567,9 @@ def set_directory():
                 })
 
             # Verify it's a git repository
-            subprocess.check_output(['git', 'status'], stderr=subprocess.STDOUT)
+            result = git_process.run_git(['-C', directory, 'rev-parse', '--git-dir'])
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout + result.stderr)
             
             # Set the current directory
             currentDirectory = directory
@@ -282,6 +602,8 @@ def set_directory():
         isProcessing = False
 
 @app.route('/status', methods=['GET'])
+@conditional_response(status_fingerprint)
+@admission_controlled('read')
 def get_status():
     global currentDirectory
     try:
@@ -293,15 +615,17 @@ def get_status():
             
         if currentDirectory:
             if os.path.exists(currentDirectory):
-                cmd = subprocess.Popen(['git', '-C', currentDirectory, 'status'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                stdout, stderr = cmd.communicate()
+                # Bring back the file watcher if this repo's fsmonitor hook points at us
+                status_accel.ensure_watcher(currentDirectory)
                 
-                if stderr:
-                    app.logger.error(f"Git status error: {stderr.decode('utf-8')}")
-                    return jsonify({'success': False, 'error': stderr.decode('utf-8')})
+                # With a file watcher the parsed status is cached until it reports a change
+                try:
+                    status = Repository(currentDirectory).status(untracked='normal', worktree_token=worktree_token())
+                except GitError as e:
+                    app.logger.error(f"Git status error: {e}")
+                    return jsonify({'success': False, 'error': str(e)})
                 
-                output = stdout.decode('utf-8')
-                return jsonify({'success': True, 'output': output})
+                return jsonify({'success': True, 'output': format_status(status), 'status': status})
             else:
                 return jsonify({'success': False, 'error': 'Selected directory does not exist'})
         else:
@@ -310,7 +634,52 @@ def get_status():
         app.logger.error(f"Error in get_status: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/status-acceleration', methods=['GET', 'POST'])
+def status_acceleration():
+    """Report, enable or disable untracked cache and fsmonitor for a repository"""
+    global currentDirectory
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        data = request.get_json(silent=True) or {}
+        directory = (data.get('directory') or request.args.get('directory', '')).strip() or currentDirectory
+        
+        if not directory:
+            return jsonify({"success": False, "error": "No directory set"}), 400
+        
+        if gitdir.find_git_dir(directory) is None:
+            return jsonify({"success": False, "error": f"Not a git repository: {directory}"}), 400
+        
+        if request.method == 'GET':
+            report = status_accel.get_acceleration_report(directory)
+        elif data.get('enable', True):
+            port = int(request.environ.get('SERVER_PORT') or 5000)
+            report = status_accel.enable_acceleration(directory, data.get('fsmonitor', True), '127.0.0.1', port)
+        else:
+            report = status_accel.disable_acceleration(directory)
+        
+        return jsonify({"success": True, "directory": directory, **report})
+    except Exception as e:
+        logger.error(f"Exception in status acceleration: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/fsmonitor', methods=['GET'])
+def fsmonitor():
+    """Answer a git fsmonitor hook (protocol v2) query from our file watcher"""
+    watcher = status_accel.get_watcher(request.args.get('repo', ''))
+    if watcher is None:
+        # The hook exits non-zero on anything but 200, so git falls back to a full scan
+        return Response(status=404)
+    return Response(watcher.query(request.args.get('token', '')), mimetype='application/octet-stream')
+
 @app.route('/add', methods=['GET', 'POST'])
+@admission_controlled('write')
 def add_changes():
     global currentDirectory, isProcessing
     isProcessing = False  # Reset processing state
@@ -328,8 +697,8 @@ def add_changes():
         if not os.path.exists(currentDirectory):
             return jsonify({'success': False, 'error': 'Selected directory does not exist'})
         
-        cmd = subprocess.Popen(['git', '-C', currentDirectory, 'add', '.'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = cmd.communicate()
+        result = git_process.run_git(['-C', currentDirectory, 'add', '.'])
+        stdout, stderr = result.stdout, result.stderr
         
         if stderr and b'error' in stderr.lower():
             app.logger.error(f"Git add error: {stderr.decode('utf-8')}")
@@ -341,6 +710,7 @@ def add_changes():
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/commit', methods=['POST'])
+@admission_controlled('write')
 def commit_changes():
     global currentDirectory, isProcessing
     isProcessing = False  # Reset processing state
@@ -364,8 +734,8 @@ def commit_changes():
         if not os.path.exists(currentDirectory):
             return jsonify({'success': False, 'error': 'Selected directory does not exist'})
         
-        cmd = subprocess.Popen(['git', '-C', currentDirectory, 'commit', '-m', message], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = cmd.communicate()
+        result = git_process.run_git(['-C', currentDirectory, 'commit', '-m', message])
+        stdout, stderr = result.stdout, result.stderr
         
         stdout_text = stdout.decode('utf-8') if stdout else ""
         stderr_text = stderr.decode('utf-8') if stderr else ""
@@ -383,6 +753,7 @@ def commit_changes():
         return jsonify({'success': False, 'error': f'Commit failed: {str(e)}'})
 
 @app.route('/push', methods=['GET', 'POST'])
+@admission_controlled('write')
 def push_changes():
     global currentDirectory, isProcessing
     isProcessing = False  # Reset processing state
@@ -400,8 +771,8 @@ def push_changes():
         if not os.path.exists(currentDirectory):
             return jsonify({'success': False, 'error': 'Selected directory does not exist'})
         
-        cmd = subprocess.Popen(['git', '-C', currentDirectory, 'push'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = cmd.communicate()
+        result = git_process.run_git(['-C', currentDirectory, 'push'])
+        stdout, stderr = result.stdout, result.stderr
         
         # Git sometimes outputs information to stderr even on success
         stderr_text = stderr.decode('utf-8') if stderr else ""
@@ -417,7 +788,39 @@ def push_changes():
         app.logger.error(f"Error in push_changes: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+# Fast-forward the current branch to its prefetched upstream without touching the network.
+# Returns None when there is no fresh prefetched ref, so the caller can do a normal pull.
+def pull_from_prefetch(directory):
+    fetched_at = prefetcher.fetched_at(directory)
+    if not fetched_at or time.time() - fetched_at > prefetcher.interval:
+        return None
+    
+    branch, upstream = prefetch.get_upstream(directory)
+    # Older than the remote-tracking branch (e.g. after a push): merging it would move nothing forward
+    # and update-ref below would rewind the upstream
+    prefetch_ref = prefetch.newer_prefetch_ref(directory, upstream) if upstream else None
+    if not prefetch_ref:
+        return None
+    
+    process = git_process.run_git(['-C', directory, 'merge', '--ff-only', prefetch_ref])
+    stdout, stderr = process.stdout, process.stderr
+    
+    if process.returncode != 0:
+        # Diverged or dirty tree: let the regular pull report the real problem
+        return None
+    
+    # Move the remote-tracking branch too, so ahead/behind agrees with what was merged
+    git_process.run_git(['-C', directory, 'update-ref', upstream, prefetch_ref])
+    
+    return {
+        'success': True,
+        'message': stdout.decode('utf-8', errors='replace') or stderr.decode('utf-8', errors='replace'),
+        'source': 'prefetch',
+        'fetched_at': fetched_at
+    }
+
 @app.route('/pull', methods=['GET', 'POST'])
+@admission_controlled('write')
 def pull_changes():
     global currentDirectory, isProcessing
     isProcessing = False  # Reset processing state
@@ -435,8 +838,14 @@ def pull_changes():
         if not os.path.exists(currentDirectory):
             return jsonify({'success': False, 'error': 'Selected directory does not exist'})
         
-        cmd = subprocess.Popen(['git', '-C', currentDirectory, 'pull'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = cmd.communicate()
+        # Fast-forward from prefetched objects when they are recent enough, skipping the network
+        if request.args.get('prefer_prefetch') == '1':
+            local = pull_from_prefetch(currentDirectory)
+            if local is not None:
+                return jsonify(local)
+        
+        result = git_process.run_git(['-C', currentDirectory, 'pull'])
+        stdout, stderr = result.stdout, result.stderr
         
         # Git sometimes outputs information to stderr even on success
         stderr_text = stderr.decode('utf-8') if stderr else ""
@@ -452,7 +861,98 @@ def pull_changes():
         app.logger.error(f"Error in pull_changes: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/ahead-behind', methods=['GET'])
+@admission_controlled('read')
+def ahead_behind():
+    """Get ahead/behind counts for the current branch from already-fetched refs"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        branch, upstream = prefetch.get_upstream(currentDirectory)
+        if not upstream:
+            return jsonify({"success": True, "branch": branch, "upstream": None})
+        
+        # Prefer the prefetched ref only while it contains the remote-tracking branch;
+        # after a push or a regular fetch the remote-tracking branch is the newer one
+        fetched_at = prefetcher.fetched_at(currentDirectory)
+        prefetch_ref = prefetch.newer_prefetch_ref(currentDirectory, upstream) if fetched_at else None
+        if prefetch_ref:
+            ref, source = prefetch_ref, 'prefetch'
+        else:
+            ref, source, fetched_at = upstream, 'remote-tracking', None
+        
+        ahead, behind = prefetch.ahead_behind(currentDirectory, ref)
+        
+        return jsonify({
+            "success": True,
+            "branch": branch,
+            "upstream": upstream,
+            "ahead": ahead,
+            "behind": behind,
+            "source": source,
+            "fetched_at": fetched_at
+        })
+    except Exception as e:
+        logger.error(f"Exception in ahead-behind: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/prefetch', methods=['GET', 'POST'])
+def prefetch_status():
+    """Get prefetch freshness per repository, or change the prefetch settings"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            try:
+                prefetcher.configure(data.get('enabled'), data.get('interval'))
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "error": "interval must be a number of seconds"}), 400
+        return jsonify({"success": True, **prefetcher.snapshot()})
+    except Exception as e:
+        logger.error(f"Exception in prefetch status: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/prefetch/run', methods=['POST'])
+def prefetch_run():
+    """Prefetch a repository (default: the current one) now"""
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        data = request.get_json(silent=True) or {}
+        directory = data.get('directory', '').strip() or currentDirectory
+        
+        if not directory or not os.path.isdir(directory):
+            return jsonify({"success": False, "error": "No valid directory set"}), 400
+        
+        try:
+            state = prefetcher.prefetch(directory, priority=admission.INTERACTIVE)
+        except admission.Overloaded as e:
+            return overloaded_response(e)
+        if state.get('error'):
+            return jsonify({"success": False, "error": state['error'], **state})
+        return jsonify({"success": True, **state})
+    except Exception as e:
+        logger.error(f"Exception in prefetch run: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/log', methods=['GET'])
+# Relative dates ("5 minutes ago") change with time alone, so the log is validated by its body
+@conditional_response(lambda: None)
+@admission_controlled('read')
 def log():
     global currentDirectory, isProcessing
     
@@ -472,38 +972,121 @@ def log():
                 'error': 'Git is not available on your system. Please install Git or set the correct path.'
             })
             
-        # Change to the directory
-        os.chdir(currentDirectory)
+        limit = max(1, min(request.args.get('limit', 20, type=int), 1000))
         
-        # Run git log
-        process = subprocess.Popen(['git', 'log', '--pretty=format:%h|%an|%ar|%s', '-n', '20'], 
-                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        # Parsed commits are cached until a ref moves; relative dates are recomputed on every call
+        commits = Repository(currentDirectory).log(limit)
         
-        output_text = stdout.decode('utf-8', errors='replace')
+        return api_response({"success": True, "commits": commits, "directory": currentDirectory}, items_key='commits')
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        isProcessing = False
+
+@app.route('/blame', methods=['GET'])
+@admission_controlled('read')
+def blame():
+    """Stream line-range attributions for a file as newline-delimited JSON"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        path = request.args.get('path', '').strip().replace('\\', '/').lstrip('/')
+        rev = request.args.get('rev', 'HEAD').strip() or 'HEAD'
+        stream = request.args.get('stream', '1') != '0'
         
-        if not output_text:
-            return jsonify({"success": True, "commits": [], "directory": currentDirectory})
+        if not path:
+            return jsonify({"success": False, "error": "File path is required"}), 400
         
-        # Parse the log output
-        commits = []
-        for line in output_text.split('\n'):
-            if line:
-                parts = line.split('|')
-                if len(parts) == 4:
-                    commit = {
-                        'hash': parts[0],
-                        'author': parts[1],
-                        'date': parts[2],
-                        'message': parts[3]
-                    }
-                    commits.append(commit)
+        directory = currentDirectory
+        commit_id, blob_id, error = git_blame.resolve_blame_target(directory, path, rev)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
         
-        return jsonify({"success": True, "commits": commits, "directory": currentDirectory})
+        cached = git_blame.get_cached_blame(commit_id, blob_id, path)
+        
+        if not stream:
+            ranges = cached if cached is not None else list(git_blame.stream_blame(directory, commit_id, blob_id, path))
+            return jsonify({
+                "success": True,
+                "commit": commit_id,
+                "blob": blob_id,
+                "path": path,
+                "cached": cached is not None,
+                "ranges": ranges
+            })
+        
+        def generate():
+            yield json.dumps({"type": "header", "commit": commit_id, "blob": blob_id,
+                              "path": path, "cached": cached is not None}) + '\n'
+            count = 0
+            try:
+                ranges = cached if cached is not None else git_blame.stream_blame(directory, commit_id, blob_id, path)
+                for entry in ranges:
+                    count += 1
+                    yield json.dumps(dict(entry, type="range")) + '\n'
+            except Exception as e:
+                logger.error(f"Error streaming blame for {path}: {str(e)}")
+                yield json.dumps({"type": "error", "error": str(e)}) + '\n'
+                return
+            yield json.dumps({"type": "done", "ranges": count}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     except Exception as e:
+        logger.error(f"Exception in blame: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/graph', methods=['GET'])
+@admission_controlled('read')
+def graph():
+    """Get lane/column layout and edges for a window of the commit graph"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        ref = request.args.get('ref', 'HEAD').strip() or 'HEAD'
+        try:
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = min(1000, max(1, int(request.args.get('limit', 100))))
+        except ValueError:
+            return jsonify({"success": False, "error": "offset and limit must be integers"}), 400
+        
+        try:
+            layout = commit_graph.get_layout(currentDirectory, ref)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        rows, has_more = layout.window(offset, limit)
+        
+        return jsonify({
+            "success": True,
+            "ref": ref,
+            "tip": layout.tip,
+            "offset": offset,
+            "rows": rows,
+            "has_more": has_more
+        })
+    except Exception as e:
+        logger.error(f"Exception in graph: {str(e)}")
+        traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
-    finally:
-        isProcessing = False
 
 @app.route('/switch-repository', methods=['POST'])
 def switch_repository():
@@ -566,7 +1149,282 @@ def switch_repository():
     finally:
         isProcessing = False
 
+@app.route('/clone', methods=['GET', 'POST'])
+def clone_repository():
+    """Start a clone in the background (POST) or list clone jobs (GET)
+
+    Accepts url, destination, and optionally filter (e.g. "blob:none"), depth,
+    branch and sparse (a list of cone directories; [] checks out only the top
+    level). Progress is read from /clone/<id>/events.
+    """
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        if request.method == 'GET':
+            return jsonify({"success": True, "jobs": clone_jobs.list_jobs()})
+        
+        data = request.get_json(silent=True) or {}
+        url = data.get('url', '').strip()
+        destination = data.get('destination', '').strip()
+        blob_filter = data.get('filter') or None
+        sparse = data.get('sparse')
+        
+        if not url or url.startswith('-'):
+            return jsonify({"success": False, "error": "A repository URL is required"}), 400
+        
+        error = clone_jobs.validate_destination(destination)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
+        
+        if blob_filter and not clone_jobs.FILTER_PATTERN.match(blob_filter):
+            return jsonify({"success": False, "error": f"Unsupported filter: {blob_filter}"}), 400
+        
+        if sparse is not None and (not isinstance(sparse, list) or not all(isinstance(p, str) for p in sparse)):
+            return jsonify({"success": False, "error": "sparse must be a list of directories"}), 400
+        
+        try:
+            depth = int(data['depth']) if data.get('depth') else None
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "depth must be a number"}), 400
+        
+        job = clone_jobs.start_clone(url, destination, blob_filter=blob_filter, depth=depth,
+                                     branch=data.get('branch') or None, sparse=sparse,
+                                     on_complete=lambda job: save_repository(job.destination))
+        logger.info(f"Started {job.job_id}: {url} -> {destination}")
+        return jsonify({"success": True, "job": job.describe()}), 202
+    except Exception as e:
+        logger.error(f"Exception in clone: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/clone/<job_id>', methods=['GET'])
+def clone_status(job_id):
+    job = clone_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No clone job {job_id}"}), 404
+    return jsonify({"success": True, "job": job.describe()})
+
+@app.route('/clone/<job_id>/events', methods=['GET'])
+def clone_events(job_id):
+    """Stream a clone's progress as NDJSON; ?from=N resumes after the first N events"""
+    job = clone_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No clone job {job_id}"}), 404
+    start = request.args.get('from', 0, type=int)
+    
+    def generate():
+        for event in job.iter_events(start, timeout=15):
+            yield serializers.dumps_json(event) + b'\n'
+    
+    return Response(generate(), mimetype=serializers.NDJSON_MIMETYPE)
+
+@app.route('/clone/<job_id>/cancel', methods=['POST'])
+def clone_cancel(job_id):
+    job = clone_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No clone job {job_id}"}), 404
+    if job.finished:
+        return jsonify({"success": False, "error": f"Clone already {job.state}"}), 409
+    job.cancel()
+    return jsonify({"success": True, "job": job.describe()})
+
+@app.route('/sparse-checkout', methods=['GET', 'POST'])
+@admission_controlled()
+def sparse_checkout():
+    """Show the sparse-checkout cone, or widen ("add"), narrow ("set") or disable it"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        if request.method == 'GET':
+            return jsonify({"success": True, **clone_jobs.get_sparse_checkout(currentDirectory)})
+        
+        data = request.get_json(silent=True) or {}
+        patterns = data.get('patterns') or []
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            return jsonify({"success": False, "error": "patterns must be a list of directories"}), 400
+        
+        try:
+            result = clone_jobs.update_sparse_checkout(currentDirectory, data.get('action', 'add'), patterns)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify({"success": True, **result})
+    except Exception as e:
+        logger.error(f"Exception in sparse checkout: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/analyze', methods=['GET', 'POST'])
+def analyze_repository():
+    """Start a size analysis of the current repository (POST) or list analyses (GET)
+
+    Accepts top (how many blobs and directories to report) and depth (how many
+    path components directories are summed to). Results are read from
+    /analyze/<id>/events as they are found; an analysis of an unchanged pack
+    set is answered from the cache.
+    """
+    global currentDirectory
+    
+    try:
+        if request.method == 'GET':
+            return jsonify({"success": True, "jobs": repo_analyzer.list_jobs(), "cache": repo_analyzer.cache_stats()})
+        
+        if not currentDirectory:
+            return jsonify({"success": False, "error": "No directory set"}), 400
+        
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            top = int(data.get('top') or repo_analyzer.DEFAULT_TOP)
+            depth = int(data.get('depth') or repo_analyzer.DEFAULT_DIRECTORY_DEPTH)
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "top and depth must be numbers"}), 400
+        if not 0 < top <= repo_analyzer.MAX_TOP or not 0 < depth <= repo_analyzer.MAX_DIRECTORY_DEPTH:
+            return jsonify({"success": False, "error": f"top must be 1-{repo_analyzer.MAX_TOP} and "
+                                                        f"depth 1-{repo_analyzer.MAX_DIRECTORY_DEPTH}"}), 400
+        
+        job = repo_analyzer.start_analysis(currentDirectory, top=top, depth=depth)
+        return jsonify({"success": True, "job": job.describe()}), 202
+    except Exception as e:
+        logger.error(f"Exception in analyze: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/analyze/<job_id>', methods=['GET'])
+def analyze_status(job_id):
+    """An analysis and, once it has finished, its full result"""
+    job = repo_analyzer.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No analysis {job_id}"}), 404
+    return jsonify({"success": True, "job": job.describe(include_result=True)})
+
+@app.route('/analyze/<job_id>/events', methods=['GET'])
+def analyze_events(job_id):
+    """Stream an analysis as NDJSON; ?from=N resumes after the first N events"""
+    job = repo_analyzer.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No analysis {job_id}"}), 404
+    start = request.args.get('from', 0, type=int)
+    
+    def generate():
+        for event in job.iter_events(start, timeout=15):
+            yield serializers.dumps_json(event) + b'\n'
+    
+    return Response(generate(), mimetype=serializers.NDJSON_MIMETYPE)
+
+@app.route('/analyze/<job_id>/cancel', methods=['POST'])
+def analyze_cancel(job_id):
+    job = repo_analyzer.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"No analysis {job_id}"}), 404
+    if job.finished:
+        return jsonify({"success": False, "error": f"Analysis already {job.state}"}), 409
+    job.cancel()
+    return jsonify({"success": True, "job": job.describe()})
+
+@app.route('/analytics', methods=['GET'])
+@admission_controlled('read', priority=admission.BACKGROUND)
+def history_analytics():
+    """Commits per author over time, the files with the most churn, and lines added/removed per period
+
+    Query parameters: ref (default HEAD), period (day, week, month or year),
+    top, and since/until (YYYY-MM-DD) to limit the timelines. The first call
+    for a ref reads its whole history; later ones only read new commits.
+    """
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        ref = request.args.get('ref', 'HEAD').strip() or 'HEAD'
+        period = request.args.get('period', 'month')
+        top = request.args.get('top', 20, type=int)
+        since = request.args.get('since') or None
+        until = request.args.get('until') or None
+        if ref.startswith('-'):
+            return jsonify({"success": False, "error": f"Invalid ref: {ref}"}), 400
+        if period not in history_stats.PERIODS:
+            return jsonify({"success": False, "error": f"period must be one of {', '.join(history_stats.PERIODS)}"}), 400
+        if not top or top < 1:
+            return jsonify({"success": False, "error": "top must be a positive number"}), 400
+        
+        try:
+            summary = history_stats.get_summary(currentDirectory, ref, period=period, top=top, since=since, until=until)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 404
+        return jsonify({"success": True, **summary})
+    except Exception as e:
+        logger.error(f"Exception in analytics: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/merge-preview', methods=['GET'])
+@admission_controlled('read')
+def merge_preview_branches():
+    """Predict whether merging branches into the current one would conflict, without touching the work tree
+
+    Pass one or more ?branch= names; without any, the upstream and every other
+    local branch are checked. Each result says up_to_date, fast_forward,
+    clean, conflicts (with the paths) or error.
+    """
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        targets = [name.strip() for name in request.args.getlist('branch') if name.strip()]
+        if any(name.startswith('-') or '\n' in name for name in targets):
+            return jsonify({"success": False, "error": "Invalid branch name"}), 400
+        if len(targets) > merge_preview.MAX_MERGE_TARGETS:
+            return jsonify({"success": False, "error": f"At most {merge_preview.MAX_MERGE_TARGETS} branches per request"}), 400
+        if not targets:
+            targets = merge_preview.default_targets(currentDirectory)
+        
+        try:
+            preview = merge_preview.preview_merges(currentDirectory, targets)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify({"success": True, **preview})
+    except Exception as e:
+        logger.error(f"Exception in merge preview: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/git-init', methods=['POST'])
+@admission_controlled('write')
 def git_init():
     """Initialize a new Git repository in the current directory"""
     global currentDirectory, isProcessing
@@ -584,9 +1442,6 @@ def git_init():
                 'error': 'Git is not available on your system. Please install Git or set the correct path.'
             })
             
-        # Change to the directory
-        os.chdir(currentDirectory)
-        
         # Check if it's already a git repository
         try:
             if git_available:
@@ -603,8 +1458,8 @@ def git_init():
             pass
         
         # Run git init
-        process = subprocess.Popen(['git', 'init'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        process = git_process.run_git(['init'], cwd=currentDirectory)
+        stdout, stderr = process.stdout, process.stderr
         
         output_text = stdout.decode('utf-8', errors='replace')
         error_text = stderr.decode('utf-8', errors='replace')
@@ -627,6 +1482,7 @@ def git_init():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/git-remote-add', methods=['POST'])
+@admission_controlled('write')
 def git_remote_add():
     """Add a remote repository"""
     global currentDirectory, isProcessing
@@ -651,13 +1507,9 @@ def git_remote_add():
         if not remote_name or not remote_url:
             return jsonify({"success": False, "error": "Remote name and URL are required"}), 400
         
-        # Change to the directory
-        os.chdir(currentDirectory)
-        
         # Run git remote add
-        process = subprocess.Popen(['git', 'remote', 'add', remote_name, remote_url], 
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        process = git_process.run_git(['remote', 'add', remote_name, remote_url], cwd=currentDirectory)
+        stdout, stderr = process.stdout, process.stderr
         
         error_text = stderr.decode('utf-8', errors='replace')
         
@@ -676,6 +1528,8 @@ def git_remote_add():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/git-remotes', methods=['GET'])
+@conditional_response(remotes_fingerprint)
+@admission_controlled('read')
 def git_remotes():
     """Get list of remote repositories"""
     global currentDirectory, isProcessing
@@ -693,32 +1547,8 @@ def git_remotes():
                 'error': 'Git is not available on your system. Please install Git or set the correct path.'
             })
             
-        # Change to the directory
-        os.chdir(currentDirectory)
-        
-        # Run git remote -v
-        process = subprocess.Popen(['git', 'remote', '-v'], 
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
-        
-        output_text = stdout.decode('utf-8', errors='replace')
-        
-        # Parse remote output
-        remotes = []
-        for line in output_text.split('\n'):
-            if not line.strip():
-                continue
-                
-            parts = line.split()
-            if len(parts) >= 2:
-                name = parts[0]
-                url = parts[1]
-                # Check if remote already exists in the list
-                if not any(r['name'] == name for r in remotes):
-                    remotes.append({
-                        'name': name,
-                        'url': url
-                    })
+        # Cached until the repository config changes
+        remotes = Repository(currentDirectory).remotes()
         
         return jsonify({
             "success": True,
@@ -730,6 +1560,8 @@ def git_remotes():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/git-branches', methods=['GET'])
+@conditional_response(refs_fingerprint)
+@admission_controlled('read')
 def git_branches():
     """Get list of branches in the repository"""
     global currentDirectory, isProcessing
@@ -747,44 +1579,27 @@ def git_branches():
                 'error': 'Git is not available on your system. Please install Git or set the correct path.'
             })
             
-        # Change to the directory
-        os.chdir(currentDirectory)
+        # Cached until a ref moves
+        branches = Repository(currentDirectory).branches()
         
-        # Run git branch
-        process = subprocess.Popen(['git', 'branch', '--all'], 
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
-        
-        output_text = stdout.decode('utf-8', errors='replace')
-        
-        # Parse branch output
-        branches = []
-        current_branch = None
-        
-        for line in output_text.split('\n'):
-            if not line.strip():
-                continue
-                
-            is_current = line.startswith('*')
-            branch_name = line[2:].strip() if is_current else line.strip()
-            
-            if is_current:
-                current_branch = branch_name
-                
-            if branch_name and branch_name not in branches:
-                branches.append(branch_name)
+        # Branch -> directory for branches checked out in a worktree, so the UI can show where they live
+        branch_worktrees = {wt['branch']: wt['path'] for wt in worktrees.list_worktrees(currentDirectory) if wt.get('branch')}
         
-        return jsonify({
+        return api_response({
             "success": True,
-            "branches": branches,
-            "current_branch": current_branch
-        })
+            "branches": branches['branches'],
+            "current_branch": branches['current'],
+            "checked_out_in_worktree": branches['worktrees'],
+            "worktrees": branch_worktrees,
+            "worktree_mode": worktrees.is_enabled(currentDirectory)
+        }, items_key='branches')
     except Exception as e:
         logger.error(f"Exception in git branches: {str(e)}")
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/git-branch-create', methods=['POST'])
+@admission_controlled('write')
 def git_branch_create():
     """Create a new branch"""
     global currentDirectory, isProcessing
@@ -808,13 +1623,9 @@ def git_branch_create():
         if not branch_name:
             return jsonify({"success": False, "error": "Branch name is required"}), 400
         
-        # Change to the directory
-        os.chdir(currentDirectory)
-        
         # Run git branch
-        process = subprocess.Popen(['git', 'branch', branch_name], 
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        process = git_process.run_git(['branch', branch_name], cwd=currentDirectory)
+        stdout, stderr = process.stdout, process.stderr
         
         error_text = stderr.decode('utf-8', errors='replace')
         
@@ -832,6 +1643,7 @@ def git_branch_create():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/git-checkout', methods=['POST'])
+@admission_controlled('write')
 def git_checkout():
     """Checkout a branch"""
     global currentDirectory, isProcessing
@@ -855,13 +1667,30 @@ def git_checkout():
         if not branch_name:
             return jsonify({"success": False, "error": "Branch name is required"}), 400
         
-        # Change to the directory
-        os.chdir(currentDirectory)
+        # In worktree mode each branch keeps its own directory and switching just moves there
+        mode = data.get('mode') or ('worktree' if worktrees.is_enabled(currentDirectory) else 'checkout')
+        if mode == 'worktree':
+            try:
+                result = worktrees.switch(currentDirectory, branch_name)
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            except RuntimeError as e:
+                logger.error(f"Error switching worktree: {str(e)}")
+                return jsonify({"success": False, "error": str(e)}), 500
+            
+            currentDirectory = result['path']
+            save_config()
+            action = 'Created worktree for' if result['created'] else 'Switched to worktree for'
+            return jsonify({
+                "success": True,
+                "message": f"{action} '{result['branch']}' at {result['path']}",
+                "directory": result['path'],
+                "worktree": result
+            })
         
         # Run git checkout
-        process = subprocess.Popen(['git', 'checkout', branch_name], 
-                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
+        process = git_process.run_git(['checkout', branch_name], cwd=currentDirectory)
+        stdout, stderr = process.stdout, process.stderr
         
         output_text = stdout.decode('utf-8', errors='replace')
         error_text = stderr.decode('utf-8', errors='replace')
@@ -879,6 +1708,401 @@ def git_checkout():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/worktrees', methods=['GET', 'POST'])
+@admission_controlled()
+def worktree_settings():
+    """List the repository's worktrees, or turn worktree mode on/off and set its limit"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            try:
+                worktrees.configure(currentDirectory, data.get('enabled'), data.get('limit'))
+            except (TypeError, ValueError) as e:
+                return jsonify({"success": False, "error": f"Invalid setting: {str(e)}"}), 400
+        
+        return jsonify({"success": True, "current_directory": currentDirectory, **worktrees.describe(currentDirectory)})
+    except Exception as e:
+        logger.error(f"Exception in worktree settings: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/worktrees/prune', methods=['POST'])
+@admission_controlled('write')
+def worktree_prune():
+    """Remove clean managed worktrees that have not been used recently"""
+    global currentDirectory
+    
+    if not currentDirectory:
+        return jsonify({"success": False, "error": "No directory set"}), 400
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        max_idle = float(data.get('max_idle', worktrees.WORKTREE_MAX_IDLE))
+        evicted = worktrees.prune(currentDirectory, max_idle=max_idle)
+        return jsonify({"success": True, "removed": evicted})
+    except Exception as e:
+        logger.error(f"Exception in worktree prune: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# Operations /batch can run: name -> (route, method, changes the repository)
+BATCH_OPERATIONS = {
+    'status': ('/status', 'GET', False),
+    'log': ('/log', 'GET', False),
+    'branches': ('/git-branches', 'GET', False),
+    'remotes': ('/git-remotes', 'GET', False),
+    'ahead-behind': ('/ahead-behind', 'GET', False),
+    'add': ('/add', 'POST', True),
+    'commit': ('/commit', 'POST', True),
+    'push': ('/push', 'POST', True),
+    'pull': ('/pull', 'POST', True),
+    'branch-create': ('/git-branch-create', 'POST', True),
+    'checkout': ('/git-checkout', 'POST', True)
+}
+
+# One batch at a time, so steps never interleave with another batch on the same repository
+batch_lock = threading.Lock()
+
+# Function to run an operation through its normal route handler without an HTTP round trip
+def call_route(op, args, accept=None, operations=BATCH_OPERATIONS):
+    path, method, _ = operations[op]
+    with app.test_request_context(path, method=method, query_string=args,
+                                  json=args if method == 'POST' else None,
+                                  headers={'Accept': accept} if accept else None):
+        return app.make_response(app.view_functions[request.url_rule.endpoint](**request.view_args))
+
+# Function to run one batch step and return (status code, JSON body)
+def run_batch_step(op, args):
+    response = call_route(op, args)
+    body = response.get_json(silent=True)
+    if body is None:
+        body = {'success': False, 'error': f'{op} returned no JSON'}
+    return response.status_code, body
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Run an ordered list of operations in one request, e.g. add -> commit -> push -> status
+
+    Each step is {"op": ..., "args": {...}} with an optional "id". By default a
+    step only runs if every earlier step succeeded; "depends_on": [ids] limits
+    that to specific steps and "always": true runs it regardless (useful for a
+    final status refresh). Identical read-only steps are answered from the
+    first result until a step changes the repository.
+    """
+    global currentDirectory
+    
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        data = request.get_json(silent=True) or {}
+        steps = data.get('steps')
+        if not isinstance(steps, list) or not steps:
+            return jsonify({"success": False, "error": "No steps provided"}), 400
+        
+        seen_ids = set()
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict) or step.get('op') not in BATCH_OPERATIONS:
+                return jsonify({"success": False, "error": f"Step {index}: unknown operation {step.get('op') if isinstance(step, dict) else step!r}"}), 400
+            step_id = str(step.get('id', index))
+            if step_id in seen_ids:
+                return jsonify({"success": False, "error": f"Step {index}: duplicate step id {step_id}"}), 400
+            if not isinstance(step.get('depends_on', []), list):
+                return jsonify({"success": False, "error": f"Step {step_id}: depends_on must be a list of step ids"}), 400
+            for dependency in step.get('depends_on', []):
+                if str(dependency) not in seen_ids:
+                    return jsonify({"success": False, "error": f"Step {step_id} depends on {dependency}, which does not come before it"}), 400
+            seen_ids.add(step_id)
+        
+        if not currentDirectory:
+            return jsonify({"success": False, "error": "No directory set"}), 400
+        
+        if not batch_lock.acquire(timeout=30):
+            return jsonify({"success": False, "error": "Another batch is still running"}), 409
+        
+        try:
+            directory = currentDirectory
+            results = []
+            outcomes = {}
+            read_cache = {}
+            start = time.time()
+            
+            for index, step in enumerate(steps):
+                step_id = str(step.get('id', index))
+                op = step['op']
+                args = step.get('args') or {}
+                result = {'id': step_id, 'op': op}
+                
+                if 'depends_on' in step:
+                    blocked = [str(d) for d in step['depends_on'] if not outcomes.get(str(d))]
+                else:
+                    blocked = [sid for sid, ok in outcomes.items() if not ok]
+                
+                if currentDirectory != directory:
+                    result.update(status='skipped', reason='The current repository changed during the batch')
+                elif blocked and not step.get('always'):
+                    result.update(status='skipped', reason=f"Depends on failed or skipped step(s): {', '.join(blocked)}")
+                else:
+                    mutating = BATCH_OPERATIONS[op][2]
+                    cache_key = (op, json.dumps(args, sort_keys=True))
+                    step_start = time.time()
+                    if not mutating and cache_key in read_cache:
+                        status_code, body = read_cache[cache_key]
+                        result['cached'] = True
+                    else:
+                        status_code, body = run_batch_step(op, args)
+                        if mutating:
+                            read_cache.clear()
+                        else:
+                            read_cache[cache_key] = (status_code, body)
+                    ok = status_code < 400 and bool(body.get('success'))
+                    result.update(status='ok' if ok else 'failed', http_status=status_code, result=body,
+                                  duration=round(time.time() - step_start, 3))
+                
+                outcomes[step_id] = result['status'] == 'ok'
+                results.append(result)
+            
+            return jsonify({
+                "success": all(outcomes.values()),
+                "directory": directory,
+                "steps": results,
+                "elapsed": round(time.time() - start, 3)
+            })
+        finally:
+            batch_lock.release()
+    except Exception as e:
+        logger.error(f"Exception in batch: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# Operations the WebSocket channel can run: everything /batch can, plus the streaming ones
+CHANNEL_OPERATIONS = {
+    **BATCH_OPERATIONS,
+    'blame': ('/blame', 'GET', False),
+    'graph': ('/graph', 'GET', False),
+    'bulk-fetch': ('/bulk/fetch', 'POST', False),
+    'bulk-status': ('/bulk/status', 'POST', False),
+    'bulk-pull': ('/bulk/pull', 'POST', True)
+}
+
+# Function to describe the current repository as {part: fingerprint} for change events
+def repository_state():
+    directory = currentDirectory
+    if not directory:
+        return None, {}
+    watcher = status_accel.get_watcher(directory)
+    return directory, {
+        'head': gitdir.repo_fingerprint(directory),
+        'index': gitdir.repo_fingerprint(directory, index=True),
+        'refs': gitdir.repo_fingerprint(directory, refs=True),
+        'config': gitdir.repo_fingerprint(directory, config=True),
+        'worktree': f'{watcher.watcher_id}:{watcher.sequence}' if watcher else None
+    }
+
+repo_events = ws_channel.RepoEvents(repository_state)
+
+# Function to run a channel command; streamed responses come back as an iterator of records
+def dispatch_channel_command(op, args, stream=False):
+    if op not in CHANNEL_OPERATIONS:
+        return 400, {'success': False, 'error': f'Unknown operation: {op}'}, None
+    _, _, mutating = CHANNEL_OPERATIONS[op]
+    
+    # Commands that change the repository queue behind each other and behind /batch
+    lock = batch_lock if mutating else None
+    if lock:
+        lock.acquire()
+    try:
+        accept = serializers.NDJSON_MIMETYPE if stream else None
+        response = call_route(op, args, accept=accept, operations=CHANNEL_OPERATIONS)
+        if response.mimetype != serializers.NDJSON_MIMETYPE:
+            return response.status_code, response.get_json(silent=True), None
+        
+        def chunks():
+            try:
+                buffer = b''
+                for data in response.response:
+                    buffer += data.encode('utf-8') if isinstance(data, str) else data
+                    *lines, buffer = buffer.split(b'\n')
+                    for line in lines:
+                        if line.strip():
+                            yield json.loads(line)
+            finally:
+                response.close()
+        
+        if not lock:
+            return response.status_code, None, chunks()
+        # Hold the lock until a streamed mutating command has finished
+        return response.status_code, None, list(chunks())
+    finally:
+        if lock:
+            lock.release()
+
+if Sock is not None:
+    sock = Sock(app)
+    
+    @sock.route('/channel')
+    def command_channel(ws):
+        """Persistent channel: multiplexed commands, streamed output and repository change events"""
+        channel = ws_channel.CommandChannel(ws, dispatch_channel_command, uuid.uuid4().hex[:8], events=repo_events)
+        logger.info(f"Channel {channel.connection_id} opened")
+        channel.serve()
+        logger.info(f"Channel {channel.connection_id} closed")
+
+@app.route('/channel-info', methods=['GET'])
+def channel_info():
+    """Tell the front-end whether it can open the WebSocket channel"""
+    return jsonify({"success": True, "available": Sock is not None,
+                    "operations": sorted(CHANNEL_OPERATIONS),
+                    "max_in_flight": ws_channel.MAX_IN_FLIGHT})
+
+# Not admission_controlled: the run takes a background slot per repository itself
+@app.route('/bulk/<operation>', methods=['POST'])
+def bulk_operation(operation):
+    """Run fetch, pull or status across saved repositories, streaming each result"""
+    try:
+        if not git_executable_available:
+            return jsonify({
+                'success': False, 
+                'error': 'Git is not available on your system. Please install Git or set the correct path.'
+            })
+        
+        if operation not in bulk_ops.BULK_OPERATIONS:
+            return jsonify({"success": False, "error": f"Unknown bulk operation: {operation}"}), 404
+        
+        data = request.get_json(silent=True) or {}
+        repositories = data.get('repositories') or get_saved_repositories()
+        policy = data.get('policy', 'continue')
+        try:
+            concurrency = min(bulk_ops.MAX_BULK_CONCURRENCY, max(1, int(data.get('concurrency', bulk_ops.DEFAULT_BULK_CONCURRENCY))))
+            timeout = max(1, float(data.get('timeout', bulk_ops.DEFAULT_BULK_TIMEOUT)))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "concurrency and timeout must be numbers"}), 400
+        
+        if policy not in ('continue', 'fail-fast'):
+            return jsonify({"success": False, "error": "policy must be 'continue' or 'fail-fast'"}), 400
+        
+        run = bulk_ops.BulkRun(operation, repositories, concurrency, timeout, policy == 'fail-fast')
+        
+        def generate():
+            start = time.time()
+            counts = {'succeeded': 0, 'failed': 0, 'cancelled': 0}
+            for result in run.results():
+                if result['success']:
+                    counts['succeeded'] += 1
+                elif result.get('cancelled'):
+                    counts['cancelled'] += 1
+                else:
+                    counts['failed'] += 1
+                yield json.dumps(dict(result, type="result")) + '\n'
+            yield json.dumps({
+                "type": "summary",
+                "operation": operation,
+                "total": len(run.directories),
+                "concurrency": run.concurrency,
+                **counts,
+                "elapsed": round(time.time() - start, 3)
+            }) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Exception in bulk {operation}: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/maintenance', methods=['GET'])
+def maintenance_status():
+    """Get repository health and the results of background maintenance"""
+    try:
+        return jsonify({"success": True, **maintenance_scheduler.snapshot()})
+    except Exception as e:
+        logger.error(f"Exception in maintenance status: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/maintenance/run', methods=['POST'])
+def maintenance_run():
+    """Queue a repository (default: the current one) for maintenance right away"""
+    try:
+        data = request.get_json(silent=True) or {}
+        directory = data.get('directory', '').strip() or currentDirectory
+        
+        if not directory:
+            return jsonify({"success": False, "error": "No directory set"}), 400
+        
+        if gitdir.find_git_dir(directory) is None:
+            return jsonify({"success": False, "error": f"Not a git repository: {directory}"}), 400
+        
+        maintenance_scheduler.request_run(directory)
+        return jsonify({"success": True, "message": f"Maintenance queued for {directory}"})
+    except Exception as e:
+        logger.error(f"Exception in maintenance run: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/operations', methods=['GET'])
+def list_operations():
+    """List git processes that are currently running"""
+    try:
+        return jsonify({"success": True, "operations": git_process.list_operations(),
+                        "timeouts": git_process.OPERATION_TIMEOUTS})
+    except Exception as e:
+        logger.error(f"Exception in list operations: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/operations/<operation_id>/cancel', methods=['POST'])
+def cancel_operation(operation_id):
+    """Stop every git process started for a request, including its child processes"""
+    try:
+        count = git_process.cancel(operation_id)
+        if not count:
+            return jsonify({"success": False, "error": f"No running operation {operation_id}"}), 404
+        logger.info(f"Cancelled operation {operation_id} ({count} process(es))")
+        return jsonify({"success": True, "cancelled": count})
+    except Exception as e:
+        logger.error(f"Exception in cancel operation: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/operations/timeouts', methods=['POST'])
+def set_operation_timeouts():
+    """Change the deadline in seconds for git subcommands, e.g. {"push": 600}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        for name, seconds in data.items():
+            seconds = float(seconds)
+            if seconds <= 0:
+                return jsonify({"success": False, "error": f"Timeout for {name} must be positive"}), 400
+            git_process.OPERATION_TIMEOUTS[name] = seconds
+        return jsonify({"success": True, "timeouts": git_process.OPERATION_TIMEOUTS})
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid timeout: {str(e)}"}), 400
+    except Exception as e:
+        logger.error(f"Exception in set operation timeouts: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Operation counters, overdue or leaked processes and thread counts"""
+    try:
+        return jsonify({"success": True, **git_process.get_metrics(), "result_cache": cache_stats(),
+                        "merge_preview_cache": merge_preview.cache_stats(), "assets": asset_manifest.describe(),
+                        "admission": admission.controller.snapshot(),
+                        "graph_streams": commit_graph.open_stream_count()})
+    except Exception as e:
+        logger.error(f"Exception in metrics: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
     """Shutdown the server"""
@@ -928,6 +2152,11 @@ if __name__ == '__main__':
     # Start browser opening in a separate thread
     threading.Thread(target=open_browser).start()
     
+    # Start idle-time repository maintenance
+    if git_executable_available:
+        maintenance_scheduler.start()
+        prefetcher.start()
+    
     # Start the Flask app
     try:
         logger.info("Starting Flask server on http://127.0.0.1:5000")
@@ -1,12 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import sys
 
+# Bundle minified, fingerprinted assets; static/dist is then packaged with the rest of static
+sys.path.insert(0, SPECPATH)
+import build_assets
+build_assets.build(os.path.join(SPECPATH, 'static'))
 
 a = Analysis(
     ['app.py'],
-    pathex=[],
+    # lazygit_core, the git backend shared with the Tkinter client, sits one level up
+    pathex=[os.path.dirname(SPECPATH)],
     binaries=[],
     datas=[('templates', 'templates'), ('static', 'static'), ('config.json', '.'), ('repositories.json', '.')],
-    hiddenimports=[],
+    # Optional imports in serializers.py and http_cache.py, listed so the fast paths are always bundled
+    hiddenimports=['orjson', 'msgpack', 'brotli'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
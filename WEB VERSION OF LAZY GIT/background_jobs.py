@@ -0,0 +1,128 @@
+import abc
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import admission
+from lazygit_core import process as git_process
+
+# Finished jobs kept around so a client that reconnects can still read the outcome
+MAX_FINISHED_JOBS = 20
+
+_sequence = itertools.count(1)
+
+
+class BackgroundJob(abc.ABC):
+    """Work running on its own thread whose events can be streamed
+
+    Subclasses set `kind`, implement _run() and describe(), report progress
+    with _emit() and end with _finish(). git commands should be started with
+    the job id as their operation id so cancel() can stop them, and admission
+    slots taken with _admit() so a job cancelled while queued never starts.
+    """
+
+    kind = 'job'
+
+    def __init__(self):
+        self.job_id = f'{self.kind}-{next(_sequence)}'
+        self.state = 'queued'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.events = []
+        self.changed = threading.Condition()
+        self.thread = None
+        self.cancel_requested = threading.Event()
+
+    def _emit(self, event):
+        with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    def _finish(self):
+        with self.changed:
+            # Set together with the last event so a reader never sees "finished" without "done"
+            self.finished = time.time()
+            self.events.append({'type': 'done', **self.describe()})
+            self.changed.notify_all()
+
+    @abc.abstractmethod
+    def _run(self):
+        """Do the work on the job's thread; must end with _finish()"""
+
+    @abc.abstractmethod
+    def describe(self):
+        """A JSON-ready summary of the job, also sent as the final 'done' event"""
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=self.job_id, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_requested.set()
+        return git_process.cancel(self.job_id)
+
+    def _check_cancelled(self):
+        if self.cancel_requested.is_set():
+            raise git_process.OperationCancelled(f"{self.kind} {self.job_id} was cancelled")
+
+    @contextmanager
+    def _admit(self, kind, timeout):
+        """Hold a background admission slot; raises OperationCancelled if cancel() came first"""
+        try:
+            ticket = admission.controller.acquire(kind, admission.BACKGROUND, timeout=timeout,
+                                                  cancelled=self.cancel_requested)
+        except admission.AdmissionCancelled as e:
+            raise git_process.OperationCancelled(str(e)) from e
+        try:
+            self._check_cancelled()
+            yield ticket
+        finally:
+            admission.controller.release(ticket)
+
+    def iter_events(self, start=0, timeout=None):
+        """Yield events from index `start` as they arrive, until the job is done"""
+        index = start
+        while True:
+            with self.changed:
+                if index >= len(self.events) and self.finished is None:
+                    self.changed.wait(timeout)
+                events = self.events[index:]
+                index = len(self.events)
+                finished = self.finished is not None
+            if not events and not finished:
+                # Keep-alive so proxies and the client know the job is still going
+                yield {'type': 'heartbeat'}
+            yield from events
+            if finished:
+                return
+
+
+class JobRegistry:
+    """Jobs of one kind by id, forgetting the oldest finished ones"""
+
+    def __init__(self, max_finished=MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def add(self, job):
+        with self.lock:
+            finished = [j for j in self.jobs.values() if j.finished]
+            for old in sorted(finished, key=lambda j: j.finished)[:max(0, len(finished) - self.max_finished)]:
+                del self.jobs[old.job_id]
+            self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def find(self, predicate):
+        with self.lock:
+            return next((job for job in self.jobs.values() if predicate(job)), None)
+
+    def describe(self):
+        with self.lock:
+            return [job.describe() for job in self.jobs.values()]
@@ -0,0 +1,79 @@
+"""Compare encoding throughput of the response serializers on large payloads
+
+Builds a /log-shaped payload (100k commits by default) and a /git-branches
+shaped one, then times the stdlib json encoder Flask's jsonify uses, the
+fast JSON path (orjson when installed), MessagePack when installed, and
+NDJSON streaming.
+
+    python benchmarks/serialization.py --items 100000 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serializers  # noqa: E402
+
+
+def build_payloads(count):
+    commits = [{
+        'hash': f'{index * 2654435761 % (1 << 28):07x}',
+        'author': f'Author {index % 250}',
+        'date': f'{index % 59 + 1} minutes ago',
+        'message': f'Fix issue #{index} in module_{index % 97}.py — handle édge case'
+    } for index in range(count)]
+    branches = [f'remotes/origin/feature/topic-{index}' for index in range(count)]
+    return {
+        'log': {'success': True, 'commits': commits, 'directory': '/home/user/project'},
+        'branches': {'success': True, 'branches': branches, 'current_branch': 'main'}
+    }
+
+
+def stdlib_json(payload):
+    # What jsonify does with its default settings
+    return json.dumps(payload, indent=None, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def time_encoder(encode, payload, runs):
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = len(encode(payload))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100000, help='items per payload')
+    parser.add_argument('--runs', type=int, default=5, help='timed runs per encoder')
+    args = parser.parse_args()
+
+    encoders = [('json (jsonify)', stdlib_json)]
+    encoders.append(('fast json (orjson)' if serializers.orjson else 'fast json (stdlib fallback)', serializers.dumps_json))
+    if serializers.msgpack:
+        encoders.append(('msgpack', serializers.dumps_msgpack))
+    else:
+        print("msgpack is not installed; skipping MessagePack")
+
+    for name, payload in build_payloads(args.items).items():
+        items_key = 'commits' if name == 'log' else 'branches'
+        results = [(label, *time_encoder(encode, payload, args.runs)) for label, encode in encoders]
+        results.append(('ndjson stream', *time_encoder(
+            lambda p: b''.join(serializers.iter_ndjson(p, items_key)), payload, args.runs)))
+
+        baseline = results[0][1]
+        print(f"\n{name}: {args.items} items")
+        print(f"{'encoder':<30}{'median':>12}{'items/s':>14}{'size':>12}{'speedup':>10}")
+        for label, seconds, size in results:
+            print(f"{label:<30}{seconds * 1000:>9.1f} ms{args.items / seconds:>14,.0f}"
+                  f"{size / 1e6:>9.1f} MB{baseline / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
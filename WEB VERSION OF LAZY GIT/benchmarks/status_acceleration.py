@@ -0,0 +1,126 @@
+"""Compare `git status` latency before and after status acceleration
+
+Builds a synthetic repository (200k files by default), then times
+`git status --porcelain` with no acceleration, with the untracked cache,
+and with the untracked cache plus fsmonitor (the built-in daemon where git
+supports it, otherwise the LazyGit inotify hook served from this script).
+
+    python benchmarks/status_acceleration.py --files 200000 --runs 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import status_accel  # noqa: E402
+
+FILES_PER_DIRECTORY = 1000
+
+
+def git(directory, *args):
+    subprocess.run(['git', '-C', directory] + list(args), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_repository(directory, file_count):
+    git(directory, 'init', '-q')
+    git(directory, 'config', 'user.name', 'bench')
+    git(directory, 'config', 'user.email', 'bench@example.com')
+    for index in range(file_count):
+        subdirectory = os.path.join(directory, f'd{index // FILES_PER_DIRECTORY:04d}')
+        if index % FILES_PER_DIRECTORY == 0:
+            os.makedirs(subdirectory, exist_ok=True)
+        with open(os.path.join(subdirectory, f'f{index}.txt'), 'w') as f:
+            f.write(f'{index}\n')
+    git(directory, 'add', '-A')
+    git(directory, 'commit', '-q', '-m', 'synthetic')
+    # A few untracked files so the untracked cache has something to remember
+    for index in range(10):
+        with open(os.path.join(directory, f'untracked{index}.txt'), 'w') as f:
+            f.write('x\n')
+
+
+def time_status(directory, runs):
+    # One untimed run lets git refresh the index and write any new extensions
+    git(directory, 'status', '--porcelain')
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        git(directory, 'status', '--porcelain')
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def serve_fsmonitor():
+    """Stand-in for the Flask /fsmonitor route so the hook can be benchmarked alone"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            watcher = status_accel.get_watcher(query.get('repo', [''])[0])
+            if watcher is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = watcher.query(query.get('token', [''])[0])
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic repository')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='lazygit-status-bench-')
+    server = None
+    try:
+        print(f"Building {args.files} file repository in {directory}...")
+        build_repository(directory, args.files)
+
+        results = [('baseline', time_status(directory, args.runs))]
+
+        status_accel.enable_acceleration(directory, fsmonitor=False)
+        results.append(('untracked cache', time_status(directory, args.runs)))
+
+        server = serve_fsmonitor()
+        report = status_accel.enable_acceleration(directory, fsmonitor=True, port=server.server_address[1])
+        if report['fsmonitor']:
+            results.append((f"untracked cache + fsmonitor ({report['fsmonitor']})", time_status(directory, args.runs)))
+        else:
+            print("No fsmonitor available on this platform; skipping that run")
+
+        baseline = results[0][1]
+        print(f"\n{'configuration':<45}{'median status':>15}{'speedup':>10}")
+        for name, seconds in results:
+            print(f"{name:<45}{seconds * 1000:>12.1f} ms{baseline / seconds:>9.1f}x")
+    finally:
+        status_accel.stop_watcher(directory)
+        if server:
+            server.shutdown()
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+
+from lazygit_core import process as git_process
+
+# Number of finished blame results kept in memory
+BLAME_CACHE_SIZE = 64
+
+# Finished results keyed by (commit id, blob id, path), most recently used last
+_blame_cache = OrderedDict()
+_blame_cache_lock = threading.Lock()
+
+# Per-commit headers git only prints the first time a commit is seen
+BLAME_COMMIT_FIELDS = ('author', 'author-mail', 'author-time', 'author-tz', 'summary')
+
+
+def resolve_blame_target(directory, path, rev='HEAD'):
+    """Resolve a revision and file path to (commit id, blob id)
+
+    Returns (None, None, error) if either the revision or the file cannot be found.
+    """
+    path = path.replace('\\', '/').lstrip('/')
+    process = git_process.run_git(['-C', directory, 'rev-parse', f'{rev}^{{commit}}', f'{rev}:./{path}'])
+    stdout, stderr = process.stdout, process.stderr
+
+    if process.returncode != 0:
+        return None, None, stderr.decode('utf-8', errors='replace').strip()
+
+    ids = stdout.decode('utf-8', errors='replace').split()
+    if len(ids) != 2:
+        return None, None, f"Could not resolve {rev}:{path}"
+    return ids[0], ids[1], None
+
+
+def get_cached_blame(commit_id, blob_id, path):
+    """Return the cached ranges for a blame target, or None"""
+    key = (commit_id, blob_id, path)
+    with _blame_cache_lock:
+        ranges = _blame_cache.get(key)
+        if ranges is not None:
+            _blame_cache.move_to_end(key)
+        return ranges
+
+
+def store_blame(commit_id, blob_id, path, ranges):
+    """Remember a complete blame result, evicting the least recently used one"""
+    with _blame_cache_lock:
+        _blame_cache[(commit_id, blob_id, path)] = ranges
+        _blame_cache.move_to_end((commit_id, blob_id, path))
+        while len(_blame_cache) > BLAME_CACHE_SIZE:
+            _blame_cache.popitem(last=False)
+
+
+def parse_blame_incremental(lines):
+    """Parse `git blame --incremental` output into line-range dicts as they arrive
+
+    Each entry starts with "<sha> <orig line> <final line> <line count>" and ends
+    with a "filename" line. Commit details are only printed the first time a
+    commit appears, so they are remembered and copied into later ranges.
+    """
+    commits = {}
+    entry = None
+
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace') if isinstance(raw, bytes) else raw
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+
+        if entry is None:
+            parts = line.split(' ')
+            if len(parts) != 4:
+                continue
+            sha, orig_line, final_line, num_lines = parts
+            entry = {
+                'commit': sha,
+                'orig_line': int(orig_line),
+                'final_line': int(final_line),
+                'num_lines': int(num_lines)
+            }
+            commits.setdefault(sha, {})
+            continue
+
+        key, _, value = line.partition(' ')
+        if key == 'filename':
+            entry.update(commits[entry['commit']])
+            entry['filename'] = value
+            yield entry
+            entry = None
+        elif key in BLAME_COMMIT_FIELDS:
+            field = key.replace('-', '_')
+            commits[entry['commit']][field] = int(value) if key == 'author-time' else value
+        elif key == 'boundary':
+            commits[entry['commit']]['boundary'] = True
+        elif key == 'previous':
+            entry['previous'] = value
+
+
+def stream_blame(directory, commit_id, blob_id, path):
+    """Run an incremental blame and yield each range as soon as git reports it
+
+    The result is cached only when git finishes successfully, so an abandoned
+    or failed blame never leaves a partial entry behind.
+    """
+    path = path.replace('\\', '/').lstrip('/')
+    operation = git_process.start_git(['-C', directory, 'blame', '--incremental', commit_id, '--', path])
+    process = operation.process
+    ranges = []
+    try:
+        for entry in parse_blame_incremental(process.stdout):
+            ranges.append(entry)
+            yield entry
+
+        stderr = process.stderr.read()
+        process.wait()
+        git_process.finish(operation)
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode('utf-8', errors='replace').strip() or 'git blame failed')
+
+        store_blame(commit_id, blob_id, path, ranges)
+    finally:
+        # Kills git if the client went away mid-stream; a no-op once finished
+        git_process.stop(operation)
+        process.stdout.close()
+        process.stderr.close()
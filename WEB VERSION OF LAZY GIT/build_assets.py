@@ -0,0 +1,271 @@
+"""Build minified, fingerprinted static bundles
+
+Concatenates and minifies each bundle in static_assets.BUNDLES, names it after
+a hash of its content (static/dist/app.<hash>.js), writes .gz and .br
+variants next to it, and records the names in static/dist/manifest.json for
+the templates. Old bundles are removed. app.spec runs this before every
+PyInstaller build, so a missing brotli module fails the build rather than
+shipping gzip only.
+
+    python build_assets.py
+    python build_assets.py --allow-missing-brotli   # gzip only, for a quick local build
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from http_cache import brotli
+from static_assets import BUNDLES, DIST_DIR, MANIFEST_NAME
+
+# Dedicated minifiers are used when installed; the built-in ones only remove
+# what is certainly safe to remove
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+IDENTIFIER_CHARS = re.compile(r'[\w$]')
+TRAILING_WORD = re.compile(r'[A-Za-z_$][\w$]*$')
+
+# After these a "/" starts a regular expression rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                  'throw', 'instanceof', 'yield', 'await'}
+
+# A line break can be dropped after or before these without automatic
+# semicolon insertion changing the meaning of the code
+JOIN_AFTER = set('{;,([=:?&|*%<>!~^')
+JOIN_BEFORE = set(')]},;.?:')
+
+
+def minify_js(source):
+    """Strip comments, indentation and blank lines; strings, templates and regexes are copied as they are"""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+
+    out = []
+    prev = ''          # last character written outside whitespace
+    tail = ''          # last few characters written, to find the preceding keyword
+    pending = None     # None, ' ' or '\n': whitespace skipped since the last token
+    brace_depth = 0
+    templates = []     # brace depth at which each open ${ ... } returns to its template literal
+    n = len(source)
+    i = 0
+
+    def write(text):
+        nonlocal prev, tail, pending
+        if pending is not None:
+            first = text[0]
+            newline = pending == '\n' and not (prev in JOIN_AFTER or first in JOIN_BEFORE) \
+                and not text.startswith(('++', '--'))
+            if newline and prev:
+                out.append('\n')
+            elif prev and (
+                    (IDENTIFIER_CHARS.match(prev) and IDENTIFIER_CHARS.match(first))
+                    or (prev in '+-' and first in '+-') or (prev == '/' and first in '/*')):
+                out.append(' ')
+            pending = None
+        out.append(text)
+        prev = text.rstrip()[-1:] or prev
+        tail = (tail + text)[-16:]
+
+    def copy_quoted(start, quote):
+        j = start + 1
+        while j < n and source[j] != quote:
+            j += 2 if source[j] == '\\' else 1
+        return j + 1
+
+    def copy_template(start):
+        """Copy template text from `start` to its closing backtick or next ${; returns (end, opened)"""
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+            elif source[j] == '`':
+                return j + 1, False
+            elif source.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        return j, False
+
+    while i < n:
+        c = source[i]
+        if c in ' \t\r\n':
+            if c == '\n' or pending == '\n':
+                pending = '\n'
+            else:
+                pending = ' '
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if pending != '\n':
+                pending = '\n' if '\n' in source[i:end] else ' '
+            i = end
+        elif c in '\'"':
+            end = copy_quoted(i, c)
+            write(source[i:end])
+            i = end
+        elif c == '`':
+            end, opened = copy_template(i + 1)
+            write(source[i:end])
+            if opened:
+                templates.append(brace_depth)
+                brace_depth += 1
+            i = end
+        elif c == '/' and (prev in REGEX_PRECEDERS or prev in ('', '}')
+                           or (TRAILING_WORD.search(tail) or [None])[0] in REGEX_KEYWORDS):
+            j = i + 1
+            in_class = False
+            while j < n and (source[j] != '/' or in_class):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and source[j].isalpha():
+                j += 1
+            write(source[i:j])
+            i = j
+        elif c == '{':
+            brace_depth += 1
+            write(c)
+            i += 1
+        elif c == '}':
+            brace_depth -= 1
+            if templates and templates[-1] == brace_depth:
+                # End of a ${...} substitution: back inside the template literal
+                templates.pop()
+                end, opened = copy_template(i + 1)
+                write(source[i:end])
+                if opened:
+                    templates.append(brace_depth)
+                    brace_depth += 1
+                i = end
+            else:
+                write(c)
+                i += 1
+        else:
+            match = IDENTIFIER_CHARS.match(c)
+            if match:
+                end = i + 1
+                while end < n and IDENTIFIER_CHARS.match(source[end]):
+                    end += 1
+                write(source[i:end])
+                i = end
+            else:
+                write(c)
+                i += 1
+    return ''.join(out).strip() + '\n'
+
+
+CSS_SEGMENTS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+
+
+def minify_css(source):
+    """Drop comments and the whitespace CSS does not need; strings and calc() operators are kept intact"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+
+    parts = []
+    for index, segment in enumerate(CSS_SEGMENTS.split(source)):
+        if index % 2:
+            if not segment.startswith('/*'):
+                parts.append(segment)
+            continue
+        segment = re.sub(r'\s+', ' ', segment)
+        segment = re.sub(r'\s*([{};,>])\s*', r'\1', segment)
+        segment = re.sub(r':\s+', ':', segment)
+        parts.append(segment)
+    css = ''.join(parts)
+    css = re.sub(r';+}', '}', css)
+    return css.strip() + '\n'
+
+
+def build(static_folder, allow_missing_brotli=False):
+    """Write every bundle and its compressed variants, then the manifest; returns the manifest"""
+    if brotli is None and not allow_missing_brotli:
+        raise RuntimeError('The brotli module is required to write .br bundles (pip install -r requirements.txt)')
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        base, extension = os.path.splitext(name)
+        minify = minify_js if extension == '.js' else minify_css
+        texts = []
+        source_size = 0
+        for source in sources:
+            with open(os.path.join(static_folder, source), 'r', encoding='utf-8') as f:
+                text = f.read()
+            source_size += len(text.encode('utf-8'))
+            texts.append(minify(text))
+        # Scripts were separate files; a semicolon keeps one from continuing into the next
+        data = (';\n' if extension == '.js' else '\n').join(texts).encode('utf-8')
+
+        filename = f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+        path = os.path.join(dist, filename)
+        with open(path, 'wb') as f:
+            f.write(data)
+        # mtime=0 keeps the .gz identical between builds of the same content
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        variants = {'gzip': os.path.getsize(path + '.gz')}
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+            variants['br'] = os.path.getsize(path + '.br')
+
+        manifest[name] = {'file': filename, 'sources': sources, 'source_size': source_size,
+                          'size': len(data), 'compressed': variants}
+
+    keep = {MANIFEST_NAME}
+    for info in manifest.values():
+        keep.update({info['file'], info['file'] + '.gz', info['file'] + '.br'})
+    for existing in os.listdir(dist):
+        if existing not in keep:
+            os.remove(os.path.join(dist, existing))
+
+    manifest_path = os.path.join(dist, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'),
+                        help='static folder to build from')
+    parser.add_argument('--allow-missing-brotli', action='store_true',
+                        help='write only .gz variants when the brotli module is not installed')
+    args = parser.parse_args()
+
+    try:
+        manifest = build(args.static, allow_missing_brotli=args.allow_missing_brotli)
+    except RuntimeError as e:
+        parser.exit(1, f'error: {e}\n')
+    print(f"{'bundle':<34}{'source':>10}{'minified':>10}{'gzip':>10}{'brotli':>10}")
+    for info in manifest.values():
+        brotli_size = info['compressed'].get('br')
+        print(f"{info['file']:<34}{info['source_size'] / 1024:>8.1f}KB{info['size'] / 1024:>8.1f}KB"
+              f"{info['compressed']['gzip'] / 1024:>8.1f}KB"
+              f"{(f'{brotli_size / 1024:.1f}KB' if brotli_size else '-'):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import admission
+from lazygit_core import process as git_process
+from lazygit_core.models import STATUS_ARGS, parse_status, summarize_status
+
+DEFAULT_BULK_CONCURRENCY = 8
+DEFAULT_BULK_TIMEOUT = 120
+
+# How long each repository waits for an admission slot before it is reported as skipped
+BULK_QUEUE_TIMEOUT = 300
+
+# Git arguments for each bulk operation. Pull is fast-forward only so an
+# unattended run across many repositories never creates merge commits.
+BULK_OPERATIONS = {
+    'fetch': ['fetch', '--all', '--prune'],
+    'pull': ['pull', '--ff-only'],
+    'status': STATUS_ARGS + ['--untracked-files=normal']
+}
+
+# Admission kind per operation: fetch and pull wait on the remote and draw on the
+# network budget, so a run gets its full concurrency; status is local work
+BULK_KINDS = {'fetch': 'network', 'pull': 'network', 'status': 'read'}
+
+# Background work leaves one network slot to interactive requests
+MAX_BULK_CONCURRENCY = admission.NETWORK_LIMIT - 1
+
+
+class BulkRun:
+    """One bulk operation across many repositories on a bounded worker pool
+
+    Results are yielded in completion order. With fail_fast, the first failure
+    kills every git process still running and skips everything not started.
+    Every repository takes its own admission slot: fetch and pull from the
+    network budget, which `concurrency` workers can use at once, and status
+    from the local background budget.
+    """
+
+    def __init__(self, operation, directories, concurrency=DEFAULT_BULK_CONCURRENCY,
+                 timeout=DEFAULT_BULK_TIMEOUT, fail_fast=False, priority=admission.BACKGROUND):
+        if operation not in BULK_OPERATIONS:
+            raise ValueError(f"Unknown bulk operation: {operation}")
+        self.operation = operation
+        self.directories = list(dict.fromkeys(directories))
+        self.concurrency = max(1, min(concurrency, MAX_BULK_CONCURRENCY))
+        self.priority = priority
+        self.timeout = timeout
+        self.fail_fast = fail_fast
+        self.cancelled = threading.Event()
+        self.operation_id = f'bulk-{operation}-{id(self):x}'
+
+    def cancel(self):
+        self.cancelled.set()
+        git_process.cancel(self.operation_id)
+
+    def _run_one(self, directory):
+        result = {'repository': directory, 'operation': self.operation}
+        if self.cancelled.is_set():
+            result.update(success=False, cancelled=True, error='Cancelled')
+            return result
+        if not os.path.isdir(directory):
+            result.update(success=False, error='Directory does not exist', duration=0)
+            return result
+
+        try:
+            ticket = admission.controller.acquire(BULK_KINDS[self.operation], self.priority,
+                                                  timeout=BULK_QUEUE_TIMEOUT)
+        except admission.Overloaded as e:
+            result.update(success=False, error=f'Server busy: {e}', retry_after=e.retry_after, duration=0)
+            return result
+
+        start = time.time()
+        try:
+            if self.cancelled.is_set():
+                result.update(success=False, cancelled=True, error='Cancelled')
+                return result
+            # All processes of one run share an operation id, so cancel() stops them together
+            process = git_process.run_git(['-C', directory] + BULK_OPERATIONS[self.operation],
+                                          timeout=self.timeout, operation_id=self.operation_id)
+        except git_process.OperationTimeout:
+            result.update(success=False, error=f'Timed out after {self.timeout}s',
+                          duration=round(time.time() - start, 3))
+            return result
+        except git_process.OperationCancelled:
+            result.update(success=False, cancelled=True, error='Cancelled',
+                          duration=round(time.time() - start, 3))
+            return result
+        finally:
+            admission.controller.release(ticket)
+
+        stdout_text = process.stdout.decode('utf-8', errors='replace')
+        stderr_text = process.stderr.decode('utf-8', errors='replace')
+        result['duration'] = round(time.time() - start, 3)
+        result['success'] = process.returncode == 0
+
+        if process.returncode != 0:
+            result['error'] = stderr_text.strip() or stdout_text.strip()
+        elif self.operation == 'status':
+            result['status'] = summarize_status(parse_status(stdout_text))
+        else:
+            result['message'] = (stdout_text or stderr_text).strip()
+        return result
+
+    def results(self):
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f'bulk-{self.operation}')
+        try:
+            futures = [executor.submit(self._run_one, directory) for directory in self.directories]
+            for future in as_completed(futures):
+                result = future.result()
+                if self.fail_fast and not result['success'] and not self.cancelled.is_set():
+                    self.cancel()
+                yield result
+        finally:
+            # Also reached when the client disconnects mid-stream
+            self.cancel()
+            executor.shutdown(wait=False)
@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import subprocess
+import time
+
+from background_jobs import BackgroundJob, JobRegistry
+from lazygit_core import process as git_process
+
+logger = logging.getLogger(__name__)
+
+# Partial-clone filters accepted from clients
+FILTER_PATTERN = re.compile(r'^(blob:none|blob:limit=\d+[kmg]?|tree:\d+)$')
+
+# "Receiving objects:  45% (450/1000), 1.20 MiB | 600.00 KiB/s"
+PROGRESS_PATTERN = re.compile(r'^(?:remote: )?([A-Za-z ]+):\s+(\d+)% \((\d+)/(\d+)\)')
+
+# A queued clone waits this long for a background slot before giving up
+CLONE_QUEUE_TIMEOUT = 300
+
+_jobs = JobRegistry()
+
+
+def _git(directory, *args):
+    process = git_process.run_git(['-C', directory] + list(args))
+    return (process.returncode, process.stdout.decode('utf-8', errors='replace').strip(),
+            process.stderr.decode('utf-8', errors='replace').strip())
+
+
+def parse_progress(line):
+    """Turn one line of `git clone --progress` output into a progress dict, or None"""
+    match = PROGRESS_PATTERN.match(line)
+    if not match:
+        return None
+    phase, percent, current, total = match.groups()
+    return {'phase': phase.strip(), 'percent': int(percent), 'current': int(current), 'total': int(total)}
+
+
+def validate_destination(destination):
+    """Return an error message if git cannot clone into `destination`, else None"""
+    if not destination or not os.path.isabs(destination):
+        return 'Destination must be an absolute path'
+    if os.path.exists(destination) and (not os.path.isdir(destination) or os.listdir(destination)):
+        return f'Destination already exists and is not empty: {destination}'
+    if not os.path.isdir(os.path.dirname(os.path.normpath(destination))):
+        return f'Parent directory does not exist: {os.path.dirname(destination)}'
+    return None
+
+
+class CloneJob(BackgroundJob):
+    """A clone running in the background whose progress can be streamed
+
+    With sparse patterns the clone is made without a checkout, the cone is
+    set, and only then are files checked out. Combined with blob:none, only
+    the blobs inside the cone are ever downloaded.
+    """
+
+    kind = 'clone'
+
+    def __init__(self, url, destination, blob_filter=None, depth=None, branch=None, sparse=None, on_complete=None):
+        super().__init__()
+        self.url = url
+        self.destination = os.path.normpath(destination)
+        self.blob_filter = blob_filter
+        self.depth = depth
+        self.branch = branch
+        # An empty list still means sparse: only files at the top level are checked out
+        self.sparse = list(sparse) if sparse is not None else None
+        self.on_complete = on_complete
+
+    def clone_args(self):
+        args = ['clone', '--progress']
+        if self.blob_filter:
+            args.append(f'--filter={self.blob_filter}')
+        if self.depth:
+            args += ['--depth', str(self.depth)]
+        if self.branch:
+            args += ['--branch', self.branch]
+        if self.sparse is not None:
+            args.append('--no-checkout')
+        return args + ['--', self.url, self.destination]
+
+    def _run_step(self, args, cwd=None):
+        """Run git, forwarding its progress output as events; raises on failure"""
+        self._check_cancelled()
+        operation = git_process.start_git(args, cwd=cwd, operation_id=self.job_id, stdout=subprocess.DEVNULL)
+        process = operation.process
+        last = {}
+        tail = []
+        try:
+            buffer = b''
+            while True:
+                data = process.stderr.read1(4096)
+                if not data:
+                    break
+                buffer += data
+                # Progress lines are redrawn with \r, completed ones end with \n
+                *lines, buffer = re.split(rb'[\r\n]', buffer)
+                for raw in lines:
+                    line = raw.decode('utf-8', errors='replace').strip()
+                    if not line:
+                        continue
+                    progress = parse_progress(line)
+                    if progress is None:
+                        tail = (tail + [line])[-20:]
+                        self._emit({'type': 'log', 'message': line})
+                    elif last.get(progress['phase']) != progress['percent']:
+                        last[progress['phase']] = progress['percent']
+                        self._emit({'type': 'progress', **progress})
+            process.wait()
+        finally:
+            git_process.finish(operation)
+            process.stderr.close()
+        if process.returncode != 0:
+            raise RuntimeError('\n'.join(tail) or f'git {args[0]} failed')
+
+    def _run(self):
+        self.state = 'running'
+        self.started = time.time()
+        self._emit({'type': 'state', 'state': 'running', 'args': self.clone_args()})
+        try:
+            # A clone can run for an hour; it draws on the network budget, not the shared write slots
+            with self._admit('network', CLONE_QUEUE_TIMEOUT):
+                self._run_step(self.clone_args())
+                if self.sparse is not None:
+                    self._emit({'type': 'log', 'message': f"Setting sparse-checkout cone: {', '.join(self.sparse) or '(top level only)'}"})
+                    code, _, error = _git(self.destination, 'sparse-checkout', 'set', '--cone', '--', *self.sparse)
+                    if code != 0:
+                        raise RuntimeError(error or 'git sparse-checkout set failed')
+                    self._run_step(['checkout', '--progress'] + ([self.branch] if self.branch else []), cwd=self.destination)
+            self.state = 'completed'
+            if self.on_complete:
+                self.on_complete(self)
+        except git_process.OperationCancelled:
+            self.state = 'cancelled'
+            self.error = 'Cancelled'
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.error(f"Clone {self.job_id} of {self.url} failed: {self.error}")
+        finally:
+            self._finish()
+
+    def describe(self):
+        return {
+            'id': self.job_id,
+            'url': self.url,
+            'destination': self.destination,
+            'state': self.state,
+            'error': self.error,
+            'filter': self.blob_filter,
+            'depth': self.depth,
+            'sparse': self.sparse,
+            'duration': round((self.finished or time.time()) - self.started, 3) if self.started else None
+        }
+
+
+def start_clone(url, destination, **options):
+    job = _jobs.add(CloneJob(url, destination, **options))
+    job.start()
+    return job
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
+
+
+def list_jobs():
+    return _jobs.describe()
+
+
+def get_sparse_checkout(directory):
+    """Report whether sparse-checkout is on, whether it is in cone mode, and its directories"""
+    _, enabled, _ = _git(directory, 'config', '--bool', 'core.sparseCheckout')
+    _, cone, _ = _git(directory, 'config', '--bool', 'core.sparseCheckoutCone')
+    if enabled != 'true':
+        return {'enabled': False, 'cone': False, 'patterns': []}
+    code, output, error = _git(directory, 'sparse-checkout', 'list')
+    if code != 0:
+        raise RuntimeError(error or 'git sparse-checkout list failed')
+    return {'enabled': True, 'cone': cone != 'false', 'patterns': output.splitlines()}
+
+
+def update_sparse_checkout(directory, action, patterns=()):
+    """Widen ('add'), replace or narrow ('set') or turn off ('disable') the sparse set"""
+    if action == 'add':
+        args = ['sparse-checkout', 'add', '--', *patterns]
+    elif action == 'set':
+        args = ['sparse-checkout', 'set', '--cone', '--', *patterns]
+    elif action == 'disable':
+        args = ['sparse-checkout', 'disable']
+    else:
+        raise ValueError(f"Unknown sparse-checkout action: {action}")
+    code, output, error = _git(directory, *args)
+    if code != 0:
+        raise RuntimeError(error or f'git sparse-checkout {action} failed')
+    return get_sparse_checkout(directory)
@@ -0,0 +1,280 @@
+import heapq
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from lazygit_core import process as git_process
+
+# Number of (repository, ref) layouts kept in memory
+GRAPH_CACHE_SIZE = 16
+
+# Extra rows laid out beyond the requested window so scrolling rarely waits on git
+GRAPH_PREFETCH_ROWS = 200
+
+# A layout keeps its rev-list open between windows; after this long it is stopped,
+# and the next window restarts it past the rows already laid out
+GRAPH_STREAM_TIMEOUT = 900
+
+# Open rev-list streams are closed after this long without a window, and at most
+# this many stay open at once (least recently used closed first). A closed stream
+# is restarted with --skip when that layout is scrolled again
+GRAPH_STREAM_IDLE_SECONDS = 30
+MAX_GRAPH_STREAMS = 4
+
+GRAPH_FORMAT = '%h%x1f%an%x1f%ar%x1f%s'
+
+_graph_cache = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+# Layouts with an open stream, least recently used first, and the thread closing idle ones
+_open_streams = OrderedDict()
+_open_streams_lock = threading.Lock()
+_reaper = None
+
+
+class GraphLayout:
+    """Lane assignment for a commit DAG, extended one window at a time
+
+    Commits are consumed in topological order. Every lane holds the id of the
+    commit it is waiting for, and a commit is never waited for by two lanes, so
+    a node always lands in the lane that expects it and each commit costs
+    O(parents) work plus a heap operation for free-lane reuse.
+
+    One `rev-list --topo-order` stays open for the layout and each window reads
+    on from where the last one stopped, so git sorts the history once rather
+    than once per window. Streams are closed when idle or when too many are
+    open; call close() when the layout is dropped.
+    """
+
+    def __init__(self, directory, tip):
+        self.directory = directory
+        self.tip = tip
+        self.rows = []
+        self.complete = False
+        self.lock = threading.Lock()
+        self._lanes = []
+        self._expected = {}
+        self._free = []
+        self._stream = None
+        self._stream_errors = None
+        self.last_used = time.monotonic()
+
+    def _allocate_lane(self):
+        if self._free:
+            return heapq.heappop(self._free)
+        self._lanes.append(None)
+        return len(self._lanes) - 1
+
+    def _release_lane(self, column):
+        self._lanes[column] = None
+        heapq.heappush(self._free, column)
+
+    def add_commit(self, sha, parents, info=None):
+        """Place one commit and return its row"""
+        column = self._expected.pop(sha, None)
+        if column is None:
+            column = self._allocate_lane()
+        self._lanes[column] = None
+        column_reused = False
+        assigned = {}
+        edges = []
+
+        for parent in parents:
+            target = self._expected.get(parent)
+            if target is not None:
+                # Parent already has a lane, so this edge merges into it
+                edges.append([column, target])
+                continue
+            if not column_reused:
+                target = column
+                column_reused = True
+            else:
+                target = self._allocate_lane()
+            self._lanes[target] = parent
+            self._expected[parent] = target
+            assigned[target] = True
+
+        if not column_reused:
+            self._release_lane(column)
+
+        # Every lane still waiting continues straight down, except the ones
+        # this commit just opened, which branch out of the node's column
+        for lane, waiting_for in enumerate(self._lanes):
+            if waiting_for is not None:
+                edges.append([column if assigned.get(lane) else lane, lane])
+
+        row = {
+            'hash': sha,
+            'parents': list(parents),
+            'column': column,
+            'edges': edges,
+            'width': max(len(self._lanes), column + 1)
+        }
+        if info:
+            row.update(info)
+        self.rows.append(row)
+        return row
+
+    def _open_stream(self):
+        # Only needed again after the deadline stopped a stream: resume past what is laid out
+        skip = [f'--skip={len(self.rows)}'] if self.rows else []
+        self._stream_errors = tempfile.TemporaryFile()
+        self._stream = git_process.start_git(
+            ['-C', self.directory, 'rev-list', '--parents', '--topo-order', f'--format={GRAPH_FORMAT}'] + skip
+            + [self.tip], timeout=GRAPH_STREAM_TIMEOUT, operation_id=f'graph-{id(self):x}',
+            stderr=self._stream_errors)
+
+    def _close_stream(self):
+        """Stop the rev-list and return its stderr; raises OperationAborted if it was stopped early"""
+        stream, errors = self._stream, self._stream_errors
+        self._stream = self._stream_errors = None
+        if stream is None:
+            return ''
+        try:
+            if stream.process.poll() is None:
+                git_process.stop(stream)
+            else:
+                git_process.finish(stream)
+        finally:
+            stream.process.stdout.close()
+            errors.seek(0)
+            message = errors.read().decode('utf-8', errors='replace').strip()
+            errors.close()
+        return message
+
+    def extend(self, count):
+        """Lay out up to `count` more commits from where the previous call stopped"""
+        if self.complete or count <= 0:
+            return 0
+
+        added = 0
+        restarted = False
+        while added < count:
+            if self._stream is None:
+                self._open_stream()
+            header = self._stream.process.stdout.readline()
+            details = self._stream.process.stdout.readline() if header else b''
+            if header and details:
+                header = header.decode('utf-8', errors='replace').rstrip('\n')
+                if not header.startswith('commit '):
+                    continue
+                ids = header[len('commit '):].split()
+                details = details.decode('utf-8', errors='replace').rstrip('\n')
+                short_hash, author, date, message = (details.split('\x1f') + ['', '', '', ''])[:4]
+                self.add_commit(ids[0], ids[1:], {
+                    'short_hash': short_hash,
+                    'author': author,
+                    'date': date,
+                    'message': message
+                })
+                added += 1
+                continue
+
+            # End of output: the whole history is laid out, git failed, or the deadline stopped it
+            process = self._stream.process
+            try:
+                process.wait()
+                error = self._close_stream()
+            except git_process.OperationAborted:
+                if restarted:
+                    raise
+                restarted = True
+                continue
+            if process.returncode != 0:
+                raise RuntimeError(error or 'git rev-list failed')
+            self.complete = True
+            break
+        return added
+
+    def close(self, blocking=True):
+        """Stop the stream; without blocking, a layout busy reading a window is left alone"""
+        if not self.lock.acquire(blocking):
+            return False
+        try:
+            self._close_stream()
+        finally:
+            self.lock.release()
+        with _open_streams_lock:
+            _open_streams.pop(self, None)
+        return True
+
+    def window(self, offset, limit):
+        """Return (rows, has_more) for [offset, offset + limit), laying out more history if needed"""
+        with self.lock:
+            missing = offset + limit - len(self.rows)
+            if missing > 0:
+                self.extend(missing + GRAPH_PREFETCH_ROWS)
+            self.last_used = time.monotonic()
+            streaming = self._stream is not None
+            result = self.rows[offset:offset + limit], not self.complete or offset + limit < len(self.rows)
+        # Outside our lock: closing another layout takes its lock
+        if streaming:
+            _track_stream(self)
+        else:
+            with _open_streams_lock:
+                _open_streams.pop(self, None)
+        return result
+
+
+def _track_stream(layout):
+    global _reaper
+    with _open_streams_lock:
+        _open_streams[layout] = None
+        _open_streams.move_to_end(layout)
+        excess = list(_open_streams)[:max(0, len(_open_streams) - MAX_GRAPH_STREAMS)]
+        if _reaper is None:
+            _reaper = threading.Thread(target=_close_idle_streams, name='graph-streams', daemon=True)
+            _reaper.start()
+    for old in excess:
+        old.close(blocking=False)
+
+
+def close_idle_streams():
+    """Close streams nobody has read a window from in GRAPH_STREAM_IDLE_SECONDS"""
+    cutoff = time.monotonic() - GRAPH_STREAM_IDLE_SECONDS
+    with _open_streams_lock:
+        idle = [layout for layout in _open_streams if layout.last_used < cutoff]
+    for layout in idle:
+        layout.close(blocking=False)
+
+
+def _close_idle_streams():
+    while True:
+        time.sleep(GRAPH_STREAM_IDLE_SECONDS / 2)
+        close_idle_streams()
+
+
+def open_stream_count():
+    with _open_streams_lock:
+        return len(_open_streams)
+
+
+def resolve_ref(directory, ref):
+    """Resolve a ref to its commit id, or raise ValueError"""
+    process = git_process.run_git(['-C', directory, 'rev-parse', '--verify', f'{ref}^{{commit}}'])
+    stdout, stderr = process.stdout, process.stderr
+    if process.returncode != 0:
+        raise ValueError(stderr.decode('utf-8', errors='replace').strip() or f"Unknown ref: {ref}")
+    return stdout.decode('utf-8').strip()
+
+
+def get_layout(directory, ref):
+    """Return the cached layout for a repository ref, starting over if the ref moved"""
+    tip = resolve_ref(directory, ref)
+    key = (directory, ref)
+    dropped = []
+    with _graph_cache_lock:
+        layout = _graph_cache.get(key)
+        if layout is None or layout.tip != tip:
+            if layout is not None:
+                dropped.append(layout)
+            layout = GraphLayout(directory, tip)
+            _graph_cache[key] = layout
+        _graph_cache.move_to_end(key)
+        while len(_graph_cache) > GRAPH_CACHE_SIZE:
+            dropped.append(_graph_cache.popitem(last=False)[1])
+    # Outside the cache lock: a dropped layout may still be reading a window
+    for old in dropped:
+        old.close()
+    return layout
@@ -0,0 +1,102 @@
+import os
+import string
+import threading
+from collections import OrderedDict
+
+# Number of directory listings kept in memory
+LISTING_CACHE_SIZE = 256
+
+# Listings keyed by (path, show_hidden, include_files), most recently used last
+_listing_cache = OrderedDict()
+_listing_cache_lock = threading.Lock()
+
+
+def is_git_repository(path):
+    """Check whether a directory is a git repository using only stat calls
+
+    Recognises normal checkouts (.git directory), worktrees and submodules
+    (.git file pointing elsewhere) and bare repositories.
+    """
+    dot_git = os.path.join(path, '.git')
+    try:
+        if os.path.isdir(dot_git):
+            return os.path.isfile(os.path.join(dot_git, 'HEAD'))
+        if os.path.isfile(dot_git):
+            with open(dot_git, 'r', errors='replace') as f:
+                return f.read(8) == 'gitdir: '
+        return (os.path.isfile(os.path.join(path, 'HEAD'))
+                and os.path.isdir(os.path.join(path, 'objects'))
+                and os.path.isdir(os.path.join(path, 'refs')))
+    except OSError:
+        return False
+
+
+def list_roots():
+    """Return the top-level locations to start browsing from"""
+    if os.name == 'nt':
+        drives = [f'{letter}:\\' for letter in string.ascii_uppercase if os.path.exists(f'{letter}:\\')]
+        return [{'name': drive, 'path': drive, 'is_dir': True} for drive in drives]
+    return [{'name': '/', 'path': '/', 'is_dir': True}]
+
+
+class DirectoryListing:
+    """Sorted entries of one directory, with repo flags filled in page by page"""
+
+    def __init__(self, path, mtime_ns, entries):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self.lock = threading.Lock()
+
+    def page(self, offset, limit):
+        """Return entries [offset, offset + limit), detecting repositories on demand"""
+        with self.lock:
+            page = self.entries[offset:offset + limit]
+            for entry in page:
+                if entry['is_dir'] and 'is_repo' not in entry:
+                    entry['is_repo'] = is_git_repository(entry['path'])
+            return [dict(entry) for entry in page]
+
+
+def _scan(path, show_hidden, include_files):
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if not show_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                # d_type from readdir answers this without an extra stat on most platforms
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if not is_dir and not include_files:
+                continue
+            entries.append({'name': entry.name, 'path': entry.path, 'is_dir': is_dir})
+    entries.sort(key=lambda e: (not e['is_dir'], e['name'].lower()))
+    return entries
+
+
+def get_listing(path, show_hidden=False, include_files=False):
+    """Return a cached listing for a directory, rescanning only if its mtime changed
+
+    A directory's mtime moves when entries are added, removed or renamed, which
+    is exactly what invalidates the sorted name list. Repository flags are
+    computed lazily per page and live as long as the listing does.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    key = (path, show_hidden, include_files)
+
+    with _listing_cache_lock:
+        listing = _listing_cache.get(key)
+        if listing is not None and listing.mtime_ns == mtime_ns:
+            _listing_cache.move_to_end(key)
+            return listing
+
+    listing = DirectoryListing(path, mtime_ns, _scan(path, show_hidden, include_files))
+
+    with _listing_cache_lock:
+        _listing_cache[key] = listing
+        _listing_cache.move_to_end(key)
+        while len(_listing_cache) > LISTING_CACHE_SIZE:
+            _listing_cache.popitem(last=False)
+    return listing
@@ -0,0 +1,285 @@
+import datetime
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+
+from commit_graph import resolve_ref
+from lazygit_core import ResultCache, process as git_process
+from lazygit_core.gitdir import file_fingerprint, find_common_dir, find_git_dir
+
+# Aggregates are kept next to the repository's own metadata, one file per ref
+STATS_DIR_NAME = 'lazygit-history-stats'
+STATS_VERSION = 1
+
+# Refs with saved aggregates per repository; the least recently used is dropped
+MAX_SAVED_REFS = 4
+
+# Reading all of a large history the first time takes a while
+STATS_SCAN_TIMEOUT = 1800
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+# %x1e starts a commit, %x1f separates its fields; -z ends the header and every numstat line with NUL
+LOG_ARGS = ['log', '--no-merges', '--no-renames', '--numstat', '-z', '--date=short',
+            '--format=%x1e%H%x1f%ad%x1f%aN%x1f%aE']
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+# Loaded aggregates by file path, with the fingerprint of the file they were read from
+_loaded = {}
+
+# Summaries served to dashboards, valid until the ref's head moves
+SUMMARY_CACHE_SIZE = 32
+_summaries = ResultCache(size=SUMMARY_CACHE_SIZE)
+
+
+def _repo_lock(common_dir):
+    with _locks_lock:
+        return _locks.setdefault(common_dir, threading.Lock())
+
+
+def _stats_path(common_dir, ref_name):
+    digest = hashlib.sha1(ref_name.encode('utf-8', errors='replace')).hexdigest()[:16]
+    return os.path.join(common_dir, STATS_DIR_NAME, f'{digest}.json')
+
+
+def empty_stats(ref_name):
+    return {'version': STATS_VERSION, 'ref': ref_name, 'head': None, 'commits': 0,
+            'authors': {}, 'days': {}, 'files': {}}
+
+
+def load_stats(path, ref_name):
+    fingerprint = file_fingerprint(path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = None
+    if not stats or stats.get('version') != STATS_VERSION or stats.get('ref') != ref_name:
+        stats = empty_stats(ref_name)
+    _loaded[path] = (fingerprint, stats)
+    return stats
+
+
+def save_stats(path, stats):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+    _loaded[path] = (file_fingerprint(path), stats)
+
+    # Keep only the most recently updated refs
+    directory = os.path.dirname(path)
+    saved = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+                   key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in saved[MAX_SAVED_REFS:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+        _loaded.pop(entry.path, None)
+
+
+def _add_commit(stats, header, numstat):
+    _, day, name, email = header.split('\x1f', 3)
+    added = removed = 0
+    files = stats['files']
+    for line in numstat:
+        if not line:
+            continue
+        plus, minus, path = line.split('\t', 2)
+        # Binary files show "-" for both counts
+        plus = int(plus) if plus != '-' else 0
+        minus = int(minus) if minus != '-' else 0
+        added += plus
+        removed += minus
+        churn = files.get(path)
+        if churn is None:
+            files[path] = [1, plus, minus]
+        else:
+            churn[0] += 1
+            churn[1] += plus
+            churn[2] += minus
+
+    key = email.lower() or name
+    author = stats['authors'].get(key)
+    if author is None:
+        author = stats['authors'][key] = {'name': name, 'email': email, 'commits': 0, 'added': 0,
+                                          'removed': 0, 'first': day, 'last': day, 'days': {}}
+    author['commits'] += 1
+    author['added'] += added
+    author['removed'] += removed
+    author['first'] = min(author['first'], day)
+    author['last'] = max(author['last'], day)
+    author['days'][day] = author['days'].get(day, 0) + 1
+
+    totals = stats['days'].get(day)
+    if totals is None:
+        stats['days'][day] = [1, added, removed]
+    else:
+        totals[0] += 1
+        totals[1] += added
+        totals[2] += removed
+    stats['commits'] += 1
+
+
+def scan_commits(directory, stats, revisions):
+    """Stream `git log --numstat` for `revisions` into the aggregates; returns commits read"""
+    count = 0
+    with tempfile.TemporaryFile() as errors:
+        operation = git_process.start_git(LOG_ARGS + revisions + ['--'], cwd=directory,
+                                          timeout=STATS_SCAN_TIMEOUT, stderr=errors)
+        process = operation.process
+        try:
+            try:
+                buffer = b''
+                while True:
+                    data = process.stdout.read(1 << 20)
+                    if not data:
+                        break
+                    buffer += data
+                    *records, buffer = buffer.split(b'\x1e')
+                    for record in records:
+                        if record:
+                            header, _, numstat = record.decode('utf-8', errors='replace').partition('\0')
+                            _add_commit(stats, header, numstat.lstrip('\n').split('\0'))
+                            count += 1
+                if buffer:
+                    header, _, numstat = buffer.decode('utf-8', errors='replace').partition('\0')
+                    _add_commit(stats, header, numstat.lstrip('\n').split('\0'))
+                    count += 1
+                process.wait()
+            except BaseException:
+                git_process.stop(operation)
+                raise
+            git_process.finish(operation)
+        finally:
+            process.stdout.close()
+        if process.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(errors.read().decode('utf-8', errors='replace').strip() or 'git log failed')
+    return count
+
+
+def _is_ancestor(directory, ancestor, descendant):
+    process = git_process.run_git(['merge-base', '--is-ancestor', ancestor, descendant], cwd=directory)
+    return process.returncode == 0
+
+
+def update_stats(directory, ref='HEAD'):
+    """Bring the saved aggregates for `ref` up to date and return them with what was done
+
+    Only commits after the last processed one are read. When the ref was
+    rewound or rewritten, so that commit is no longer in its history, the
+    aggregates are rebuilt from scratch.
+    """
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        raise ValueError(f'Not a git repository: {directory}')
+    common_dir = find_common_dir(git_dir)
+    head = resolve_ref(directory, ref)
+    process = git_process.run_git(['rev-parse', '--symbolic-full-name', ref], cwd=directory)
+    # Detached HEAD or a commit id: aggregates are still saved, under the name given
+    ref_name = process.stdout.decode('utf-8', errors='replace').strip() or ref
+
+    with _repo_lock(common_dir):
+        path = _stats_path(common_dir, ref_name)
+        stats = load_stats(path, ref_name)
+        update = {'new_commits': 0, 'rebuilt': False, 'seconds': 0.0}
+        if stats['head'] == head:
+            return stats, update
+
+        started = time.time()
+        try:
+            if stats['head'] and _is_ancestor(directory, stats['head'], head):
+                update['new_commits'] = scan_commits(directory, stats, [f"{stats['head']}..{head}"])
+            else:
+                stats = empty_stats(ref_name)
+                update['rebuilt'] = True
+                update['new_commits'] = scan_commits(directory, stats, [head])
+        except BaseException:
+            # The aggregates were updated in place; read them back from disk next time
+            _loaded.pop(path, None)
+            raise
+        stats['head'] = head
+        stats['updated_at'] = time.time()
+        save_stats(path, stats)
+        update['seconds'] = round(time.time() - started, 3)
+        return stats, update
+
+
+def period_of(day, period):
+    if period == 'day':
+        return day
+    if period == 'month':
+        return day[:7]
+    if period == 'year':
+        return day[:4]
+    year, week, _ = datetime.date.fromisoformat(day).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def summarize(stats, period='month', top=20, since=None, until=None):
+    """Roll the per-day aggregates up into periods and pick the top authors and files
+
+    `since` and `until` (YYYY-MM-DD, inclusive) limit the timelines; author
+    and file totals always cover the whole history.
+    """
+    def in_range(day):
+        return (not since or day >= since) and (not until or day <= until)
+
+    periods = {}
+    for day, (commits, added, removed) in stats['days'].items():
+        if not in_range(day):
+            continue
+        totals = periods.setdefault(period_of(day, period), [0, 0, 0])
+        totals[0] += commits
+        totals[1] += added
+        totals[2] += removed
+
+    authors = heapq.nlargest(top, stats['authors'].values(), key=lambda author: author['commits'])
+    author_rows = []
+    for author in authors:
+        timeline = {}
+        for day, commits in author['days'].items():
+            if in_range(day):
+                name = period_of(day, period)
+                timeline[name] = timeline.get(name, 0) + commits
+        row = {key: value for key, value in author.items() if key != 'days'}
+        row['timeline'] = dict(sorted(timeline.items()))
+        author_rows.append(row)
+
+    files = heapq.nlargest(top, stats['files'].items(), key=lambda item: item[1][1] + item[1][2])
+    return {
+        'ref': stats['ref'],
+        'head': stats['head'],
+        'commits': stats['commits'],
+        'authors_total': len(stats['authors']),
+        'files_total': len(stats['files']),
+        'period': period,
+        'periods': [{'period': name, 'commits': commits, 'added': added, 'removed': removed}
+                    for name, (commits, added, removed) in sorted(periods.items())],
+        'authors': author_rows,
+        'files': [{'path': path, 'commits': commits, 'added': added, 'removed': removed}
+                  for path, (commits, added, removed) in files]
+    }
+
+
+def get_summary(directory, ref='HEAD', period='month', top=20, since=None, until=None):
+    """Update the aggregates for `ref` and summarize them; repeat views of an unchanged ref are cached"""
+    stats, update = update_stats(directory, ref)
+    key = (os.path.abspath(directory), stats['ref'], period, top, since, until)
+    summary = _summaries.get(key, stats['head'])
+    if summary is None:
+        summary = summarize(stats, period, top, since, until)
+        _summaries.put(key, stats['head'], summary)
+    return dict(summary, update=update)
@@ -0,0 +1,71 @@
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compressing them costs more than it saves
+COMPRESS_MIN_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/msgpack', 'application/x-msgpack',
+                          'application/x-ndjson', 'text/html', 'text/plain')
+
+
+def make_etag(*parts):
+    return hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8', errors='replace')).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """Compare against an If-None-Match header, ignoring our -gzip/-br suffixes and W/ prefixes"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for suffix in ('-gzip', '-br'):
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)]
+        if candidate == etag:
+            return True
+    return False
+
+
+def accepted_encodings(accept_encoding):
+    """Parse an Accept-Encoding header into {encoding: quality}"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Pick brotli when the client accepts it and the module is installed, else gzip"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
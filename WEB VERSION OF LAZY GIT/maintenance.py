@@ -0,0 +1,270 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import admission
+from lazygit_core import process as git_process
+from lazygit_core.gitdir import find_common_dir, find_git_dir
+
+logger = logging.getLogger(__name__)
+
+# Seconds without an HTTP request before the server counts as idle
+MAINTENANCE_IDLE_SECONDS = 60
+
+# How often the scheduler wakes up to look for work
+MAINTENANCE_CHECK_INTERVAL = 30
+
+# At most this many seconds of maintenance per budget window
+MAINTENANCE_BUDGET_SECONDS = 120
+MAINTENANCE_BUDGET_WINDOW = 3600
+
+# A single task is killed after this long. A task that started is allowed to finish even
+# past the budget; the overrun is charged to the following windows
+MAINTENANCE_TASK_TIMEOUT = 600
+
+# Health thresholds that make a task due
+LOOSE_OBJECT_LIMIT = 1000
+PACK_LIMIT = 10
+GC_PACK_LIMIT = 50
+LOOSE_REF_LIMIT = 100
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def get_repo_health(directory):
+    """Measure the things that slow git down, using only filesystem reads
+
+    Loose objects are estimated the same way `git gc --auto` does it: count
+    one of the 256 fan-out directories and multiply.
+    """
+    git_dir = find_git_dir(directory)
+    if not git_dir:
+        return None
+    common_dir = find_common_dir(git_dir)
+    objects_dir = os.path.join(common_dir, 'objects')
+    pack_dir = os.path.join(objects_dir, 'pack')
+    info_dir = os.path.join(objects_dir, 'info')
+
+    try:
+        sample = len(os.listdir(os.path.join(objects_dir, '17')))
+    except OSError:
+        sample = 0
+
+    try:
+        packs = [name for name in os.listdir(pack_dir) if name.endswith('.pack')]
+    except OSError:
+        packs = []
+
+    # Loose refs are replaced by rename, so a ref update always touches its directory
+    loose_refs = 0
+    refs_changed = _mtime(os.path.join(common_dir, 'packed-refs'))
+    for root, _, files in os.walk(os.path.join(common_dir, 'refs')):
+        loose_refs += len(files)
+        refs_changed = max(refs_changed, _mtime(root))
+
+    # --split rewrites the chain file on every write; a lone commit-graph predates split mode
+    graph_written = _mtime(os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain'))
+
+    return {
+        'loose_objects': sample * 256,
+        'packs': len(packs),
+        'loose_refs': loose_refs,
+        'commit_graph': (os.path.isfile(os.path.join(info_dir, 'commit-graph'))
+                         or os.path.isfile(os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain'))),
+        # Refs moved since the graph was written, so new commits are missing from it
+        'commit_graph_stale': (loose_refs > 0 or os.path.isfile(os.path.join(common_dir, 'packed-refs')))
+                              and graph_written < refs_changed,
+        'multi_pack_index': os.path.isfile(os.path.join(pack_dir, 'multi-pack-index')),
+        'checked_at': time.time()
+    }
+
+
+# (task name, is it due for this health report, git arguments)
+MAINTENANCE_TASKS = [
+    ('commit-graph', lambda h: h['commit_graph_stale'],
+     ['commit-graph', 'write', '--reachable', '--split']),
+    ('pack-refs', lambda h: h['loose_refs'] > LOOSE_REF_LIMIT,
+     ['pack-refs', '--all']),
+    ('loose-objects', lambda h: h['loose_objects'] > LOOSE_OBJECT_LIMIT,
+     ['maintenance', 'run', '--task=loose-objects']),
+    ('multi-pack-index', lambda h: h['packs'] > PACK_LIMIT and not h['multi_pack_index'],
+     ['multi-pack-index', 'write']),
+    ('incremental-repack', lambda h: h['packs'] > PACK_LIMIT and h['multi_pack_index'],
+     ['maintenance', 'run', '--task=incremental-repack']),
+    ('gc', lambda h: h['packs'] > GC_PACK_LIMIT,
+     ['gc', '--auto', '--quiet']),
+]
+
+
+def due_tasks(health):
+    """Names and arguments of the tasks a repository currently needs"""
+    return [(name, args) for name, is_due, args in MAINTENANCE_TASKS if is_due(health)]
+
+
+def _low_priority_wrapper():
+    """Command prefix that runs git at low CPU and idle IO priority where that is available
+
+    A prefix rather than preexec_fn, which is not safe to use from the
+    threaded server.
+    """
+    wrapper = []
+    if os.name != 'nt' and shutil.which('nice'):
+        wrapper += ['nice', '-n', '10']
+    if sys.platform.startswith('linux') and shutil.which('ionice'):
+        wrapper += ['ionice', '-c', '3']
+    return wrapper or None
+
+
+def run_task(directory, args, timeout=MAINTENANCE_TASK_TIMEOUT):
+    """Run one maintenance command at low CPU/IO priority and report the outcome"""
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+
+    try:
+        ticket = admission.controller.acquire('write', admission.BACKGROUND)
+    except admission.Overloaded as e:
+        return {'success': False, 'deferred': True, 'error': str(e), 'duration': 0.0}
+    start = time.time()
+    try:
+        process = git_process.run_git(['-C', directory] + args, timeout=timeout,
+                                      wrapper=_low_priority_wrapper(), **kwargs)
+    except git_process.OperationAborted as e:
+        return {'success': False, 'error': str(e), 'duration': round(time.time() - start, 3)}
+    finally:
+        admission.controller.release(ticket)
+    stderr = process.stderr
+
+    result = {'success': process.returncode == 0, 'duration': round(time.time() - start, 3)}
+    if process.returncode != 0:
+        result['error'] = stderr.decode('utf-8', errors='replace').strip()
+    return result
+
+
+class MaintenanceScheduler:
+    """Background thread that maintains saved repositories while the server is idle
+
+    Work is spent from a time budget that refills every MAINTENANCE_BUDGET_WINDOW
+    seconds, and only one task runs at a time. A task is only started when its
+    last recorded cost fits in what is left, or the budget is untouched; a
+    task that runs over is never killed for it, the overrun carries forward.
+    """
+
+    def __init__(self, get_repositories):
+        self.get_repositories = get_repositories
+        self.last_activity = time.time()
+        self.status = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.requested = []
+        self.thread = None
+        self.budget_used = 0.0
+        self.window_start = time.time()
+        # Seconds each (repository, task) took the last time it ran
+        self.task_costs = {}
+
+    def note_activity(self):
+        """Record an interactive request so maintenance backs off"""
+        self.last_activity = time.time()
+
+    def request_run(self, directory):
+        """Queue a repository for maintenance on the next pass, idle or not"""
+        with self.lock:
+            if directory not in self.requested:
+                self.requested.append(directory)
+        self.wake.set()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+            self.thread.start()
+
+    def budget_remaining(self):
+        while time.time() - self.window_start >= MAINTENANCE_BUDGET_WINDOW:
+            self.window_start += MAINTENANCE_BUDGET_WINDOW
+            self.budget_used = max(0.0, self.budget_used - MAINTENANCE_BUDGET_SECONDS)
+        return max(0.0, MAINTENANCE_BUDGET_SECONDS - self.budget_used)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'idle': time.time() - self.last_activity >= MAINTENANCE_IDLE_SECONDS,
+                'budget_seconds': MAINTENANCE_BUDGET_SECONDS,
+                'budget_remaining': round(self.budget_remaining(), 3),
+                'requested': list(self.requested),
+                'repositories': {path: dict(state) for path, state in self.status.items()}
+            }
+
+    def _next_repository(self):
+        with self.lock:
+            if self.requested:
+                return self.requested.pop(0)
+
+        if time.time() - self.last_activity < MAINTENANCE_IDLE_SECONDS:
+            return None
+
+        # Least recently maintained repository first
+        repositories = [path for path in self.get_repositories() if os.path.isdir(path)]
+        if not repositories:
+            return None
+        return min(repositories, key=lambda path: self.status.get(path, {}).get('last_checked', 0))
+
+    def maintain(self, directory):
+        """Check one repository and run whatever tasks fit in the budget"""
+        health = get_repo_health(directory)
+        state = {'health': health, 'last_checked': time.time(), 'tasks': []}
+
+        for name, args in (due_tasks(health) if health else []):
+            remaining = self.budget_remaining()
+            expected = self.task_costs.get((directory, name), 0.0)
+            # A task bigger than the whole budget still gets to run, once the budget is untouched
+            if remaining <= 0 or (expected > remaining and remaining < MAINTENANCE_BUDGET_SECONDS):
+                state['deferred'] = True
+                break
+            result = run_task(directory, args)
+            if result.get('deferred'):
+                # The server is busy; the task is still due on the next pass
+                state['deferred'] = True
+                break
+            self.budget_used += result['duration']
+            self.task_costs[(directory, name)] = result['duration']
+            result['task'] = name
+            result['finished_at'] = time.time()
+            state['tasks'].append(result)
+            if not result['success']:
+                logger.warning(f"Maintenance task {name} failed for {directory}: {result.get('error')}")
+
+        if state['tasks']:
+            state['health'] = get_repo_health(directory)
+
+        with self.lock:
+            previous = self.status.get(directory, {})
+            if not state['tasks'] and previous.get('tasks'):
+                state['tasks'] = previous['tasks']
+            self.status[directory] = state
+        return state
+
+    def _run(self):
+        while True:
+            self.wake.wait(MAINTENANCE_CHECK_INTERVAL)
+            self.wake.clear()
+            try:
+                while self.budget_remaining() > 0:
+                    directory = self._next_repository()
+                    if directory is None:
+                        break
+                    self.maintain(directory)
+                    # Go back to sleep after each repository unless more were explicitly requested
+                    if not self.requested:
+                        break
+            except Exception as e:
+                logger.error(f"Error in maintenance scheduler: {str(e)}")
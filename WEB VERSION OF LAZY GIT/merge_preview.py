@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazygit_core import ResultCache, process as git_process
+from lazygit_core.gitdir import find_common_dir, find_git_dir
+
+# merge-tree runs in parallel across targets, but never more than this many at once in total
+MERGE_PREVIEW_WORKERS = 4
+
+# Targets compared in one request
+MAX_MERGE_TARGETS = 50
+
+# Predictions by (repository, our tip, their tip); a pair of commits always merges the same way
+MERGE_PREVIEW_CACHE_SIZE = 512
+
+_pool = ThreadPoolExecutor(max_workers=MERGE_PREVIEW_WORKERS, thread_name_prefix='merge-preview')
+_results = ResultCache(size=MERGE_PREVIEW_CACHE_SIZE)
+
+
+def resolve_tips(directory, refs):
+    """Map each ref to its commit id (None when it does not name a commit) with one cat-file"""
+    names = ''.join(f'{ref}^{{commit}}\n' for ref in refs).encode('utf-8')
+    process = git_process.run_git(['cat-file', '--batch-check=%(objectname)'], cwd=directory, input=names)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.decode('utf-8', errors='replace').strip() or 'git cat-file failed')
+    tips = {}
+    for ref, line in zip(refs, process.stdout.decode('utf-8', errors='replace').splitlines()):
+        # Unknown names come back as "<name> missing"
+        tips[ref] = None if line.endswith(' missing') or line.endswith(' ambiguous') else line.strip()
+    return tips
+
+
+def default_targets(directory):
+    """The current branch's upstream, then every other local branch, most recently committed first"""
+    process = git_process.run_git(['for-each-ref', '--sort=-committerdate', '--format=%(refname:short)%00%(HEAD)',
+                                   f'--count={MAX_MERGE_TARGETS + 1}', 'refs/heads/'], cwd=directory)
+    targets = []
+    for line in process.stdout.decode('utf-8', errors='replace').splitlines():
+        name, _, current = line.partition('\0')
+        if current != '*':
+            targets.append(name)
+    upstream = git_process.run_git(['rev-parse', '--abbrev-ref', '@{upstream}'], cwd=directory)
+    if upstream.returncode == 0:
+        targets.insert(0, upstream.stdout.decode('utf-8', errors='replace').strip())
+    return list(dict.fromkeys(targets))[:MAX_MERGE_TARGETS]
+
+
+def parse_merge_tree(output):
+    """Split `git merge-tree --write-tree --name-only -z` output into conflicted paths and their reasons"""
+    fields = output.split('\0')
+    index = 1
+    paths = []
+    while index < len(fields) and fields[index]:
+        paths.append(fields[index])
+        index += 1
+    index += 1
+
+    reasons = {}
+    # Each message: number of paths, the paths, a conflict type, the human readable text
+    while index < len(fields) and fields[index]:
+        count = int(fields[index])
+        message_paths = fields[index + 1:index + 1 + count]
+        kind = fields[index + 1 + count] if index + 1 + count < len(fields) else ''
+        if kind.startswith('CONFLICT'):
+            for path in message_paths:
+                reasons.setdefault(path, []).append(kind)
+        index += count + 3
+    return [{'path': path, 'reasons': reasons.get(path, [])} for path in dict.fromkeys(paths)]
+
+
+def predict(directory, ours, theirs):
+    """Merge two commits in memory and report whether it would conflict; the work tree is never touched"""
+    counts = git_process.run_git(['rev-list', '--left-right', '--count', f'{ours}...{theirs}'], cwd=directory)
+    if counts.returncode != 0:
+        return {'status': 'error', 'error': counts.stderr.decode('utf-8', errors='replace').strip()}
+    ahead, behind = (int(value) for value in counts.stdout.split())
+    result = {'ahead': ahead, 'behind': behind, 'conflicts': []}
+    if behind == 0:
+        result['status'] = 'up_to_date'
+        return result
+    if ahead == 0:
+        result['status'] = 'fast_forward'
+        return result
+
+    process = git_process.run_git(['merge-tree', '--write-tree', '--name-only', '-z', ours, theirs], cwd=directory)
+    output = process.stdout.decode('utf-8', errors='replace')
+    if process.returncode == 0:
+        result['status'] = 'clean'
+    elif process.returncode == 1:
+        result['status'] = 'conflicts'
+        result['conflicts'] = parse_merge_tree(output)
+    else:
+        # Unrelated histories, a missing object in a partial clone, or a git without --write-tree (before 2.38)
+        result['status'] = 'error'
+        result['error'] = process.stderr.decode('utf-8', errors='replace').strip() or 'git merge-tree failed'
+    return result
+
+
+def _predict_cached(directory, common_dir, ours, theirs):
+    key = (common_dir, ours, theirs)
+    # Tips are part of the key, so an entry never goes stale; the fingerprint is constant
+    result = _results.get(key, 'tips')
+    if result is not None:
+        return dict(result, cached=True)
+    start = time.time()
+    result = predict(directory, ours, theirs)
+    result['duration'] = round(time.time() - start, 3)
+    if result['status'] != 'error':
+        _results.put(key, 'tips', result)
+    return dict(result, cached=False)
+
+
+def _run_with_operation(operation_id, function, *args):
+    """Run on a pool thread under the request's operation id, so cancelling the request stops it"""
+    git_process.set_request_operation_id(operation_id)
+    try:
+        return function(*args)
+    finally:
+        # Pool threads are reused; a fresh id keeps the next task from answering to this request
+        git_process.set_request_operation_id()
+
+
+def preview_merges(directory, targets, base='HEAD'):
+    """Predict merging each target into `base`, running the comparisons in parallel
+
+    Returns {'base', 'tip', 'results'} with one result per target, in the
+    order given: status is up_to_date, fast_forward, clean, conflicts or
+    error, with ahead/behind counts and the conflicted paths.
+    """
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        raise ValueError(f'Not a git repository: {directory}')
+    common_dir = find_common_dir(git_dir)
+    targets = list(dict.fromkeys(targets))
+    tips = resolve_tips(directory, [base] + targets)
+    ours = tips[base]
+    if ours is None:
+        raise ValueError(f'Unknown ref: {base}')
+
+    operation_id = git_process.get_request_operation_id()
+    futures = {}
+    for target in targets:
+        if tips[target] is not None:
+            futures[target] = _pool.submit(_run_with_operation, operation_id, _predict_cached,
+                                           os.path.abspath(directory), common_dir, ours, tips[target])
+    results = []
+    for target in targets:
+        if target not in futures:
+            results.append({'branch': target, 'tip': None, 'status': 'error', 'error': f'Unknown ref: {target}'})
+            continue
+        try:
+            result = futures[target].result()
+        except git_process.OperationAborted as e:
+            result = {'status': 'error', 'error': str(e)}
+        results.append({'branch': target, 'tip': tips[target], **result})
+    return {'base': base, 'tip': ours, 'results': results}
+
+
+def cache_stats():
+    return _results.stats()
@@ -0,0 +1,187 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import admission
+from lazygit_core import process as git_process
+
+logger = logging.getLogger(__name__)
+
+# Seconds between prefetches of the same repository
+DEFAULT_PREFETCH_INTERVAL = 900
+
+# Each interval is stretched or shrunk by up to this fraction so repositories spread out
+PREFETCH_JITTER = 0.2
+
+# Failed repositories back off exponentially up to this many seconds
+PREFETCH_MAX_BACKOFF = 6 * 3600
+
+PREFETCH_TIMEOUT = 300
+
+
+def prefetch_ref_for(upstream_ref):
+    """Map refs/remotes/<remote>/<branch> to where `fetch --prefetch` stores it"""
+    if upstream_ref and upstream_ref.startswith('refs/remotes/'):
+        return 'refs/prefetch/' + upstream_ref[len('refs/'):]
+    return None
+
+
+def _git(directory, *args, timeout=None):
+    try:
+        process = git_process.run_git(['-C', directory] + list(args), timeout=timeout)
+    except git_process.OperationAborted as e:
+        return -1, '', str(e)
+    return (process.returncode, process.stdout.decode('utf-8', errors='replace').strip(),
+            process.stderr.decode('utf-8', errors='replace').strip())
+
+
+def get_upstream(directory):
+    """Return (branch, full upstream ref) for HEAD, or (branch, None) without one"""
+    code, output, _ = _git(directory, 'rev-parse', '--symbolic-full-name', 'HEAD', '@{upstream}')
+    lines = output.splitlines()
+    # rev-parse still prints HEAD's ref when only the upstream lookup fails
+    branch = lines[0] if lines else None
+    if branch and branch.startswith('refs/heads/'):
+        branch = branch[len('refs/heads/'):]
+    if code != 0 or len(lines) < 2:
+        return branch, None
+    return branch, lines[1]
+
+
+def ref_exists(directory, ref):
+    code, _, _ = _git(directory, 'rev-parse', '--verify', '--quiet', ref)
+    return code == 0
+
+
+def is_ancestor(directory, ancestor, descendant):
+    code, _, _ = _git(directory, 'merge-base', '--is-ancestor', ancestor, descendant)
+    return code == 0
+
+
+def newer_prefetch_ref(directory, upstream):
+    """The prefetched ref for `upstream` when it exists and contains the remote-tracking branch
+
+    A push or a regular fetch moves the remote-tracking branch past the last
+    prefetch, so the prefetched ref is only used while it is at least as new.
+    """
+    prefetch_ref = prefetch_ref_for(upstream)
+    if not prefetch_ref or not ref_exists(directory, prefetch_ref):
+        return None
+    if not is_ancestor(directory, upstream, prefetch_ref):
+        return None
+    return prefetch_ref
+
+
+def ahead_behind(directory, ref):
+    """Count commits HEAD has that `ref` lacks, and the other way round"""
+    code, output, error = _git(directory, 'rev-list', '--left-right', '--count', f'HEAD...{ref}')
+    if code != 0:
+        raise RuntimeError(error or 'git rev-list failed')
+    ahead, behind = output.split()
+    return int(ahead), int(behind)
+
+
+class Prefetcher:
+    """Background thread that keeps saved repositories' remote objects fetched
+
+    Uses `git fetch --prefetch`, which downloads into refs/prefetch/ and leaves
+    remote-tracking branches alone, so the user's view of the remote only
+    changes when they pull.
+    """
+
+    def __init__(self, get_repositories, interval=DEFAULT_PREFETCH_INTERVAL):
+        self.get_repositories = get_repositories
+        self.interval = interval
+        self.enabled = True
+        self.state = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self.thread.start()
+
+    def configure(self, enabled=None, interval=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if interval is not None:
+            self.interval = max(60, int(interval))
+        self.wake.set()
+
+    def fetched_at(self, directory):
+        with self.lock:
+            return self.state.get(directory, {}).get('last_success')
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'interval': self.interval,
+                'repositories': {path: dict(state) for path, state in self.state.items()}
+            }
+
+    def _next_delay(self, failures):
+        delay = self.interval * (2 ** failures if failures else 1)
+        delay = min(delay, PREFETCH_MAX_BACKOFF)
+        return delay * random.uniform(1 - PREFETCH_JITTER, 1 + PREFETCH_JITTER)
+
+    def prefetch(self, directory, priority=admission.BACKGROUND):
+        """Fetch one repository into refs/prefetch/ and update its freshness
+
+        Raises admission.Overloaded when the server is too busy to start the fetch.
+        """
+        with admission.controller.admit('network', priority):
+            start = time.time()
+            code, _, error = _git(directory, 'fetch', '--prefetch', '--all', '--quiet', '--no-write-fetch-head',
+                                  timeout=PREFETCH_TIMEOUT)
+        with self.lock:
+            state = self.state.setdefault(directory, {})
+            state['last_attempt'] = start
+            state['duration'] = round(time.time() - start, 3)
+            if code == 0:
+                state['last_success'] = time.time()
+                state['failures'] = 0
+                state.pop('error', None)
+            else:
+                state['failures'] = state.get('failures', 0) + 1
+                state['error'] = error
+                logger.warning(f"Prefetch failed for {directory}: {error}")
+            state['next_due'] = time.time() + self._next_delay(state['failures'])
+            return dict(state)
+
+    def _due_repository(self):
+        now = time.time()
+        repositories = [path for path in self.get_repositories() if os.path.isdir(path)]
+        with self.lock:
+            for path in repositories:
+                state = self.state.setdefault(path, {})
+                if 'next_due' not in state:
+                    # Spread the first round over one interval instead of fetching everything at start-up
+                    state['next_due'] = now + random.uniform(0, self.interval)
+            due = [path for path in repositories if self.state[path]['next_due'] <= now]
+            next_due = min((self.state[path]['next_due'] for path in repositories), default=now + self.interval)
+        return (min(due, key=lambda path: self.state[path]['next_due']) if due else None), next_due
+
+    def _run(self):
+        while True:
+            timeout = self.interval
+            try:
+                if self.enabled:
+                    directory, next_due = self._due_repository()
+                    if directory:
+                        try:
+                            self.prefetch(directory)
+                        except admission.Overloaded as e:
+                            # Interactive work comes first; try this repository again later
+                            with self.lock:
+                                self.state[directory]['next_due'] = time.time() + e.retry_after
+                        continue
+                    timeout = max(1, next_due - time.time())
+            except Exception as e:
+                logger.error(f"Error in prefetcher: {str(e)}")
+            self.wake.wait(timeout)
+            self.wake.clear()
@@ -0,0 +1,324 @@
+import heapq
+import logging
+import os
+import struct
+import tempfile
+import time
+
+from background_jobs import BackgroundJob, JobRegistry
+from lazygit_core import ResultCache, process as git_process
+from lazygit_core.gitdir import find_common_dir, find_git_dir
+
+logger = logging.getLogger(__name__)
+
+# Largest blobs and directories reported by default, and the most a client may ask for
+DEFAULT_TOP = 50
+MAX_TOP = 1000
+
+# Directories are summed up to this many path components deep
+DEFAULT_DIRECTORY_DEPTH = 3
+MAX_DIRECTORY_DEPTH = 10
+
+# A progress event every this many objects read from cat-file
+PROGRESS_EVERY = 100000
+
+# Walking every object of a large history takes a while
+ANALYSIS_TIMEOUT = 1800
+
+# A queued analysis waits this long for a background slot before giving up
+ANALYSIS_QUEUE_TIMEOUT = 300
+
+# Finished analyses kept, keyed by repository and options, valid while the pack set is unchanged
+ANALYSIS_CACHE_SIZE = 8
+
+BATCH_CHECK_FORMAT = '%(objecttype) %(objectname) %(objectsize) %(objectsize:disk) %(rest)'
+
+# count-objects -v reports these in KiB
+COUNT_OBJECTS_SIZES = ('size', 'size-pack', 'size-garbage')
+
+_jobs = JobRegistry()
+_results = ResultCache(size=ANALYSIS_CACHE_SIZE)
+
+
+def count_objects(directory):
+    """`git count-objects -v` as a dict, with sizes converted to bytes"""
+    process = git_process.run_git(['count-objects', '-v'], cwd=directory)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.decode('utf-8', errors='replace').strip() or 'git count-objects failed')
+    stats = {}
+    for line in process.stdout.decode('utf-8', errors='replace').splitlines():
+        key, _, value = line.partition(':')
+        try:
+            value = int(value)
+        except ValueError:
+            continue
+        stats[key.strip()] = value * 1024 if key.strip() in COUNT_OBJECTS_SIZES else value
+    return stats
+
+
+def _index_object_count(index_path):
+    """Objects in a pack, read from the last fan-out entry of its .idx (versions 1 and 2)"""
+    try:
+        with open(index_path, 'rb') as f:
+            header = f.read(8 + 256 * 4)
+    except OSError:
+        return None
+    offset = 8 if header[:4] == b'\xfftOc' else 0
+    if len(header) < offset + 256 * 4:
+        return None
+    return struct.unpack('>I', header[offset + 255 * 4:offset + 256 * 4])[0]
+
+
+def pack_stats(directory):
+    """Every pack with its size, object count and the files that change how git treats it"""
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        return []
+    pack_dir = os.path.join(find_common_dir(git_dir), 'objects', 'pack')
+    try:
+        names = sorted(name for name in os.listdir(pack_dir) if name.endswith('.pack'))
+    except OSError:
+        return []
+    packs = []
+    for name in names:
+        base = os.path.join(pack_dir, name[:-len('.pack')])
+        try:
+            st = os.stat(base + '.pack')
+        except OSError:
+            continue
+        packs.append({
+            'name': name,
+            'size': st.st_size,
+            'objects': _index_object_count(base + '.idx'),
+            'modified': st.st_mtime,
+            'bitmap': os.path.isfile(base + '.bitmap'),
+            'keep': os.path.isfile(base + '.keep'),
+            'promisor': os.path.isfile(base + '.promisor'),
+        })
+    return packs
+
+
+def count_loose_objects(objects_dir):
+    count = 0
+    for fanout in range(256):
+        try:
+            count += len(os.listdir(os.path.join(objects_dir, f'{fanout:02x}')))
+        except OSError:
+            pass
+    return count
+
+
+def pack_set_fingerprint(directory):
+    """Pack names plus the number of loose objects: what the cached analysis depends on
+
+    Pack names are hashes of their content, so the same names mean the same
+    packed objects, and new commits or fetches that are not packed yet show
+    up as more loose objects. Moving or deleting a ref without adding objects
+    keeps the fingerprint, so a cached analysis may still count objects that
+    only a deleted branch reached until the next gc.
+    """
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        return None
+    loose = count_loose_objects(os.path.join(find_common_dir(git_dir), 'objects'))
+    return '|'.join([f'loose={loose}'] + [pack['name'] for pack in pack_stats(directory)])
+
+
+def _directories_of(path, depth):
+    parts = path.split('/')[:-1]
+    return ['/'.join(parts[:level]) for level in range(1, min(depth, len(parts)) + 1)]
+
+
+def scan_objects(directory, top, depth, operation_id=None, on_progress=None):
+    """Stream every object reachable from any ref through cat-file, keeping only what is reported
+
+    rev-list's output is piped straight into cat-file, and cat-file's output
+    is read line by line: the largest blobs are kept in a heap of `top`
+    entries and directory sizes in one running total per directory, so memory
+    does not grow with the number of objects. A blob that appears under
+    several paths is counted once, under the first path rev-list reports.
+    Objects a partial clone has not fetched are skipped, never downloaded.
+    """
+    largest = []
+    directories = {}
+    totals = {'objects': 0, 'blobs': 0, 'blob_size': 0, 'blob_disk_size': 0}
+    with tempfile.TemporaryFile() as errors:
+        rev_list = git_process.start_git(['rev-list', '--objects', '--all', '--missing=allow-promisor'],
+                                         cwd=directory, timeout=ANALYSIS_TIMEOUT, operation_id=operation_id,
+                                         stderr=errors)
+        try:
+            cat_file = git_process.start_git(['cat-file', f'--batch-check={BATCH_CHECK_FORMAT}'],
+                                             cwd=directory, timeout=ANALYSIS_TIMEOUT, operation_id=operation_id,
+                                             stdin=rev_list.process.stdout, stderr=errors)
+        except BaseException:
+            git_process.stop(rev_list)
+            raise
+        # cat-file holds the pipe now; closing ours lets rev-list see it go if cat-file dies
+        rev_list.process.stdout.close()
+        try:
+            try:
+                for line in cat_file.process.stdout:
+                    totals['objects'] += 1
+                    if on_progress and totals['objects'] % PROGRESS_EVERY == 0:
+                        on_progress(dict(totals))
+                    kind, oid, size, disk_size, *rest = line.rstrip(b'\n').split(b' ', 4)
+                    if kind != b'blob':
+                        continue
+                    size, disk_size = int(size), int(disk_size)
+                    path = rest[0].decode('utf-8', errors='replace') if rest else ''
+                    totals['blobs'] += 1
+                    totals['blob_size'] += size
+                    totals['blob_disk_size'] += disk_size
+
+                    entry = (size, oid, path, disk_size)
+                    if len(largest) < top:
+                        heapq.heappush(largest, entry)
+                    elif entry > largest[0]:
+                        heapq.heappushpop(largest, entry)
+
+                    for name in _directories_of(path, depth):
+                        total = directories.get(name)
+                        if total is None:
+                            directories[name] = [size, disk_size, 1]
+                        else:
+                            total[0] += size
+                            total[1] += disk_size
+                            total[2] += 1
+                cat_file.process.wait()
+                rev_list.process.wait()
+            except BaseException:
+                git_process.stop(cat_file)
+                git_process.stop(rev_list)
+                raise
+            try:
+                git_process.finish(cat_file)
+            finally:
+                git_process.finish(rev_list)
+        finally:
+            cat_file.process.stdout.close()
+        if rev_list.process.returncode != 0 or cat_file.process.returncode != 0:
+            errors.seek(0)
+            message = errors.read().decode('utf-8', errors='replace').strip()
+            raise RuntimeError(message or 'git rev-list --objects failed')
+
+    blobs = [{'oid': oid.decode('ascii'), 'path': path, 'size': size, 'disk_size': disk_size}
+             for size, oid, path, disk_size in sorted(largest, reverse=True)]
+    biggest = sorted(directories.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        'totals': totals,
+        'blobs': blobs,
+        'directories': [{'path': name, 'size': size, 'disk_size': disk_size, 'blobs': count}
+                        for name, (size, disk_size, count) in biggest]
+    }
+
+
+class AnalysisJob(BackgroundJob):
+    """Size analysis of one repository, streamed section by section
+
+    Events: count_objects, packs, any number of progress, largest_blobs and
+    directories, then done. A finished analysis is cached until the pack set
+    or the number of loose objects changes, and replaying it sends the same
+    events with cached=True.
+    """
+
+    kind = 'analyze'
+
+    def __init__(self, directory, top=DEFAULT_TOP, depth=DEFAULT_DIRECTORY_DEPTH):
+        super().__init__()
+        self.directory = os.path.abspath(directory)
+        self.top = top
+        self.depth = depth
+        self.cached = False
+        self.result = None
+
+    def _sections(self, result):
+        yield {'type': 'count_objects', 'stats': result['count_objects']}
+        yield {'type': 'packs', **result['packs']}
+        yield {'type': 'largest_blobs', 'totals': result['totals'], 'blobs': result['blobs']}
+        yield {'type': 'directories', 'depth': self.depth, 'directories': result['directories']}
+
+    def _analyze(self):
+        result = {'count_objects': count_objects(self.directory)}
+        self._emit({'type': 'count_objects', 'stats': result['count_objects']})
+
+        packs = pack_stats(self.directory)
+        result['packs'] = {'packs': packs, 'count': len(packs), 'size': sum(pack['size'] for pack in packs)}
+        self._emit({'type': 'packs', **result['packs']})
+
+        started = time.time()
+        result.update(scan_objects(self.directory, self.top, self.depth, operation_id=self.job_id,
+                                   on_progress=lambda totals: self._emit({'type': 'progress', **totals})))
+        result['scan_seconds'] = round(time.time() - started, 3)
+        self._emit({'type': 'largest_blobs', 'totals': result['totals'], 'blobs': result['blobs']})
+        self._emit({'type': 'directories', 'depth': self.depth, 'directories': result['directories']})
+        return result
+
+    def _run(self):
+        self.state = 'running'
+        self.started = time.time()
+        self._emit({'type': 'state', 'state': 'running', 'directory': self.directory})
+        try:
+            key = (self.directory, self.top, self.depth)
+            fingerprint = pack_set_fingerprint(self.directory)
+            if fingerprint is None:
+                raise RuntimeError(f'Not a git repository: {self.directory}')
+            result = _results.get(key, fingerprint)
+            if result is not None:
+                self.cached = True
+                for event in self._sections(result):
+                    self._emit(dict(event, cached=True))
+            else:
+                with self._admit('read', ANALYSIS_QUEUE_TIMEOUT):
+                    result = self._analyze()
+                # Only cache what is still current; a repack during the scan makes it stale
+                if pack_set_fingerprint(self.directory) == fingerprint:
+                    _results.put(key, fingerprint, result)
+            self.result = result
+            self.state = 'completed'
+        except git_process.OperationCancelled:
+            self.state = 'cancelled'
+            self.error = 'Cancelled'
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.error(f"Analysis {self.job_id} of {self.directory} failed: {self.error}")
+        finally:
+            self._finish()
+
+    def describe(self, include_result=False):
+        description = {
+            'id': self.job_id,
+            'directory': self.directory,
+            'state': self.state,
+            'error': self.error,
+            'top': self.top,
+            'depth': self.depth,
+            'cached': self.cached,
+            'duration': round((self.finished or time.time()) - self.started, 3) if self.started else None
+        }
+        if include_result:
+            description['result'] = self.result
+        return description
+
+
+def start_analysis(directory, top=DEFAULT_TOP, depth=DEFAULT_DIRECTORY_DEPTH):
+    """Start an analysis, or return the one already running with the same options"""
+    directory = os.path.abspath(directory)
+    running = _jobs.find(lambda job: not job.finished and (job.directory, job.top, job.depth) == (directory, top, depth))
+    if running is not None:
+        return running
+    job = _jobs.add(AnalysisJob(directory, top, depth))
+    job.start()
+    return job
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
+
+
+def list_jobs():
+    return _jobs.describe()
+
+
+def cache_stats():
+    return _results.stats()
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from fs_browser import is_git_repository
+
+# Directories never worth descending into while looking for repositories
+PRUNED_DIRECTORIES = {
+    'node_modules', '.git', '.hg', '.svn', '__pycache__', '.venv', 'venv',
+    '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.cache', '.gradle',
+    'bower_components', 'site-packages', '$RECYCLE.BIN', 'System Volume Information'
+}
+
+DEFAULT_SCAN_DEPTH = 4
+DEFAULT_SCAN_WORKERS = 8
+
+
+def _scan_directory(path, depth, max_depth, nested):
+    """Check one directory and list the subdirectories still worth visiting"""
+    is_repo = is_git_repository(path)
+    if (is_repo and not nested) or depth >= max_depth:
+        return is_repo, []
+
+    subdirectories = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name in PRUNED_DIRECTORIES:
+                    continue
+                try:
+                    # Symlinks are skipped so loops and duplicate mounts are never walked
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return is_repo, subdirectories
+
+
+def scan_repositories(root, max_depth=DEFAULT_SCAN_DEPTH, workers=DEFAULT_SCAN_WORKERS, nested=False):
+    """Walk `root` with a bounded thread pool and yield repositories as they are found
+
+    Each directory is one task, so at most `workers` scandir calls are in
+    flight at once. Unless `nested` is set, the walk stops at the first
+    repository on each path instead of looking inside it.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='repo-scan')
+    try:
+        pending = {executor.submit(_scan_directory, root, 0, max_depth, nested): (root, 0)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, depth = pending.pop(future)
+                try:
+                    is_repo, subdirectories = future.result()
+                except Exception:
+                    continue
+                if is_repo:
+                    yield os.path.normpath(path)
+                for subdirectory in subdirectories:
+                    child = executor.submit(_scan_directory, subdirectory, depth + 1, max_depth, nested)
+                    pending[child] = (subdirectory, depth + 1)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
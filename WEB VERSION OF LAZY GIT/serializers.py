@@ -0,0 +1,87 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Items encoded per write when streaming a list as NDJSON
+NDJSON_CHUNK_SIZE = 500
+
+
+def dumps_json(obj):
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_msgpack(obj):
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+# Available encoders by mimetype, in order of preference when the client accepts several
+SERIALIZERS = {JSON_MIMETYPE: dumps_json}
+if msgpack is not None:
+    SERIALIZERS[MSGPACK_MIMETYPE] = dumps_msgpack
+    SERIALIZERS['application/x-msgpack'] = dumps_msgpack
+
+
+def negotiate(accept_header):
+    """Pick a mimetype from an Accept header; JSON unless the client prefers something we have"""
+    best, best_quality = JSON_MIMETYPE, 0.0
+    for item in (accept_header or '').split(','):
+        mimetype, _, params = item.strip().partition(';')
+        mimetype = mimetype.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if mimetype in SERIALIZERS and quality > best_quality:
+            best, best_quality = mimetype, quality
+    return best
+
+
+def wants_ndjson(accept_header):
+    return NDJSON_MIMETYPE in (accept_header or '').lower()
+
+
+def serialize(payload, accept_header=None):
+    """Return (body bytes, mimetype) for a payload in the format the client asked for"""
+    mimetype = negotiate(accept_header)
+    return SERIALIZERS[mimetype](payload), mimetype
+
+
+def iter_ndjson(payload, items_key):
+    """Yield a payload as NDJSON: a header record, one record per list item, then done
+
+    The header carries every field except the list, so clients can render
+    the first items before the rest have been encoded.
+    """
+    items = payload.get(items_key) or []
+    header = {key: value for key, value in payload.items() if key != items_key}
+    yield dumps_json({'type': 'header', **header, 'count': len(items)}) + b'\n'
+
+    chunk = []
+    for item in items:
+        chunk.append(dumps_json({'type': 'item', 'item': item}))
+        if len(chunk) >= NDJSON_CHUNK_SIZE:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+    yield dumps_json({'type': 'done', 'count': len(items)}) + b'\n'
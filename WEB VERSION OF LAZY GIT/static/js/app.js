@@ -28,6 +28,8 @@ const gitAddRemoteBtn = document.getElementById('git-add-remote-btn');
 // Modals
 const commitModal = document.getElementById('commit-modal');
 const commitMessageInput = document.getElementById('commit-message');
+const commitStageAllInput = document.getElementById('commit-stage-all');
+const commitPushInput = document.getElementById('commit-push');
 const submitCommitBtn = document.getElementById('submit-commit-btn');
 const commitHistorySection = document.getElementById('commit-history-section');
 const commitList = document.getElementById('commit-list');
@@ -52,6 +54,7 @@ let isProcessing = false;
 let processingTimeout = null;
 let currentRepoPath = '';
 let gitAvailable = true; // Track Git availability
+const gitChannel = new GitChannel(); // WebSocket command channel, used when the server supports it
 
 // Initialize application
 function initializeApp() {
@@ -59,6 +62,8 @@ function initializeApp() {
     applySavedTheme();
     checkGitAvailability();
     updateUIBasedOnCurrentRepo();
+    gitChannel.connect();
+    gitChannel.onEvent(handleRepositoryEvent);
 
     // Automatically set processing state to false after 15 seconds if stuck
     setInterval(resetProcessingIfStuck, 15000);
@@ -151,9 +156,16 @@ function processApiResponse(response, successCallback, errorCallback) {
     });
 }
 
+// Id sent with requests made while an operation is in progress, so the server can cancel its git processes
+let currentOperationId = null;
+
 // Override fetch for better error handling
 const originalFetch = window.fetch;
-window.fetch = function(url, options) {
+window.fetch = function(url, options = {}) {
+    if (currentOperationId) {
+        options.headers = new Headers(options.headers || {});
+        options.headers.set('X-Operation-Id', currentOperationId);
+    }
     return originalFetch(url, options).catch(error => {
         logToTerminal(`Network error: ${error.message}. Check your connection.`, 'error');
         throw error;
@@ -166,7 +178,8 @@ function resetProcessingIfStuck() {
         const lastActivityTime = parseInt(localStorage.getItem('lastActivityTime') || '0');
         const currentTime = Date.now();
         
-        // If more than 20 seconds have passed since the last activity and isProcessing is still true
+        // If more than 20 seconds have passed since the last activity and isProcessing is still true.
+        // Only the UI is reset: the git command keeps running until it finishes or hits its server deadline
         if (currentTime - lastActivityTime > 20000) {
             logToTerminal('Processing state reset due to timeout', 'warning');
             resetProcessingState();
@@ -174,16 +187,50 @@ function resetProcessingIfStuck() {
     }
 }
 
+// Run a read command over the WebSocket channel when it is open, otherwise over HTTP
+function gitRequest(op, url) {
+    if (gitChannel.isOpen()) {
+        return gitChannel.request(op);
+    }
+    return fetch(url).then(response => response.json());
+}
+
+// Keep an open commit history current when the server reports new commits or branch moves
+function handleRepositoryEvent(event) {
+    const historyOpen = commitHistorySection.classList.contains('show');
+    if (historyOpen && !isProcessing && event.changed.some(part => ['head', 'refs', 'repository'].includes(part))) {
+        gitRequest('log', '/log').then(data => {
+            if (data.success) displayCommitHistory(data.commits);
+        }).catch(() => {});
+    }
+}
+
+// Ask the server to kill the git processes of the operation in progress
+function cancelCurrentOperation() {
+    gitChannel.cancelAll();
+    if (!currentOperationId) return;
+    originalFetch(`/operations/${encodeURIComponent(currentOperationId)}/cancel`, { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                logToTerminal(`Cancelled ${data.cancelled} running git process(es)`, 'warning');
+            }
+        })
+        .catch(() => {});
+}
+
 // Reset processing state
 function resetProcessingState() {
     clearTimeout(processingTimeout);
     isProcessing = false;
+    currentOperationId = null;
     loadingOverlay.classList.remove('active');
 }
 
 // Set processing state with timeout
 function setProcessing(message = 'Processing operation...') {
     isProcessing = true;
+    currentOperationId = `op-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
     loadingMessage.textContent = message;
     loadingOverlay.classList.add('active');
     
@@ -191,16 +238,23 @@ function setProcessing(message = 'Processing operation...') {
     localStorage.setItem('lastActivityTime', Date.now().toString());
     
     // Set a timeout to automatically reset the processing state after 30 seconds
-    // This prevents the UI from getting stuck if an operation fails
+    // This prevents the UI from getting stuck if an operation fails; a push or pull
+    // may legitimately take longer, so the server-side command is left running
     clearTimeout(processingTimeout);
     processingTimeout = setTimeout(() => {
         resetProcessingState();
-        logToTerminal('Operation timed out. The UI has been reset.', 'warning');
+        logToTerminal('Operation is taking a while. The UI has been reset; it keeps running in the background.', 'warning');
     }, 30000);
 }
 
 // Set up event listeners
 function setupEventListeners() {
+    // Stopping a running operation is always the user's call
+    document.getElementById('cancel-operation-btn').addEventListener('click', () => {
+        cancelCurrentOperation();
+        resetProcessingState();
+    });
+    
     // Repository management
     repositoryDropdown.addEventListener('change', handleRepositoryChange);
     addRepoBtn.addEventListener('click', openDirectoryDialog);
@@ -378,19 +432,10 @@ function getGitStatus() {
     
     setProcessing('Getting git status...');
     
-    fetch('/status')
-    .then(response => response.json())
+    gitRequest('status', '/status')
     .then(data => {
         resetProcessingState();
-        
-        if (data.success) {
-            logToTerminal('Git Status:', 'heading');
-            data.output.split('\n').forEach(line => {
-                logToTerminal(line, getStatusLineType(line));
-            });
-        } else {
-            logToTerminal(`Error getting status: ${data.error}`, 'error');
-        }
+        displayGitStatus(data);
     })
     .catch(error => {
         resetProcessingState();
@@ -398,6 +443,17 @@ function getGitStatus() {
     });
 }
 
+function displayGitStatus(data) {
+    if (data.success) {
+        logToTerminal('Git Status:', 'heading');
+        data.output.split('\n').forEach(line => {
+            logToTerminal(line, getStatusLineType(line));
+        });
+    } else {
+        logToTerminal(`Error getting status: ${data.error}`, 'error');
+    }
+}
+
 function getStatusLineType(line) {
     if (line.includes('modified:')) return 'modified';
     if (line.includes('new file:')) return 'added';
@@ -446,26 +502,45 @@ function commitChanges() {
     }
     
     hideModal('commit-modal');
-    setProcessing('Committing changes...');
+    setProcessing(commitPushInput.checked ? 'Committing and pushing changes...' : 'Committing changes...');
+    
+    // Stage, commit, push and refresh status in a single request
+    const steps = [];
+    if (commitStageAllInput.checked) steps.push({ id: 'add', op: 'add' });
+    steps.push({ id: 'commit', op: 'commit', args: { message } });
+    if (commitPushInput.checked) steps.push({ id: 'push', op: 'push' });
+    steps.push({ id: 'status', op: 'status', always: true });
     
-    fetch('/commit', {
+    fetch('/batch', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ message })
+        body: JSON.stringify({ steps })
     })
     .then(response => response.json())
     .then(data => {
         resetProcessingState();
         
-        if (data.success) {
-            logToTerminal(`Changes committed: ${message}`, 'success');
-            // Refresh status
-            getGitStatus();
-        } else {
+        if (!data.steps) {
             logToTerminal(`Error committing changes: ${data.error}`, 'error');
+            return;
         }
+        
+        const messages = {
+            add: ['Changes staged successfully', 'Error staging changes'],
+            commit: [`Changes committed: ${message}`, 'Error committing changes'],
+            push: ['Changes pushed to remote successfully', 'Error pushing changes']
+        };
+        data.steps.forEach(step => {
+            if (step.op === 'status') {
+                if (step.result) displayGitStatus(step.result);
+            } else if (step.status === 'ok') {
+                logToTerminal(messages[step.op][0], 'success');
+            } else if (step.status === 'failed') {
+                logToTerminal(`${messages[step.op][1]}: ${step.result.error}`, 'error');
+            }
+        });
     })
     .catch(error => {
         resetProcessingState();
@@ -496,13 +571,17 @@ function pushChanges() {
 function pullChanges() {
     setProcessing('Pulling changes from remote...');
     
-    fetch('/pull')
+    fetch('/pull?prefer_prefetch=1')
     .then(response => response.json())
     .then(data => {
         resetProcessingState();
         
         if (data.success) {
-            logToTerminal('Changes pulled from remote successfully', 'success');
+            if (data.source === 'prefetch') {
+                logToTerminal('Fast-forwarded from prefetched changes', 'success');
+            } else {
+                logToTerminal('Changes pulled from remote successfully', 'success');
+            }
             // Refresh status
             getGitStatus();
         } else {
@@ -518,8 +597,7 @@ function pullChanges() {
 function getCommitHistory() {
     setProcessing('Loading commit history...');
     
-    fetch('/log')
-    .then(response => response.json())
+    gitRequest('log', '/log')
     .then(data => {
         resetProcessingState();
         
@@ -614,8 +692,7 @@ function listBranches() {
     
     setProcessing('Fetching branches...');
     
-    fetch('/git-branches')
-    .then(response => response.json())
+    gitRequest('branches', '/git-branches')
     .then(data => {
         resetProcessingState();
         
@@ -642,8 +719,7 @@ function listRemotes() {
     
     setProcessing('Fetching remotes...');
     
-    fetch('/git-remotes')
-    .then(response => response.json())
+    gitRequest('remotes', '/git-remotes')
     .then(data => {
         resetProcessingState();
         
@@ -761,7 +837,14 @@ function checkoutSelectedBranch() {
         resetProcessingState();
         
         if (data.success) {
-            logToTerminal(`Switched to branch "${branchName}"`, 'success');
+            if (data.directory) {
+                // Worktree mode: the branch lives in its own directory, which is now the current one
+                currentDirectoryDisplay.textContent = data.directory;
+                currentRepoPath = data.directory;
+                logToTerminal(data.message, 'success');
+            } else {
+                logToTerminal(`Switched to branch "${branchName}"`, 'success');
+            }
             // Refresh status
             getGitStatus();
         } else {
@@ -0,0 +1,115 @@
+// Persistent WebSocket channel to the server.
+// Many commands share one connection: each request gets an id, streamed output
+// arrives as chunks for that id, and the server pushes repository change events.
+// At most `maxInFlight` commands are sent at once; the rest wait here.
+class GitChannel {
+    constructor() {
+        this.socket = null;
+        this.open = false;
+        this.nextId = 1;
+        this.maxInFlight = 8;
+        this.inFlight = new Map();
+        this.waiting = [];
+        this.eventHandlers = [];
+        this.retryDelay = 1000;
+    }
+
+    connect() {
+        return fetch('/channel-info')
+            .then(response => response.json())
+            .then(info => {
+                if (!info.available || !('WebSocket' in window)) return false;
+                this.maxInFlight = info.max_in_flight || this.maxInFlight;
+                this.openSocket();
+                return true;
+            })
+            .catch(() => false);
+    }
+
+    openSocket() {
+        const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+        this.socket = new WebSocket(`${scheme}://${location.host}/channel`);
+
+        this.socket.addEventListener('open', () => {
+            this.open = true;
+            this.retryDelay = 1000;
+            this.flush();
+        });
+
+        this.socket.addEventListener('message', event => this.handleMessage(JSON.parse(event.data)));
+
+        this.socket.addEventListener('close', () => {
+            this.open = false;
+            // Anything still outstanding will never get a reply on this socket
+            this.inFlight.forEach(request => request.reject(new Error('Channel closed')));
+            this.inFlight.clear();
+            setTimeout(() => this.openSocket(), this.retryDelay);
+            this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+        });
+    }
+
+    isOpen() {
+        return this.open;
+    }
+
+    // Run a command; resolves with the same JSON body the HTTP endpoint returns.
+    // With onChunk, streamed records are delivered as they arrive.
+    request(op, args = {}, { stream = false, onChunk = null } = {}) {
+        return new Promise((resolve, reject) => {
+            const id = String(this.nextId++);
+            this.waiting.push({ id, message: { id, op, args, stream }, resolve, reject, onChunk });
+            this.flush();
+        });
+    }
+
+    cancel(id) {
+        const index = this.waiting.findIndex(request => request.id === id);
+        if (index !== -1) {
+            this.waiting.splice(index, 1)[0].reject(new Error('Cancelled'));
+        } else if (this.inFlight.has(id) && this.open) {
+            this.socket.send(JSON.stringify({ type: 'cancel', id }));
+        }
+    }
+
+    cancelAll() {
+        [...this.waiting.map(request => request.id), ...this.inFlight.keys()].forEach(id => this.cancel(id));
+    }
+
+    onEvent(handler) {
+        this.eventHandlers.push(handler);
+    }
+
+    flush() {
+        while (this.open && this.waiting.length && this.inFlight.size < this.maxInFlight) {
+            const request = this.waiting.shift();
+            this.inFlight.set(request.id, request);
+            this.socket.send(JSON.stringify(request.message));
+        }
+    }
+
+    handleMessage(message) {
+        if (message.type === 'event') {
+            this.eventHandlers.forEach(handler => handler(message));
+            return;
+        }
+        if (message.type === 'hello') {
+            this.maxInFlight = message.max_in_flight;
+            return;
+        }
+
+        const request = this.inFlight.get(message.id);
+        if (!request) return;
+
+        if (message.type === 'chunk') {
+            if (request.onChunk) request.onChunk(message.data);
+        } else if (message.type === 'result') {
+            this.inFlight.delete(message.id);
+            request.resolve(message.body || { success: message.status < 400 });
+            this.flush();
+        } else if (message.type === 'error') {
+            this.inFlight.delete(message.id);
+            request.reject(new Error(message.error));
+            this.flush();
+        }
+    }
+}
@@ -0,0 +1,101 @@
+import json
+import mimetypes
+import os
+import threading
+
+from flask import send_from_directory
+
+from http_cache import accepted_encodings
+
+# Bundles the page loads: bundle name -> source files under static/, in load order
+BUNDLES = {
+    'app.css': ['css/styles.css'],
+    'app.js': ['js/channel.js', 'js/app.js']
+}
+
+# Built bundles, their compressed variants and the manifest live here, under static/
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Precompressed variants in order of preference
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+# Fingerprinted files never change, so browsers may keep them for a year without asking
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetManifest:
+    """Maps bundle names to the files templates should load
+
+    With a manifest from build_assets.py that is the one minified, fingerprinted
+    bundle. Without one (running from source) it is the original files, each
+    with a ?v= of its modification time so edits still bypass the browser cache.
+    The manifest is re-read when build_assets.py rewrites it.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        self.lock = threading.Lock()
+        self.loaded_mtime = None
+        self.bundles = {}
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self.lock:
+            if mtime == self.loaded_mtime:
+                return self.bundles
+            bundles = {}
+            if mtime is not None:
+                try:
+                    with open(self.path, 'r') as f:
+                        bundles = json.load(f)
+                except (OSError, ValueError):
+                    bundles = {}
+            # Ignore entries whose file is missing, e.g. a manifest copied without its bundles
+            self.bundles = {name: info for name, info in bundles.items()
+                            if os.path.isfile(os.path.join(self.static_folder, DIST_DIR, info['file']))}
+            self.loaded_mtime = mtime
+            return self.bundles
+
+    def files(self, name):
+        """[(endpoint, filename, query args)] for url_for, in load order"""
+        info = self._refresh().get(name)
+        if info is not None:
+            return [('asset', info['file'], {})]
+        files = []
+        for source in BUNDLES[name]:
+            try:
+                version = str(int(os.stat(os.path.join(self.static_folder, source)).st_mtime))
+            except OSError:
+                version = None
+            files.append(('static', source, {'v': version} if version else {}))
+        return files
+
+    def describe(self):
+        bundles = self._refresh()
+        return {'built': bool(bundles), 'bundles': bundles}
+
+
+def send_asset(static_folder, filename, accept_encoding):
+    """Serve a built bundle, precompressed when the client accepts it, with immutable caching"""
+    directory = os.path.join(static_folder, DIST_DIR)
+    accepted = accepted_encodings(accept_encoding)
+    encoding, suffix = None, ''
+    for name, extension in PRECOMPRESSED:
+        if accepted.get(name, 0) > 0 and os.path.isfile(os.path.join(directory, filename + extension)):
+            encoding, suffix = name, extension
+            break
+
+    response = send_from_directory(directory, filename + suffix,
+                                   mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                                   max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,353 @@
+import bisect
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from lazygit_core import process as git_process
+from lazygit_core.gitdir import find_git_dir
+
+logger = logging.getLogger(__name__)
+
+# Name of the fsmonitor hook script installed into a repository's git directory
+FSMONITOR_HOOK_NAME = 'lazygit-fsmonitor.py'
+
+# Changes remembered per watched worktree before older tokens are forced to rescan
+FSMONITOR_MAX_CHANGES = 100000
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+HOOK_TEMPLATE = '''# Installed by LazyGit. Answers git's fsmonitor (hook protocol v2) queries
+# from the LazyGit server's file watcher. If the server is not running the
+# hook fails and git falls back to a normal full scan. Plain sockets keep the
+# interpreter start-up cost down, since git runs this on every status.
+import socket
+import sys
+from urllib.parse import quote
+
+HOST = {host!r}
+PORT = {port!r}
+REPOSITORY = {repository!r}
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != '2':
+        return 1
+    path = '/fsmonitor?repo=' + quote(REPOSITORY, safe='') + '&token=' + quote(sys.argv[2], safe='')
+    try:
+        with socket.create_connection((HOST, PORT), timeout=2) as connection:
+            connection.sendall(('GET ' + path + ' HTTP/1.0\\r\\nHost: ' + HOST + '\\r\\n\\r\\n').encode('utf-8'))
+            chunks = []
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return 1
+    head, _, body = b''.join(chunks).partition(b'\\r\\n\\r\\n')
+    if head.split(b' ', 2)[1:2] != [b'200']:
+        return 1
+    sys.stdout.buffer.write(body)
+    return 0
+
+
+sys.exit(main())
+'''
+
+_libc = None
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+# Directories already checked for our hook, so the check is one git call per repository
+_hook_checked = set()
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    return _libc
+
+
+def hook_supported():
+    """The server-hosted hook needs inotify and a real Python interpreter to run the hook"""
+    return sys.platform.startswith('linux') and not getattr(sys, 'frozen', False)
+
+
+def builtin_fsmonitor_supported(directory):
+    """Check whether this git build has a working fsmonitor daemon (Windows and macOS)"""
+    process = git_process.run_git(['-C', directory, 'fsmonitor--daemon', 'status'])
+    error = process.stderr.decode('utf-8', errors='replace')
+    return 'not supported' not in error and 'is not a git command' not in error
+
+
+class InotifyWatcher:
+    """Recursive inotify watch over a worktree that answers fsmonitor v2 queries
+
+    Every change gets an increasing sequence number. Tokens handed to git are
+    "lazygit:<watcher id>:<sequence>", so a token from an older watcher, or one
+    older than the changes still remembered, gets the "/" answer, which tells
+    git to rescan everything.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.watcher_id = f'{os.getpid()}-{int(time.time() * 1000)}'
+        self.sequence = 0
+        self.oldest_sequence = 0
+        self.change_sequences = []
+        self.change_paths = []
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.watch_paths = {}
+
+        self.fd = _get_libc().inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._watch_tree(self.root)
+
+        self.thread = threading.Thread(target=self._read_events, name='fsmonitor', daemon=True)
+        self.thread.start()
+
+    def _watch_tree(self, top):
+        libc = _get_libc()
+        for directory, subdirectories, _ in os.walk(top):
+            subdirectories[:] = [name for name in subdirectories if name != '.git']
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"Could not watch {directory}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self.watch_paths[wd] = directory
+
+    def _record(self, path):
+        with self.lock:
+            self.sequence += 1
+            self.change_sequences.append(self.sequence)
+            self.change_paths.append(path)
+            if len(self.change_paths) > FSMONITOR_MAX_CHANGES:
+                drop = len(self.change_paths) // 2
+                self.oldest_sequence = self.change_sequences[drop - 1]
+                del self.change_sequences[:drop]
+                del self.change_paths[:drop]
+
+    def _invalidate_all(self):
+        with self.lock:
+            self.sequence += 1
+            self.oldest_sequence = self.sequence
+            self.change_sequences = []
+            self.change_paths = []
+
+    def _read_events(self):
+        while not self.stopped:
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 1.0)
+                if not ready:
+                    continue
+                data = os.read(self.fd, 65536)
+            except OSError:
+                break
+
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    self._invalidate_all()
+                    continue
+                directory = self.watch_paths.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self.watch_paths.pop(wd, None)
+                    continue
+
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if relative == '.git' or relative.startswith('.git/'):
+                    continue
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._watch_tree(path)
+                    relative += '/'
+                self._record('/' if relative in ('.', './') else relative)
+
+    def query(self, token):
+        """Build the fsmonitor v2 response for a token git sent us"""
+        prefix = f'lazygit:{self.watcher_id}:'
+        with self.lock:
+            new_token = f'{prefix}{self.sequence}'
+            since = None
+            if token.startswith(prefix):
+                try:
+                    since = int(token[len(prefix):])
+                except ValueError:
+                    since = None
+            if since is None or since < self.oldest_sequence:
+                paths = ['/']
+            else:
+                start = bisect.bisect_right(self.change_sequences, since)
+                paths = list(dict.fromkeys(self.change_paths[start:]))
+        return b'\0'.join([new_token.encode('utf-8')] + [p.encode('utf-8') for p in paths]) + b'\0'
+
+    def stop(self):
+        self.stopped = True
+        self.thread.join(timeout=2)
+        os.close(self.fd)
+
+
+def get_watcher(directory):
+    with _watchers_lock:
+        return _watchers.get(os.path.abspath(directory))
+
+
+def start_watcher(directory):
+    directory = os.path.abspath(directory)
+    with _watchers_lock:
+        watcher = _watchers.get(directory)
+        if watcher is None:
+            watcher = InotifyWatcher(directory)
+            _watchers[directory] = watcher
+        return watcher
+
+
+def stop_watcher(directory):
+    with _watchers_lock:
+        watcher = _watchers.pop(os.path.abspath(directory), None)
+    if watcher:
+        watcher.stop()
+
+
+def read_config(directory):
+    """Read the core settings that control status acceleration"""
+    process = git_process.run_git(['-C', directory, 'config', '--get-regexp',
+                                   r'^core\.(untrackedcache|fsmonitor|fsmonitorhookversion)$'])
+    config = {}
+    for line in process.stdout.decode('utf-8', errors='replace').splitlines():
+        key, _, value = line.partition(' ')
+        config[key.lower()] = value
+    return config
+
+
+def _set_config(directory, key, value=None):
+    args = ['-C', directory, 'config'] + ([key, value] if value is not None else ['--unset', key])
+    process = git_process.run_git(args)
+    stderr = process.stderr
+    # Exit code 5 from --unset just means the key was not set
+    if process.returncode not in (0, 5):
+        raise RuntimeError(stderr.decode('utf-8', errors='replace').strip())
+
+
+def get_acceleration_report(directory):
+    """Describe which status accelerations are configured and actually active"""
+    config = read_config(directory)
+    fsmonitor = config.get('core.fsmonitor', '')
+    untracked_cache = config.get('core.untrackedcache', '').lower() in ('true', 'keep', 'yes', 'on', '1')
+
+    if not fsmonitor or fsmonitor.lower() in ('false', 'no', 'off', '0'):
+        mode = None
+        active = False
+    elif fsmonitor.lower() in ('true', 'yes', 'on', '1'):
+        mode = 'builtin'
+        process = git_process.run_git(['-C', directory, 'fsmonitor--daemon', 'status'])
+        active = process.returncode == 0
+    elif FSMONITOR_HOOK_NAME in fsmonitor:
+        mode = 'lazygit-hook'
+        active = get_watcher(directory) is not None
+    else:
+        mode = 'external-hook'
+        active = True
+
+    return {
+        'untracked_cache': untracked_cache,
+        'fsmonitor': mode,
+        'fsmonitor_active': active,
+        'builtin_fsmonitor_supported': builtin_fsmonitor_supported(directory),
+        'hook_supported': hook_supported()
+    }
+
+
+def install_hook(directory, host, port):
+    """Write the fsmonitor hook into the git directory and point core.fsmonitor at it"""
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        raise ValueError(f"Not a git repository: {directory}")
+    hook_path = os.path.join(git_dir, FSMONITOR_HOOK_NAME)
+    with open(hook_path, 'w') as f:
+        f.write(HOOK_TEMPLATE.format(host=host, port=port, repository=os.path.abspath(directory)))
+    command = f'"{sys.executable}" -S "{hook_path}"'
+    _set_config(directory, 'core.fsmonitor', command)
+    _set_config(directory, 'core.fsmonitorHookVersion', '2')
+    return hook_path
+
+
+def enable_acceleration(directory, fsmonitor=True, host='127.0.0.1', port=5000):
+    """Turn on the untracked cache and the best fsmonitor available for this platform"""
+    _set_config(directory, 'core.untrackedCache', 'true')
+    git_process.run_git(['-C', directory, 'update-index', '--untracked-cache'])
+
+    if fsmonitor:
+        if builtin_fsmonitor_supported(directory):
+            _set_config(directory, 'core.fsmonitor', 'true')
+            git_process.run_git(['-C', directory, 'fsmonitor--daemon', 'start'])
+        elif hook_supported():
+            start_watcher(directory)
+            install_hook(directory, host, port)
+        else:
+            logger.info(f"No fsmonitor available for {directory}; using the untracked cache only")
+
+    return get_acceleration_report(directory)
+
+
+def disable_acceleration(directory):
+    """Remove fsmonitor and untracked cache settings this server may have added"""
+    config = read_config(directory)
+    if config.get('core.fsmonitor', '').lower() == 'true':
+        git_process.run_git(['-C', directory, 'fsmonitor--daemon', 'stop'])
+    _set_config(directory, 'core.fsmonitor')
+    _set_config(directory, 'core.fsmonitorHookVersion')
+    _set_config(directory, 'core.untrackedCache', 'false')
+    stop_watcher(directory)
+    _hook_checked.discard(os.path.abspath(directory))
+    return get_acceleration_report(directory)
+
+
+def ensure_watcher(directory):
+    """Restart the file watcher for a repository that still points at our hook
+
+    Called before status so an fsmonitor hook set up by an earlier server run
+    gets answers again instead of failing over to full scans.
+    """
+    directory = os.path.abspath(directory)
+    if directory in _hook_checked or not hook_supported():
+        return
+    _hook_checked.add(directory)
+    if FSMONITOR_HOOK_NAME in read_config(directory).get('core.fsmonitor', ''):
+        try:
+            start_watcher(directory)
+        except OSError as e:
+            logger.warning(f"Could not start file watcher for {directory}: {str(e)}")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app's modules import each other by top-level name, and lazygit_core sits one level up
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
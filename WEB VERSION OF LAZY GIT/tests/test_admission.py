@@ -0,0 +1,49 @@
+import threading
+import unittest
+
+import admission
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.controller = admission.AdmissionController(queue_timeout=0.2)
+
+    def test_background_write_keeps_last_slot_for_interactive(self):
+        first = self.controller.acquire('write', admission.BACKGROUND)
+        with self.assertRaises(admission.Overloaded):
+            self.controller.acquire('write', admission.BACKGROUND)
+        interactive = self.controller.acquire('write', admission.INTERACTIVE)
+        self.controller.release(first)
+        self.controller.release(interactive)
+
+    def test_background_network_work_runs_in_parallel(self):
+        tickets = [self.controller.acquire('network', admission.BACKGROUND) for _ in range(16)]
+        # Network work takes neither the local write slots nor the background limit
+        write = self.controller.acquire('write', admission.BACKGROUND)
+        read = self.controller.acquire('read', admission.BACKGROUND)
+        self.assertEqual(self.controller.snapshot()['running'],
+                         {'read': 1, 'write': 1, 'network': 16, 'background': 2})
+        for ticket in tickets + [write, read]:
+            self.controller.release(ticket)
+
+    def test_network_limit_keeps_one_slot_for_interactive(self):
+        controller = admission.AdmissionController(network_limit=2, queue_timeout=0.2)
+        ticket = controller.acquire('network', admission.BACKGROUND)
+        with self.assertRaises(admission.Overloaded):
+            controller.acquire('network', admission.BACKGROUND)
+        controller.release(controller.acquire('network', admission.INTERACTIVE))
+        controller.release(ticket)
+
+    def test_cancel_while_queued(self):
+        controller = admission.AdmissionController(queue_timeout=30)
+        held = controller.acquire('write', admission.BACKGROUND)
+        cancelled = threading.Event()
+        threading.Timer(0.1, cancelled.set).start()
+        with self.assertRaises(admission.AdmissionCancelled):
+            controller.acquire('write', admission.BACKGROUND, cancelled=cancelled)
+        self.assertEqual(controller.snapshot()['queued'], {'interactive': 0, 'background': 0})
+        controller.release(held)
+
+
+if __name__ == '__main__':
+    unittest.main()
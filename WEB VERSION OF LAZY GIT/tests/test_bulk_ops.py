@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import admission
+import bulk_ops
+from lazygit_core import process as git_process
+
+GIT_IDENTITY = ['-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'init.defaultBranch=master']
+
+
+def git(*args):
+    subprocess.run(['git'] + GIT_IDENTITY + list(args), check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+
+
+class BulkFetchTest(unittest.TestCase):
+    REPOSITORIES = 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='lazygit-bulk-test-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.clones = []
+        for index in range(self.REPOSITORIES):
+            bare = os.path.join(self.root, f'remote{index}.git')
+            clone = os.path.join(self.root, f'clone{index}')
+            git('init', '-q', '--bare', bare)
+            git('clone', '-q', bare, clone)
+            git('-C', clone, 'commit', '-q', '--allow-empty', '-m', 'initial')
+            git('-C', clone, 'push', '-q', 'origin', 'HEAD:master')
+            self.clones.append(clone)
+
+    def test_fetches_run_in_parallel(self):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+        run_git = git_process.run_git
+
+        def slow_run_git(args, **kwargs):
+            # Hold each fetch open long enough for the others to start alongside it
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                time.sleep(0.3)
+                return run_git(args, **kwargs)
+            finally:
+                with lock:
+                    running -= 1
+
+        controller = admission.AdmissionController()
+        with mock.patch.object(admission, 'controller', controller), \
+                mock.patch.object(bulk_ops.git_process, 'run_git', slow_run_git):
+            run = bulk_ops.BulkRun('fetch', self.clones, concurrency=self.REPOSITORIES)
+            results = list(run.results())
+
+        self.assertEqual([result['success'] for result in results], [True] * self.REPOSITORIES)
+        self.assertEqual(peak, self.REPOSITORIES)
+        self.assertEqual(controller.snapshot()['running']['network'], 0)
+
+    def test_concurrency_is_not_capped_at_background_limit(self):
+        run = bulk_ops.BulkRun('pull', self.clones, concurrency=admission.BACKGROUND_LIMIT * 4)
+        self.assertEqual(run.concurrency, admission.BACKGROUND_LIMIT * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import admission
+import clone_jobs
+
+
+class CloneJobTest(unittest.TestCase):
+    def test_cancel_while_queued_never_starts_the_clone(self):
+        root = tempfile.mkdtemp(prefix='lazygit-clone-test-')
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        destination = os.path.join(root, 'clone')
+
+        # A network budget with no slot left for background work
+        controller = admission.AdmissionController(network_limit=1)
+        with mock.patch.object(admission, 'controller', controller):
+            job = clone_jobs.CloneJob(os.path.join(root, 'missing.git'), destination)
+            job.start()
+            job.cancel()
+            job.thread.join(10)
+
+        self.assertEqual(job.state, 'cancelled')
+        self.assertFalse(os.path.exists(destination))
+        self.assertEqual(controller.snapshot()['classes']['background']['admitted'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
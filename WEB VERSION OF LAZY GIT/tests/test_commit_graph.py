@@ -0,0 +1,78 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import commit_graph
+from lazygit_core import process as git_process
+
+GIT_IDENTITY = ['-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'init.defaultBranch=master']
+COMMITS = 600
+
+
+class GraphStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='lazygit-graph-test-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        subprocess.run(['git', 'init', '-q', self.directory], check=True)
+        stream = ''.join(f'commit refs/heads/master\ncommitter Test <test@example.com> {1600000000 + index} +0000\n'
+                         f'data 2\nc\n\n' for index in range(COMMITS))
+        subprocess.run(['git', '-C', self.directory] + GIT_IDENTITY + ['fast-import', '--quiet'],
+                       input=stream.encode('utf-8'), check=True)
+        self.tip = commit_graph.resolve_ref(self.directory, 'master')
+        self.layouts = []
+
+    def tearDown(self):
+        for layout in self.layouts:
+            layout.close()
+
+    def layout(self):
+        layout = commit_graph.GraphLayout(self.directory, self.tip)
+        self.layouts.append(layout)
+        return layout
+
+    def test_windows_match_a_single_pass(self):
+        scrolled = self.layout()
+        offset = 0
+        while scrolled.window(offset, 50)[1]:
+            offset += 50
+        whole = self.layout()
+        whole.window(0, COMMITS + 1)
+        self.assertEqual(len(scrolled.rows), COMMITS)
+        self.assertEqual([row['hash'] for row in scrolled.rows], [row['hash'] for row in whole.rows])
+
+    def test_open_streams_are_capped(self):
+        with mock.patch.object(commit_graph, 'MAX_GRAPH_STREAMS', 2):
+            for _ in range(4):
+                self.layout().window(0, 10)
+            self.assertEqual(commit_graph.open_stream_count(), 2)
+            running = [op for op in git_process.list_operations() if op['id'].startswith('graph-')]
+            self.assertEqual(len(running), 2)
+
+    def test_closed_stream_resumes_where_it_stopped(self):
+        layout = self.layout()
+        layout.window(0, 10)
+        layout.close()
+        self.assertEqual(commit_graph.open_stream_count(), 0)
+        layout.window(len(layout.rows), 10)
+        whole = self.layout()
+        whole.window(0, len(layout.rows))
+        count = len(layout.rows)
+        self.assertEqual([row['hash'] for row in layout.rows], [row['hash'] for row in whole.rows[:count]])
+
+    def test_idle_streams_are_closed(self):
+        busy = self.layout()
+        busy.window(0, 10)
+        idle = self.layout()
+        idle.window(0, 10)
+        idle.last_used -= commit_graph.GRAPH_STREAM_IDLE_SECONDS + 1
+        commit_graph.close_idle_streams()
+        self.assertEqual(commit_graph.open_stream_count(), 1)
+        self.assertIsNone(idle._stream)
+        self.assertIsNotNone(busy._stream)
+
+if __name__ == '__main__':
+    unittest.main()
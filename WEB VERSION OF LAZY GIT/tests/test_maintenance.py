@@ -0,0 +1,52 @@
+import unittest
+from unittest import mock
+
+import maintenance
+
+TASK = ('gc', ['gc', '--auto', '--quiet'])
+
+
+class MaintenanceBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = maintenance.MaintenanceScheduler(lambda: [])
+        patches = [mock.patch.object(maintenance, 'get_repo_health', return_value={'checked_at': 0}),
+                   mock.patch.object(maintenance, 'due_tasks', return_value=[TASK])]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def maintain(self, duration):
+        result = {'success': True, 'duration': duration}
+        with mock.patch.object(maintenance, 'run_task', return_value=result) as run_task:
+            state = self.scheduler.maintain('/repo')
+        return run_task, state
+
+    def test_started_task_is_not_bounded_by_the_budget(self):
+        run_task, _ = self.maintain(300.0)
+        # Runs to the task timeout, never to what is left of the budget
+        self.assertNotIn('timeout', run_task.call_args.kwargs)
+        self.assertEqual(self.scheduler.budget_remaining(), 0)
+
+    def test_overrun_is_charged_to_following_windows(self):
+        self.maintain(300.0)
+        self.scheduler.window_start -= maintenance.MAINTENANCE_BUDGET_WINDOW
+        self.assertEqual(self.scheduler.budget_remaining(), 0)
+        self.scheduler.window_start -= 2 * maintenance.MAINTENANCE_BUDGET_WINDOW
+        self.assertEqual(self.scheduler.budget_remaining(), maintenance.MAINTENANCE_BUDGET_SECONDS)
+
+    def test_task_that_does_not_fit_is_deferred(self):
+        self.maintain(100.0)
+        self.scheduler.budget_used = 60.0
+        run_task, state = self.maintain(100.0)
+        run_task.assert_not_called()
+        self.assertTrue(state['deferred'])
+
+    def test_task_bigger_than_the_budget_runs_on_a_fresh_budget(self):
+        self.maintain(500.0)
+        self.scheduler.budget_used = 0.0
+        run_task, _ = self.maintain(500.0)
+        run_task.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
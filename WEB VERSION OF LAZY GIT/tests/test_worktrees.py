@@ -0,0 +1,50 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import worktrees
+
+GIT_IDENTITY = ['-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'init.defaultBranch=master']
+
+
+def git(*args):
+    return subprocess.run(['git'] + GIT_IDENTITY + list(args), check=True, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL).stdout.decode().strip()
+
+
+class SwitchTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='lazygit-worktree-test-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        bare = os.path.join(self.root, 'remote.git')
+        self.clone = os.path.join(self.root, 'clone')
+        git('init', '-q', '--bare', bare)
+        git('clone', '-q', bare, self.clone)
+        git('-C', self.clone, 'commit', '-q', '--allow-empty', '-m', 'initial')
+        git('-C', self.clone, 'push', '-q', 'origin', 'HEAD:master', 'HEAD:feature')
+
+    def test_remote_branch_with_existing_local_branch_opens_the_local_branch(self):
+        # The local branch is ahead of its remote; switching must not lose that commit
+        git('-C', self.clone, 'branch', '-q', 'feature', 'origin/feature')
+        git('-C', self.clone, 'checkout', '-q', 'feature')
+        git('-C', self.clone, 'commit', '-q', '--allow-empty', '-m', 'local work')
+        local_head = git('-C', self.clone, 'rev-parse', 'HEAD')
+        git('-C', self.clone, 'checkout', '-q', 'master')
+
+        result = worktrees.switch(self.clone, 'remotes/origin/feature')
+
+        self.assertTrue(result['created'])
+        self.assertEqual(result['branch'], 'feature')
+        self.assertEqual(git('-C', result['path'], 'rev-parse', 'HEAD'), local_head)
+
+    def test_remote_branch_without_local_branch_creates_a_tracking_branch(self):
+        result = worktrees.switch(self.clone, 'remotes/origin/feature')
+
+        self.assertEqual(result['branch'], 'feature')
+        self.assertEqual(git('-C', result['path'], 'rev-parse', '--abbrev-ref', '@{upstream}'), 'origin/feature')
+
+
+if __name__ == '__main__':
+    unittest.main()
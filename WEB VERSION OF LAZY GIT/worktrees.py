@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import threading
+import time
+
+from lazygit_core import process as git_process
+from lazygit_core.gitdir import find_common_dir, find_git_dir
+
+# Managed worktrees kept per repository before the least recently used clean one is removed
+DEFAULT_WORKTREE_LIMIT = 5
+
+# Clean managed worktrees unused for this long are removed on the next switch
+WORKTREE_MAX_IDLE = 14 * 24 * 3600
+
+# Per-repository settings and usage, kept next to the repository's own metadata
+STATE_FILE_NAME = 'lazygit-worktrees.json'
+
+_state_lock = threading.Lock()
+
+
+def _git(directory, *args):
+    process = git_process.run_git(['-C', directory] + list(args))
+    return (process.returncode, process.stdout.decode('utf-8', errors='replace').strip(),
+            process.stderr.decode('utf-8', errors='replace').strip())
+
+
+def main_worktree(directory):
+    """The checkout a repository was opened from, even when `directory` is one of its worktrees"""
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        return None
+    common_dir = find_common_dir(git_dir)
+    if os.path.basename(common_dir) == '.git':
+        return os.path.dirname(common_dir)
+    # Bare repository: there is no main checkout
+    return common_dir
+
+
+def _state_path(main_dir):
+    return os.path.join(find_common_dir(find_git_dir(main_dir)), STATE_FILE_NAME)
+
+
+def load_state(main_dir):
+    try:
+        with open(_state_path(main_dir), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault('enabled', False)
+    state.setdefault('limit', DEFAULT_WORKTREE_LIMIT)
+    state.setdefault('worktrees', {})
+    return state
+
+
+def save_state(main_dir, state):
+    path = _state_path(main_dir)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def configure(directory, enabled=None, limit=None):
+    main_dir = main_worktree(directory)
+    with _state_lock:
+        state = load_state(main_dir)
+        if enabled is not None:
+            state['enabled'] = bool(enabled)
+        if limit is not None:
+            state['limit'] = max(1, int(limit))
+        save_state(main_dir, state)
+        return state
+
+
+def is_enabled(directory):
+    main_dir = main_worktree(directory)
+    return bool(main_dir and load_state(main_dir)['enabled'])
+
+
+def list_worktrees(directory):
+    """Parse `git worktree list --porcelain` into {path, head, branch, ...} dicts"""
+    code, output, error = _git(directory, 'worktree', 'list', '--porcelain')
+    if code != 0:
+        raise RuntimeError(error or 'git worktree list failed')
+    worktrees = []
+    current = None
+    for line in output.splitlines():
+        if line.startswith('worktree '):
+            current = {'path': line[len('worktree '):], 'branch': None}
+            worktrees.append(current)
+        elif current is None:
+            continue
+        elif line.startswith('HEAD '):
+            current['head'] = line[len('HEAD '):]
+        elif line.startswith('branch '):
+            current['branch'] = line[len('branch refs/heads/'):]
+        elif line in ('bare', 'detached', 'locked', 'prunable') or line.startswith(('locked ', 'prunable ')):
+            current[line.split(' ')[0]] = True
+    return worktrees
+
+
+def _slug(branch):
+    return re.sub(r'[^A-Za-z0-9._-]+', '-', branch).strip('-.') or 'branch'
+
+
+def _worktree_root(main_dir):
+    """Managed worktrees live beside the repository, e.g. project.worktrees/feature-x"""
+    main_dir = os.path.normpath(main_dir)
+    return os.path.join(os.path.dirname(main_dir), os.path.basename(main_dir) + '.worktrees')
+
+
+def _resolve_branch(main_dir, branch):
+    """Return (local branch, start point or None) for a local or remote-tracking branch name"""
+    if branch.startswith('remotes/'):
+        branch = branch[len('remotes/'):]
+    code, _, _ = _git(main_dir, 'show-ref', '--verify', '--quiet', f'refs/heads/{branch}')
+    if code == 0:
+        return branch, None
+    code, _, _ = _git(main_dir, 'show-ref', '--verify', '--quiet', f'refs/remotes/{branch}')
+    if code == 0 and '/' in branch:
+        local_branch = branch.split('/', 1)[1]
+        # Picking origin/feature when feature already exists locally opens the local branch
+        code, _, _ = _git(main_dir, 'show-ref', '--verify', '--quiet', f'refs/heads/{local_branch}')
+        return local_branch, None if code == 0 else branch
+    # Like `git checkout <name>`: a name found on exactly one remote gets a tracking branch
+    _, output, _ = _git(main_dir, 'for-each-ref', '--format=%(refname:strip=2)', 'refs/remotes/')
+    matches = [ref for ref in output.splitlines() if ref.split('/', 1)[-1] == branch]
+    if len(matches) == 1:
+        return branch, matches[0]
+    raise ValueError(f"Unknown branch: {branch}")
+
+
+def _is_clean(path):
+    code, output, _ = _git(path, 'status', '--porcelain', '--untracked-files=normal')
+    return code == 0 and not output
+
+
+def switch(directory, branch):
+    """Return the worktree path for `branch`, creating a managed worktree if needed
+
+    Switching is just a change of directory: the branch's files, build output
+    and editor state stay where they were. Also reports which cold worktrees
+    were removed to stay under the limit.
+    """
+    main_dir = main_worktree(directory)
+    if main_dir is None:
+        raise ValueError(f"Not a git repository: {directory}")
+    local_branch, start_point = _resolve_branch(main_dir, branch)
+
+    with _state_lock:
+        state = load_state(main_dir)
+        existing = {wt['branch']: wt['path'] for wt in list_worktrees(main_dir) if wt.get('branch')}
+        created = False
+
+        if local_branch in existing:
+            path = existing[local_branch]
+        else:
+            path = os.path.join(_worktree_root(main_dir), _slug(local_branch))
+            if os.path.exists(path):
+                path = f'{path}-{int(time.time())}'
+            args = ['worktree', 'add']
+            if start_point:
+                args += ['--track', '-b', local_branch, path, start_point]
+            else:
+                args += [path, local_branch]
+            code, _, error = _git(main_dir, *args)
+            if code != 0:
+                raise RuntimeError(error or 'git worktree add failed')
+            state['worktrees'][local_branch] = {'path': path, 'created': time.time()}
+            created = True
+
+        if local_branch in state['worktrees']:
+            state['worktrees'][local_branch]['last_used'] = time.time()
+        evicted = _prune_locked(main_dir, state, keep={os.path.realpath(path), os.path.realpath(directory)})
+        save_state(main_dir, state)
+
+    return {'path': path, 'branch': local_branch, 'created': created, 'evicted': evicted}
+
+
+def _prune_locked(main_dir, state, keep=(), max_idle=WORKTREE_MAX_IDLE):
+    """Remove idle managed worktrees, then least recently used ones over the limit
+
+    Worktrees with uncommitted or untracked changes are never removed.
+    """
+    managed = state['worktrees']
+    live = {os.path.realpath(wt['path']) for wt in list_worktrees(main_dir)}
+    for branch in [b for b, info in managed.items() if os.path.realpath(info['path']) not in live]:
+        # Deleted by hand or with `git worktree remove`
+        del managed[branch]
+
+    now = time.time()
+    by_age = sorted(managed.items(), key=lambda item: item[1].get('last_used', item[1].get('created', 0)))
+    excess = len(managed) - state['limit']
+    evicted = []
+    for branch, info in by_age:
+        path = os.path.realpath(info['path'])
+        idle = now - info.get('last_used', info.get('created', now))
+        if path in keep or (excess <= 0 and idle < max_idle):
+            continue
+        if not _is_clean(path):
+            continue
+        code, _, _ = _git(main_dir, 'worktree', 'remove', path)
+        if code == 0:
+            del managed[branch]
+            evicted.append({'branch': branch, 'path': path})
+            excess -= 1
+
+    _git(main_dir, 'worktree', 'prune')
+    return evicted
+
+
+def prune(directory, max_idle=WORKTREE_MAX_IDLE):
+    main_dir = main_worktree(directory)
+    with _state_lock:
+        state = load_state(main_dir)
+        evicted = _prune_locked(main_dir, state, keep={os.path.realpath(directory)}, max_idle=max_idle)
+        save_state(main_dir, state)
+    return evicted
+
+
+def describe(directory):
+    """Settings plus every worktree, marking the managed ones and when they were last used"""
+    main_dir = main_worktree(directory)
+    state = load_state(main_dir)
+    managed = {os.path.realpath(info['path']): info for info in state['worktrees'].values()}
+    worktrees = []
+    for wt in list_worktrees(main_dir):
+        info = managed.get(os.path.realpath(wt['path']))
+        worktrees.append({**wt, 'managed': info is not None,
+                          'last_used': info.get('last_used') if info else None})
+    return {'enabled': state['enabled'], 'limit': state['limit'], 'main': main_dir, 'worktrees': worktrees}
@@ -0,0 +1,275 @@
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lazygit_core import process as git_process
+import serializers
+
+logger = logging.getLogger(__name__)
+
+# Commands one connection may have running at once
+MAX_IN_FLIGHT = 8
+
+# Commands read from the socket but not started yet; once full, the server stops
+# reading and TCP pushes back on the client
+PENDING_QUEUE_SIZE = 16
+
+# Messages waiting to be written to the socket. Producers of streamed output
+# block when it is full, which in turn pauses the git process behind them.
+SEND_QUEUE_SIZE = 256
+
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+# How often the current repository is checked for changes while anyone is subscribed
+EVENT_POLL_INTERVAL = 1.0
+
+
+class ChannelClosed(Exception):
+    pass
+
+
+class RepoEvents:
+    """Polls the current repository's state and tells subscribed channels what changed
+
+    `get_state` returns (directory, {part: fingerprint}); only parts whose
+    fingerprint moved are reported, so clients refresh just the views affected.
+    """
+
+    def __init__(self, get_state, interval=EVENT_POLL_INTERVAL):
+        self.get_state = get_state
+        self.interval = interval
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.add(callback)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='repo-events', daemon=True)
+                self.thread.start()
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers.discard(callback)
+
+    def _run(self):
+        last_directory, last_state = None, {}
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.subscribers:
+                    # Stop polling until someone connects again
+                    self.thread = None
+                    return
+                subscribers = list(self.subscribers)
+            try:
+                directory, state = self.get_state()
+            except Exception as e:
+                logger.error(f"Error reading repository state: {str(e)}")
+                continue
+
+            if directory != last_directory:
+                changed = ['repository']
+            else:
+                changed = [part for part, value in state.items() if last_state.get(part) != value]
+            last_directory, last_state = directory, state
+            if not changed:
+                continue
+
+            event = {'type': 'event', 'event': 'repo-changed', 'directory': directory, 'changed': changed}
+            for callback in subscribers:
+                callback(event)
+
+
+class CommandChannel:
+    """One client's WebSocket carrying many concurrent commands
+
+    Client messages:
+        {"id": "1", "op": "log", "args": {...}, "stream": true}
+                                                       run a command; stream asks list
+                                                       endpoints for NDJSON chunks
+        {"type": "cancel", "id": "1"}                  stop it, killing its git processes
+        {"type": "ping"}
+    Server messages carry the request id:
+        {"id": "1", "type": "chunk", "data": {...}}    streamed output, in order
+        {"id": "1", "type": "result", "status": 200, "body": {...}}
+    plus {"type": "event", ...} pushed from RepoEvents.
+
+    `dispatch(op, args, stream)` returns (status, body, chunks) where chunks is an
+    iterator of streamed records or None.
+    """
+
+    def __init__(self, ws, dispatch, connection_id, events=None, max_in_flight=MAX_IN_FLIGHT):
+        self.ws = ws
+        self.dispatch = dispatch
+        self.connection_id = connection_id
+        self.events = events
+        self.max_in_flight = max_in_flight
+        self.pending = queue.Queue(PENDING_QUEUE_SIZE)
+        self.outgoing = queue.Queue(SEND_QUEUE_SIZE)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=f'ws-{connection_id}')
+        self.closed = threading.Event()
+        self.cancelled = set()
+        self.running = set()
+        self.lock = threading.Lock()
+
+    def operation_id(self, request_id):
+        return f'ws-{self.connection_id}-{request_id}'
+
+    def send(self, message, block=True):
+        """Queue a message for the socket; False if it was dropped because the queue is full"""
+        data = serializers.dumps_json(message).decode('utf-8')
+        while True:
+            if self.closed.is_set():
+                raise ChannelClosed()
+            try:
+                self.outgoing.put(data, timeout=0.5)
+                return True
+            except queue.Full:
+                if not block:
+                    return False
+
+    def push_event(self, event):
+        # Events only say "look again", so dropping one under load loses nothing the next won't repeat
+        try:
+            self.send(event, block=False)
+        except ChannelClosed:
+            pass
+
+    def _write(self):
+        while not self.closed.is_set():
+            try:
+                data = self.outgoing.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.ws.send(data)
+            except Exception:
+                self.closed.set()
+
+    def _run_command(self, request_id, message):
+        operation_id = self.operation_id(request_id)
+        git_process.set_request_operation_id(operation_id)
+        start = time.time()
+        try:
+            status, body, chunks = self.dispatch(message['op'], message.get('args') or {},
+                                                 bool(message.get('stream')))
+            if chunks is not None:
+                for data in chunks:
+                    self.send({'id': request_id, 'type': 'chunk', 'data': data})
+            self.send({'id': request_id, 'type': 'result', 'status': status, 'body': body,
+                       'duration': round(time.time() - start, 3)})
+        except ChannelClosed:
+            git_process.cancel(operation_id)
+        except Exception as e:
+            logger.error(f"Exception in channel command {message.get('op')}: {str(e)}")
+            try:
+                self.send({'id': request_id, 'type': 'result', 'status': 500,
+                           'body': {'success': False, 'error': str(e)}})
+            except ChannelClosed:
+                pass
+        finally:
+            with self.lock:
+                self.running.discard(request_id)
+            self.in_flight.release()
+
+    def _start_commands(self):
+        while not self.closed.is_set():
+            try:
+                request_id, message = self.pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            while not self.in_flight.acquire(timeout=0.5):
+                if self.closed.is_set():
+                    return
+            with self.lock:
+                if request_id in self.cancelled:
+                    self.cancelled.discard(request_id)
+                    skip = True
+                else:
+                    self.running.add(request_id)
+                    skip = False
+            if skip:
+                self.in_flight.release()
+                try:
+                    self.send({'id': request_id, 'type': 'result', 'status': 499,
+                               'body': {'success': False, 'error': 'Cancelled'}})
+                except ChannelClosed:
+                    return
+                continue
+            self.executor.submit(self._run_command, request_id, message)
+
+    def _handle_message(self, raw):
+        if len(raw) > MAX_MESSAGE_SIZE:
+            self.send({'type': 'error', 'error': 'Message too large'})
+            return
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            self.send({'type': 'error', 'error': 'Invalid JSON'})
+            return
+        if not isinstance(message, dict):
+            self.send({'type': 'error', 'error': 'Expected a JSON object'})
+            return
+
+        kind = message.get('type', 'command')
+        request_id = str(message.get('id', ''))
+        if kind == 'ping':
+            self.send({'type': 'pong', 'id': request_id or None})
+        elif kind == 'cancel':
+            with self.lock:
+                running = request_id in self.running
+                if not running:
+                    self.cancelled.add(request_id)
+            if running:
+                git_process.cancel(self.operation_id(request_id))
+        elif kind == 'command':
+            if not request_id or not message.get('op'):
+                self.send({'type': 'error', 'id': request_id or None, 'error': 'Commands need an id and an op'})
+                return
+            # Blocks once PENDING_QUEUE_SIZE commands are waiting, so the client is read no faster than we work
+            while True:
+                try:
+                    self.pending.put((request_id, message), timeout=0.5)
+                    break
+                except queue.Full:
+                    if self.closed.is_set():
+                        raise ChannelClosed()
+        else:
+            self.send({'type': 'error', 'id': request_id or None, 'error': f'Unknown message type: {kind}'})
+
+    def serve(self):
+        writer = threading.Thread(target=self._write, name=f'ws-{self.connection_id}-writer', daemon=True)
+        starter = threading.Thread(target=self._start_commands, name=f'ws-{self.connection_id}-starter', daemon=True)
+        writer.start()
+        starter.start()
+        if self.events is not None:
+            self.events.subscribe(self.push_event)
+        try:
+            self.send({'type': 'hello', 'connection': self.connection_id, 'max_in_flight': self.max_in_flight})
+            while not self.closed.is_set():
+                raw = self.ws.receive()
+                if raw is None:
+                    break
+                if isinstance(raw, bytes):
+                    raw = raw.decode('utf-8', errors='replace')
+                self._handle_message(raw)
+        except ChannelClosed:
+            pass
+        except Exception as e:
+            # The client going away surfaces here as a ConnectionClosed from the socket library
+            logger.info(f"Channel {self.connection_id} closed: {str(e)}")
+        finally:
+            self.closed.set()
+            if self.events is not None:
+                self.events.unsubscribe(self.push_event)
+            with self.lock:
+                running = list(self.running)
+            for request_id in running:
+                git_process.cancel(self.operation_id(request_id))
+            self.executor.shutdown(wait=False)
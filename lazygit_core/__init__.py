@@ -0,0 +1,26 @@
+"""Headless git backend shared by the web and Tkinter frontends
+
+    from lazygit_core import Repository
+
+    repo = Repository('/path/to/project')
+    repo.status()      # staged / unstaged / untracked / conflicts
+    repo.log(50)       # cached until a ref moves
+    repo.branches()
+    repo.remotes()     # cached until the config changes
+
+Commands run through `process`, which gives every git call a deadline, its
+own process group and a cancellable operation id.
+"""
+from lazygit_core import process
+from lazygit_core.gitdir import find_common_dir, find_git_dir, file_fingerprint, repo_fingerprint
+from lazygit_core.models import (format_status, parse_branches, parse_log, parse_remotes, parse_status, relative_date,
+                                 summarize_status)
+from lazygit_core.repository import GitError, Repository, ResultCache, cache_stats
+
+__all__ = [
+    'process',
+    'find_common_dir', 'find_git_dir', 'file_fingerprint', 'repo_fingerprint',
+    'format_status', 'parse_branches', 'parse_log', 'parse_remotes', 'parse_status', 'relative_date',
+    'summarize_status',
+    'GitError', 'Repository', 'ResultCache', 'cache_stats',
+]
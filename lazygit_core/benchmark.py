@@ -0,0 +1,111 @@
+"""Time the shared backend's parsed, cached views against running git every time
+
+Builds a synthetic repository (5k commits, 1k branches and 20k untracked
+files by default), then times Repository.log/branches/status cold (git runs
+and output is parsed) and warm (served from the result cache), plus the
+status parser on its own. Needs nothing but git; no GUI or web server.
+
+    python -m lazygit_core.benchmark --commits 5000 --branches 1000 --files 20000 --runs 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lazygit_core import Repository, ResultCache, models  # noqa: E402
+
+
+def git(directory, *args, input=None):
+    subprocess.run(['git', '-C', directory, '-c', 'user.name=Bench', '-c', 'user.email=bench@example.com'] + list(args),
+                   input=input, check=True, stdout=subprocess.DEVNULL)
+
+
+def build_repository(directory, commits, branches, files):
+    git(directory, 'init', '-q')
+    # fast-import writes thousands of commits in well under a second
+    stream = []
+    for index in range(commits):
+        message = f'Change {index} | touch module_{index % 97}.py'.encode('utf-8')
+        content = f'{index}\n'.encode('utf-8')
+        stream.append(b'commit refs/heads/master\n')
+        stream.append(f'committer Bench <bench@example.com> {1600000000 + index * 60} +0000\n'.encode('utf-8'))
+        stream.append(b'data %d\n%s\n' % (len(message), message))
+        stream.append(b'M 644 inline file_%d.txt\ndata %d\n%s\n' % (index % 500, len(content), content))
+    git(directory, 'fast-import', '--quiet', input=b''.join(stream))
+    git(directory, 'update-ref', '--stdin', input=''.join(
+        f'create refs/heads/feature/topic-{index} master\n' for index in range(branches)).encode('utf-8'))
+    git(directory, 'checkout', '-q', 'master')
+
+    per_directory = 1000
+    for index in range(files):
+        path = os.path.join(directory, 'untracked', f'd{index // per_directory}')
+        if index % per_directory == 0:
+            os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, f'f{index}.txt'), 'w') as f:
+            f.write('x')
+
+
+def time_call(call, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commits', type=int, default=5000)
+    parser.add_argument('--branches', type=int, default=1000)
+    parser.add_argument('--files', type=int, default=20000, help='untracked files')
+    parser.add_argument('--limit', type=int, default=1000, help='commits per log call')
+    parser.add_argument('--runs', type=int, default=5, help='timed runs per measurement')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='lazygit-backend-bench-')
+    try:
+        print(f"Building repository: {args.commits} commits, {args.branches} branches, {args.files} untracked files")
+        build_repository(directory, args.commits, args.branches, args.files)
+
+        def cold(method, *call_args, **kwargs):
+            # A fresh cache each run: git runs and its output is parsed
+            return lambda: getattr(Repository(directory, cache=ResultCache()), method)(*call_args, **kwargs)
+
+        warm_repo = Repository(directory, cache=ResultCache())
+        warm_repo.log(args.limit)
+        warm_repo.branches()
+        warm_repo.status(worktree_token=1)
+
+        raw_status = subprocess.run(['git', '-C', directory] + models.STATUS_ARGS + ['--untracked-files=all'],
+                                    capture_output=True, check=True).stdout.decode('utf-8')
+
+        rows = [
+            (f'log ({args.limit} commits)', time_call(cold('log', args.limit), args.runs),
+             time_call(lambda: warm_repo.log(args.limit), args.runs)),
+            (f'branches ({args.branches + 1})', time_call(cold('branches'), args.runs),
+             time_call(warm_repo.branches, args.runs)),
+            (f'status ({args.files} entries)', time_call(cold('status'), args.runs),
+             time_call(lambda: warm_repo.status(worktree_token=1), args.runs)),
+        ]
+
+        print(f"\n{'view':<28}{'cold':>12}{'warm':>12}{'speedup':>10}")
+        for label, cold_seconds, warm_seconds in rows:
+            print(f"{label:<28}{cold_seconds * 1000:>9.1f} ms{warm_seconds * 1000:>9.2f} ms{cold_seconds / warm_seconds:>9.0f}x")
+
+        parse_seconds = time_call(lambda: models.parse_status(raw_status), args.runs)
+        print(f"\nparse_status alone: {parse_seconds * 1000:.1f} ms for {args.files} entries "
+              f"({args.files / parse_seconds:,.0f} entries/s)")
+        print(f"result cache: {warm_repo.cache.stats()}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import os
+
+
+def find_git_dir(directory):
+    """Return the git directory of a checkout, worktree or bare repository"""
+    dot_git = os.path.join(directory, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        with open(dot_git, 'r', errors='replace') as f:
+            content = f.read().strip()
+        if content.startswith('gitdir: '):
+            return os.path.normpath(os.path.join(directory, content[len('gitdir: '):]))
+    if os.path.isfile(os.path.join(directory, 'HEAD')) and os.path.isdir(os.path.join(directory, 'objects')):
+        return directory
+    return None
+
+
+def find_common_dir(git_dir):
+    """Worktrees keep objects and refs in the main repository's git directory"""
+    common_file = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(common_file):
+        with open(common_file, 'r', errors='replace') as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    return git_dir
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'missing'
+    return f'{st.st_mtime_ns}:{st.st_size}:{st.st_ino}'
+
+
+def _refs_key(common_dir):
+    """Loose refs are replaced by rename, so every update touches a directory mtime"""
+    parts = []
+    for root, dirs, _ in os.walk(os.path.join(common_dir, 'refs')):
+        dirs.sort()
+        parts.append(f'{root}={_stat_key(root)}')
+    return ';'.join(parts)
+
+
+def repo_fingerprint(directory, index=False, refs=False, config=False):
+    """Cheap, stat-only fingerprint of the parts of a repository a result depends on
+
+    Returns None when the directory is not a repository, so the caller can
+    fall back to doing the work (or hashing the response body).
+    """
+    git_dir = find_git_dir(directory)
+    if git_dir is None:
+        return None
+    common_dir = find_common_dir(git_dir)
+    parts = [os.path.abspath(directory), _stat_key(os.path.join(git_dir, 'HEAD'))]
+    if index:
+        parts.append(_stat_key(os.path.join(git_dir, 'index')))
+    if refs:
+        parts.append(_stat_key(os.path.join(common_dir, 'packed-refs')))
+        parts.append(_refs_key(common_dir))
+    if config:
+        parts.append(_stat_key(os.path.join(common_dir, 'config')))
+    return '|'.join(parts)
+
+
+def file_fingerprint(*paths):
+    return '|'.join(f'{path}={_stat_key(path)}' for path in paths)
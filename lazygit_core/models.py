@@ -0,0 +1,196 @@
+# `git status` as both frontends run it. --no-optional-locks keeps status from
+# rewriting the index, which pollers would otherwise see as a change.
+STATUS_ARGS = ['--no-optional-locks', 'status', '--porcelain=v2', '-z', '--branch']
+
+STATUS_LABELS = {'M': 'modified', 'A': 'added', 'D': 'deleted', 'R': 'renamed', 'C': 'copied', 'T': 'type changed'}
+
+# Fields separated by the ASCII unit separator, so subjects containing "|" survive
+LOG_FORMAT = '%h%x1f%an%x1f%at%x1f%s'
+
+
+def parse_status(output):
+    """Split `git status --porcelain=v2 -z --branch` output into staged, unstaged, untracked and conflicted files
+
+    Entries are {'path', 'change'} dicts; renames and copies also carry 'original'.
+    A file modified both in the index and the work tree appears in both lists.
+    """
+    status = {'branch': None, 'upstream': None, 'ahead': 0, 'behind': 0,
+              'staged': [], 'unstaged': [], 'untracked': [], 'conflicts': []}
+    entries = iter(output.split('\0'))
+    for entry in entries:
+        if not entry:
+            continue
+        kind = entry[0]
+        if entry.startswith('# branch.head '):
+            status['branch'] = entry[len('# branch.head '):]
+        elif entry.startswith('# branch.upstream '):
+            status['upstream'] = entry[len('# branch.upstream '):]
+        elif entry.startswith('# branch.ab '):
+            ahead, behind = entry[len('# branch.ab '):].split()
+            status['ahead'], status['behind'] = int(ahead), -int(behind)
+        elif kind in '12':
+            parts = entry.split(' ', 9 if kind == '2' else 8)
+            xy, path = parts[1], parts[-1]
+            extra = {}
+            if kind == '2':
+                # Renames and copies are followed by the original path as its own entry
+                extra['original'] = next(entries, '')
+            if xy[0] != '.':
+                status['staged'].append({'path': path, 'change': STATUS_LABELS.get(xy[0], xy[0]), **extra})
+            if xy[1] != '.':
+                status['unstaged'].append({'path': path, 'change': STATUS_LABELS.get(xy[1], xy[1]), **extra})
+        elif kind == 'u':
+            status['conflicts'].append({'path': entry.split(' ', 10)[-1], 'change': 'conflict'})
+        elif kind == '?':
+            status['untracked'].append({'path': entry[2:], 'change': 'untracked'})
+    return status
+
+
+def summarize_status(status):
+    """Counts instead of file lists, for places that show many repositories at once"""
+    summary = {key: status[key] for key in ('branch', 'upstream', 'ahead', 'behind')}
+    for key in ('staged', 'unstaged', 'untracked', 'conflicts'):
+        summary[key] = len(status[key])
+    summary['clean'] = not (summary['staged'] or summary['unstaged'] or summary['untracked'] or summary['conflicts'])
+    return summary
+
+
+# How `git status` words each change in its long format
+LONG_STATUS_LABELS = {'added': 'new file', 'type changed': 'typechange', 'conflict': 'both modified'}
+
+
+def _status_lines(heading, entries):
+    lines = [heading]
+    for entry in entries:
+        path = f"{entry['original']} -> {entry['path']}" if 'original' in entry else entry['path']
+        if entry['change'] == 'untracked':
+            lines.append(f"\t{path}")
+        else:
+            lines.append(f"\t{LONG_STATUS_LABELS.get(entry['change'], entry['change']) + ':':<12}{path}")
+    return lines + ['']
+
+
+def format_status(status):
+    """Render a parsed status as the text `git status` prints, for frontends that show it verbatim"""
+    branch = status['branch']
+    lines = ['HEAD detached' if branch in (None, '(detached)') else f"On branch {branch}"]
+    upstream = status['upstream']
+    if upstream:
+        ahead, behind = status['ahead'], status['behind']
+        if ahead and behind:
+            lines += [f"Your branch and '{upstream}' have diverged,",
+                      f"and have {ahead} and {behind} different commits each, respectively."]
+        elif ahead:
+            lines.append(f"Your branch is ahead of '{upstream}' by {_plural(ahead, 'commit')}.")
+        elif behind:
+            lines.append(f"Your branch is behind '{upstream}' by {_plural(behind, 'commit')}.")
+        else:
+            lines.append(f"Your branch is up to date with '{upstream}'.")
+    lines.append('')
+
+    if status['conflicts']:
+        lines += _status_lines('Unmerged paths:', status['conflicts'])
+    if status['staged']:
+        lines += _status_lines('Changes to be committed:', status['staged'])
+    if status['unstaged']:
+        lines += _status_lines('Changes not staged for commit:', status['unstaged'])
+    if status['untracked']:
+        lines += _status_lines('Untracked files:', status['untracked'])
+
+    if status['staged']:
+        return '\n'.join(lines[:-1])
+    if status['unstaged']:
+        lines.append('no changes added to commit')
+    elif status['untracked']:
+        lines.append('nothing added to commit but untracked files present')
+    else:
+        lines.append('nothing to commit, working tree clean')
+    return '\n'.join(lines)
+
+
+def parse_remotes(output):
+    """Parse `git remote -v` into {'name', 'url'} dicts, one per remote, using its fetch URL"""
+    remotes = []
+    seen = set()
+    for line in output.split('\n'):
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] not in seen:
+            seen.add(parts[0])
+            remotes.append({'name': parts[0], 'url': parts[1]})
+    return remotes
+
+
+def parse_log(output):
+    """Parse `git log --pretty=format:LOG_FORMAT` into {'hash', 'author', 'timestamp', 'message'} dicts"""
+    commits = []
+    for line in output.split('\n'):
+        parts = line.split('\x1f')
+        if len(parts) == 4:
+            commits.append({
+                'hash': parts[0],
+                'author': parts[1],
+                'timestamp': int(parts[2]),
+                'message': parts[3]
+            })
+    return commits
+
+
+def _plural(count, unit):
+    return f"{count} {unit}" if count == 1 else f"{count} {unit}s"
+
+
+def relative_date(timestamp, now):
+    """Describe a commit time the way `git log --date=relative` does ("3 hours ago")
+
+    Computed here rather than by git so cached logs do not go stale as time passes.
+    """
+    diff = int(now) - int(timestamp)
+    if diff < 0:
+        return "in the future"
+    if diff < 90:
+        return f"{_plural(diff, 'second')} ago"
+    diff = (diff + 30) // 60
+    if diff < 90:
+        return f"{_plural(diff, 'minute')} ago"
+    diff = (diff + 30) // 60
+    if diff < 36:
+        return f"{_plural(diff, 'hour')} ago"
+    diff = (diff + 12) // 24
+    if diff < 14:
+        return f"{_plural(diff, 'day')} ago"
+    if diff < 70:
+        return f"{_plural((diff + 3) // 7, 'week')} ago"
+    if diff < 365:
+        return f"{_plural((diff + 15) // 30, 'month')} ago"
+    if diff < 1825:
+        total_months = (diff * 12 * 2 + 365) // (365 * 2)
+        years, months = divmod(total_months, 12)
+        if months:
+            return f"{_plural(years, 'year')}, {_plural(months, 'month')} ago"
+        return f"{_plural(years, 'year')} ago"
+    return f"{_plural((diff + 183) // 365, 'year')} ago"
+
+
+def parse_branches(output):
+    """Parse `git branch --all` into {'branches': [...], 'current': name or None, 'worktrees': [...]}
+
+    Branches checked out in another worktree are marked "+ " by git; they are
+    listed under their plain name and also named in 'worktrees'.
+    """
+    branches = []
+    seen = set()
+    current = None
+    in_worktree = []
+    for line in output.split('\n'):
+        if not line.strip():
+            continue
+        marker = line[:2]
+        name = line[2:].strip() if marker in ('* ', '+ ') else line.strip()
+        if marker == '* ':
+            current = name
+        elif marker == '+ ':
+            in_worktree.append(name)
+        if name and name not in seen:
+            seen.add(name)
+            branches.append(name)
+    return {'branches': branches, 'current': current, 'worktrees': in_worktree}
@@ -0,0 +1,331 @@
+import itertools
+import logging
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Deadline in seconds per git subcommand; anything not listed uses 'default'
+OPERATION_TIMEOUTS = {
+    'default': 60,
+    'push': 300,
+    'pull': 300,
+    'fetch': 300,
+    'clone': 3600,
+    'gc': 1800,
+    'maintenance': 1800,
+    'blame': 300,
+}
+
+# Seconds between SIGTERM and SIGKILL, and after SIGKILL before a process counts as leaked
+KILL_GRACE_SECONDS = 3
+
+# How often the watchdog checks deadlines
+WATCHDOG_INTERVAL = 0.5
+
+# Never let git stop and wait for a credential prompt nobody can answer
+GIT_ENV = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+
+
+class OperationAborted(RuntimeError):
+    """A git operation was stopped before it finished"""
+
+
+class OperationTimeout(OperationAborted):
+    pass
+
+
+class OperationCancelled(OperationAborted):
+    pass
+
+
+class GitOperation:
+    """A running git process, its deadline and who can cancel it"""
+
+    def __init__(self, operation_id, name, args, cwd, timeout):
+        self.operation_id = operation_id
+        self.name = name
+        self.args = args
+        self.cwd = cwd
+        self.timeout = timeout
+        self.started = time.time()
+        self.deadline = self.started + timeout if timeout else None
+        self.state = 'running'
+        self.process = None
+        self.term_sent = None
+        self.kill_sent = None
+
+    def describe(self):
+        now = time.time()
+        return {
+            'id': self.operation_id,
+            'name': self.name,
+            'args': self.args,
+            'cwd': self.cwd,
+            'pid': self.process.pid if self.process else None,
+            'state': self.state,
+            'age': round(now - self.started, 3),
+            'timeout': self.timeout,
+            'overdue': bool(self.deadline and now > self.deadline)
+        }
+
+
+_operations = {}
+_operations_lock = threading.Lock()
+_leaked = []
+# Stopped operations whose process group has not gone away yet
+_dying = []
+_sequence = itertools.count(1)
+_watchdog = None
+_context = threading.local()
+
+metrics = {
+    'started': 0,
+    'completed': 0,
+    'failed': 0,
+    'timed_out': 0,
+    'cancelled': 0,
+    'killed': 0,
+}
+
+
+def set_request_operation_id(operation_id=None):
+    """Tag every git process started by this thread with an id a client can cancel"""
+    _context.operation_id = operation_id or uuid.uuid4().hex
+    return _context.operation_id
+
+
+def get_request_operation_id():
+    return getattr(_context, 'operation_id', None)
+
+
+def _subcommand(args):
+    """First argument after `git` and its global options, e.g. 'push'"""
+    skip = False
+    for arg in args[1:]:
+        if skip:
+            skip = False
+            continue
+        if arg in ('-C', '-c', '--git-dir', '--work-tree'):
+            skip = True
+            continue
+        if not arg.startswith('-'):
+            return arg
+    return 'git'
+
+
+def _signal_group(process, sig):
+    """Signal the git process and everything it started (ssh, credential helpers, hooks)"""
+    try:
+        if os.name == 'nt':
+            if sig == signal.SIGTERM:
+                process.terminate()
+            else:
+                subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def _group_alive(process):
+    if os.name == 'nt':
+        return process.poll() is None
+    try:
+        os.killpg(process.pid, 0)
+        return True
+    except (ProcessLookupError, PermissionError, OSError):
+        return False
+
+
+def _abort(operation, state):
+    if operation.state != 'running':
+        return
+    _terminate(operation, state)
+
+
+def _terminate(operation, state):
+    operation.state = state
+    operation.term_sent = time.time()
+    with _operations_lock:
+        metrics['killed'] += 1
+    logger.warning(f"Stopping git operation {operation.operation_id} ({operation.name}): {state}")
+    _signal_group(operation.process, signal.SIGTERM)
+
+
+def _watch():
+    while True:
+        time.sleep(WATCHDOG_INTERVAL)
+        now = time.time()
+        with _operations_lock:
+            operations = [op for ops in _operations.values() for op in ops] + list(_dying)
+        for operation in operations:
+            if operation.process is None:
+                continue
+            if operation.state == 'running' and operation.deadline and now > operation.deadline:
+                _abort(operation, 'timed_out')
+            elif operation.term_sent and not operation.kill_sent and now - operation.term_sent > KILL_GRACE_SECONDS:
+                if _group_alive(operation.process):
+                    operation.kill_sent = now
+                    _signal_group(operation.process, signal.SIGKILL)
+            elif operation.kill_sent and now - operation.kill_sent > KILL_GRACE_SECONDS:
+                if _group_alive(operation.process) and operation not in _leaked:
+                    logger.error(f"Git operation {operation.operation_id} survived SIGKILL (pid {operation.process.pid})")
+                    _leaked.append(operation)
+            if operation in _dying and not _group_alive(operation.process):
+                with _operations_lock:
+                    _dying.remove(operation)
+
+
+def _ensure_watchdog():
+    global _watchdog
+    if _watchdog is None:
+        with _operations_lock:
+            if _watchdog is None:
+                _watchdog = threading.Thread(target=_watch, name='git-watchdog', daemon=True)
+                _watchdog.start()
+
+
+def start_git(args, cwd=None, timeout=None, operation_id=None, wrapper=None, **popen_kwargs):
+    """Start a git command in its own process group under a deadline
+
+    `args` are the arguments after `git`; `wrapper` is an optional command
+    prefix such as ['ionice', '-c', '3']. The returned operation's `process` is
+    a normal Popen; call finish() when done with it, or stop() to abandon it.
+    """
+    _ensure_watchdog()
+    args = ['git'] + list(args)
+    name = _subcommand(args)
+    if timeout is None:
+        timeout = OPERATION_TIMEOUTS.get(name, OPERATION_TIMEOUTS['default'])
+    operation_id = operation_id or get_request_operation_id() or f'op-{next(_sequence)}'
+
+    popen_kwargs.setdefault('stdout', subprocess.PIPE)
+    popen_kwargs.setdefault('stderr', subprocess.PIPE)
+    popen_kwargs.setdefault('stdin', subprocess.DEVNULL)
+    popen_kwargs.setdefault('env', GIT_ENV)
+    if os.name == 'nt':
+        popen_kwargs['creationflags'] = popen_kwargs.get('creationflags', 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        popen_kwargs['start_new_session'] = True
+
+    operation = GitOperation(operation_id, name, args, cwd, timeout)
+    # Registered before git starts so a cancel can find it; until the process
+    # exists a cancel only marks it, and it is stopped as soon as it starts
+    operation.state = 'starting'
+    with _operations_lock:
+        _operations.setdefault(operation_id, []).append(operation)
+        metrics['started'] += 1
+    try:
+        process = subprocess.Popen((wrapper or []) + args, cwd=cwd, **popen_kwargs)
+    except Exception:
+        with _operations_lock:
+            if operation.state == 'starting':
+                operation.state = 'running'
+        finish(operation)
+        raise
+    with _operations_lock:
+        operation.process = process
+        cancelled = operation.state == 'cancelled'
+        if not cancelled:
+            operation.state = 'running'
+    if cancelled:
+        _terminate(operation, 'cancelled')
+    return operation
+
+
+def finish(operation):
+    """Unregister an operation and raise if it was timed out or cancelled"""
+    process = operation.process
+    if process is not None and process.poll() is None and operation.state != 'running':
+        process.wait()
+
+    with _operations_lock:
+        ops = _operations.get(operation.operation_id, [])
+        if operation in ops:
+            ops.remove(operation)
+        if not ops:
+            _operations.pop(operation.operation_id, None)
+
+        if operation.state == 'running':
+            operation.state = 'completed' if process is not None and process.returncode == 0 else 'failed'
+            metrics[operation.state] += 1
+            return
+        metrics[operation.state] += 1
+        if process is not None:
+            # Keep watching until helpers in its process group are gone too
+            _dying.append(operation)
+
+    if operation.state == 'timed_out':
+        raise OperationTimeout(f"git {operation.name} timed out after {operation.timeout}s")
+    raise OperationCancelled(f"git {operation.name} was cancelled")
+
+
+def stop(operation):
+    """Abandon an operation (e.g. the client went away), killing it if still running"""
+    if operation.process is not None and operation.process.poll() is None:
+        _abort(operation, 'cancelled')
+    try:
+        finish(operation)
+    except OperationAborted:
+        pass
+
+
+def run_git(args, cwd=None, timeout=None, input=None, **popen_kwargs):
+    """Run a git command to completion and return a subprocess.CompletedProcess
+
+    stdout and stderr are bytes. Raises OperationTimeout or OperationCancelled
+    if the watchdog or a cancel request had to stop the command.
+    """
+    if input is not None:
+        popen_kwargs['stdin'] = subprocess.PIPE
+    operation = start_git(args, cwd=cwd, timeout=timeout, **popen_kwargs)
+    try:
+        stdout, stderr = operation.process.communicate(input)
+    finally:
+        finish(operation)
+    return subprocess.CompletedProcess(operation.args, operation.process.returncode, stdout, stderr)
+
+
+def cancel(operation_id):
+    """Stop every git process started under an operation id; returns how many were running"""
+    with _operations_lock:
+        operations = list(_operations.get(operation_id, []))
+        for operation in operations:
+            # Not started yet: start_git stops it the moment its process exists
+            if operation.state == 'starting':
+                operation.state = 'cancelled'
+    for operation in operations:
+        if operation.process is not None:
+            _abort(operation, 'cancelled')
+    return len(operations)
+
+
+def list_operations():
+    with _operations_lock:
+        return [op.describe() for ops in _operations.values() for op in ops]
+
+
+def get_metrics():
+    """Counters plus anything that looks leaked: overdue or unkillable processes, extra threads"""
+    operations = list_operations()
+    threads = {}
+    for thread in threading.enumerate():
+        # "Thread-5 (process_request_thread)" -> "Thread", "bulk-fetch_2" -> "bulk-fetch"
+        prefix = re.sub(r'[-_][\d_]+(\s*\(.*\))?$', '', thread.name)
+        threads[prefix] = threads.get(prefix, 0) + 1
+    return {
+        **metrics,
+        'active': len(operations),
+        'overdue': [op for op in operations if op['overdue']],
+        'stopping': len(_dying),
+        'leaked_processes': [op.describe() for op in _leaked if _group_alive(op.process)],
+        'threads': threading.active_count(),
+        'threads_by_name': threads
+    }
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lazygit_core import process
+from lazygit_core.gitdir import find_git_dir, repo_fingerprint
+from lazygit_core.models import (LOG_FORMAT, STATUS_ARGS, parse_branches, parse_log, parse_remotes,
+                                 parse_status, relative_date)
+
+# Parsed results kept across all repositories
+RESULT_CACHE_SIZE = 64
+
+
+class GitError(RuntimeError):
+    """git exited with an error; the message is what it printed on stderr"""
+
+
+class ResultCache:
+    """LRU of parsed results, each stored with the repository fingerprint it was computed for
+
+    A lookup with a different fingerprint is a miss, so entries never need to
+    be invalidated explicitly; stale ones simply age out.
+    """
+
+    def __init__(self, size=RESULT_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, fingerprint, value):
+        with self.lock:
+            self.entries[key] = (fingerprint, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'size': self.size, 'hits': self.hits, 'misses': self.misses}
+
+
+_results = ResultCache()
+
+
+def cache_stats():
+    return _results.stats()
+
+
+class Repository:
+    """A git work tree and cached, parsed views of it
+
+    Every command goes through lazygit_core.process, so both frontends get the
+    same deadlines, process-group cleanup, cancellation and metrics. Results
+    that only depend on refs (log, branches) or config (remotes) are cached
+    against a stat-only fingerprint of the git directory and recomputed once
+    it moves.
+
+    Cached results are shared between callers; treat them as read-only.
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = os.path.abspath(path)
+        self.cache = cache or _results
+
+    def is_repository(self):
+        return find_git_dir(self.path) is not None
+
+    def git(self, *args, timeout=None, check=True):
+        """Run `git <args>` in the work tree and return its decoded stdout"""
+        result = process.run_git(list(args), cwd=self.path, timeout=timeout)
+        if check and result.returncode != 0:
+            raise GitError(result.stderr.decode('utf-8', errors='replace').strip()
+                           or f"git {args[0] if args else ''} exited with {result.returncode}")
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def fingerprint(self, index=False, refs=False, config=False):
+        return repo_fingerprint(self.path, index=index, refs=refs, config=config)
+
+    def _cached(self, key, fingerprint, compute):
+        if fingerprint is None:
+            return compute()
+        key = (self.path,) + key
+        value = self.cache.get(key, fingerprint)
+        if value is None:
+            value = compute()
+            self.cache.put(key, fingerprint, value)
+        return value
+
+    def status(self, untracked='all', worktree_token=None):
+        """Parsed status (see models.parse_status)
+
+        Edits to work tree files do not touch the git directory, so status is
+        only cached when the caller passes a token that changes with them, such
+        as a file watcher's event sequence number.
+        """
+        fingerprint = None
+        if worktree_token is not None:
+            state = self.fingerprint(index=True, refs=True)
+            fingerprint = state and f'{state}|{worktree_token}'
+        return self._cached(('status', untracked), fingerprint,
+                            lambda: parse_status(self.git(*STATUS_ARGS, f'--untracked-files={untracked}')))
+
+    def log(self, limit=20, now=None):
+        """The last `limit` commits from HEAD, newest first, with git-style relative dates"""
+        commits = self._cached(('log', limit), self.fingerprint(refs=True), lambda: parse_log(
+            # A repository without commits makes git log fail; that is just an empty history
+            self.git('log', f'--pretty=format:{LOG_FORMAT}', '-n', str(limit), check=False)))
+        now = time.time() if now is None else now
+        return [dict(commit, date=relative_date(commit['timestamp'], now)) for commit in commits]
+
+    def branches(self):
+        """Local and remote-tracking branches plus the current one (see models.parse_branches)"""
+        return self._cached(('branches',), self.fingerprint(refs=True),
+                            lambda: parse_branches(self.git('branch', '--all')))
+
+    def remotes(self):
+        """Configured remotes as {'name', 'url'} dicts (see models.parse_remotes)"""
+        return self._cached(('remotes',), self.fingerprint(config=True),
+                            lambda: parse_remotes(self.git('remote', '-v')))
@@ -0,0 +1,5 @@
+"""Tests for the shared backend; they need git but no GUI or web server
+
+    python -m pytest lazygit_core/tests
+    python -m unittest discover -s lazygit_core/tests -t .
+"""
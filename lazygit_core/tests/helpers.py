@@ -0,0 +1,40 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+GIT_IDENTITY = ['-c', 'user.name=Test', '-c', 'user.email=test@example.com', '-c', 'init.defaultBranch=master',
+                '-c', 'commit.gpgsign=false']
+
+
+class GitRepoTestCase(unittest.TestCase):
+    """A fresh, empty repository in a temporary directory for every test"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='lazygit-core-test-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.git('init', '-q')
+
+    def git(self, *args, env=None, check=True):
+        """Run git in the test repository and return its stdout"""
+        result = subprocess.run(['git', '-C', self.directory] + GIT_IDENTITY + list(args),
+                                env=dict(os.environ, **(env or {})), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        if check and result.returncode != 0:
+            raise AssertionError(f"git {' '.join(args)} failed: {result.stderr.decode('utf-8', errors='replace')}")
+        return result.stdout.decode('utf-8', errors='replace')
+
+    def write(self, path, content):
+        full_path = os.path.join(self.directory, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def commit(self, message, timestamp=None):
+        env = None
+        if timestamp is not None:
+            date = f'@{timestamp} +0000'
+            env = {'GIT_AUTHOR_DATE': date, 'GIT_COMMITTER_DATE': date}
+        self.git('commit', '-q', '--allow-empty', '-m', message, env=env)
+        return self.git('rev-parse', 'HEAD').strip()
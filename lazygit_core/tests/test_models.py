@@ -0,0 +1,211 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from lazygit_core.models import (LOG_FORMAT, STATUS_ARGS, format_status, parse_branches, parse_log, parse_remotes,
+                                 parse_status, relative_date, summarize_status)
+from lazygit_core.tests.helpers import GitRepoTestCase
+
+HASH = '0' * 40
+
+
+class ParseStatusTest(unittest.TestCase):
+    def test_branch_headers(self):
+        status = parse_status('# branch.oid ' + HASH + '\0# branch.head main\0'
+                              '# branch.upstream origin/main\0# branch.ab +2 -3\0')
+        self.assertEqual(status['branch'], 'main')
+        self.assertEqual(status['upstream'], 'origin/main')
+        self.assertEqual((status['ahead'], status['behind']), (2, 3))
+
+    def test_ordinary_entry_with_spaces_in_path(self):
+        entry = f'1 MM N... 100644 100644 100644 {HASH} {HASH} docs/read me.txt\0'
+        status = parse_status(entry)
+        self.assertEqual(status['staged'], [{'path': 'docs/read me.txt', 'change': 'modified'}])
+        self.assertEqual(status['unstaged'], [{'path': 'docs/read me.txt', 'change': 'modified'}])
+
+    def test_rename_consumes_original_path(self):
+        entry = f'2 R. N... 100644 100644 100644 {HASH} {HASH} R100 new name.txt\0old name.txt\0? after.txt\0'
+        status = parse_status(entry)
+        self.assertEqual(status['staged'],
+                         [{'path': 'new name.txt', 'change': 'renamed', 'original': 'old name.txt'}])
+        self.assertEqual(status['unstaged'], [])
+        # The original path is not mistaken for an entry of its own
+        self.assertEqual(status['untracked'], [{'path': 'after.txt', 'change': 'untracked'}])
+
+    def test_unmerged_entry(self):
+        entry = f'u UU N... 100644 100644 100644 100644 {HASH} {HASH} {HASH} both changed.txt\0'
+        status = parse_status(entry)
+        self.assertEqual(status['conflicts'], [{'path': 'both changed.txt', 'change': 'conflict'}])
+        self.assertEqual(status['staged'] + status['unstaged'], [])
+
+    def test_summarize(self):
+        status = parse_status(f'1 A. N... 000000 100644 100644 {HASH} {HASH} a\0? b\0')
+        summary = summarize_status(status)
+        self.assertEqual((summary['staged'], summary['untracked'], summary['clean']), (1, 1, False))
+        self.assertTrue(summarize_status(parse_status(''))['clean'])
+
+
+class ParseStatusFromGitTest(GitRepoTestCase):
+    def status(self):
+        return parse_status(self.git(*STATUS_ARGS, '--untracked-files=all'))
+
+    def test_rename_modify_and_untracked(self):
+        self.write('old name.txt', 'one\ntwo\nthree\n')
+        self.write('both.txt', 'a\n')
+        self.git('add', '.')
+        self.commit('initial')
+
+        self.git('mv', 'old name.txt', 'new name.txt')
+        self.write('both.txt', 'b\n')
+        self.git('add', 'both.txt')
+        self.write('both.txt', 'c\n')
+        self.write('dir with space/untracked file.txt', 'x')
+
+        status = self.status()
+        self.assertEqual(status['branch'], 'master')
+        self.assertIn({'path': 'new name.txt', 'change': 'renamed', 'original': 'old name.txt'}, status['staged'])
+        self.assertIn({'path': 'both.txt', 'change': 'modified'}, status['staged'])
+        self.assertEqual(status['unstaged'], [{'path': 'both.txt', 'change': 'modified'}])
+        self.assertEqual(status['untracked'], [{'path': 'dir with space/untracked file.txt', 'change': 'untracked'}])
+
+    def test_merge_conflict(self):
+        self.write('shared file.txt', 'base\n')
+        self.git('add', '.')
+        self.commit('base')
+        self.git('checkout', '-q', '-b', 'other')
+        self.write('shared file.txt', 'other\n')
+        self.git('commit', '-q', '-am', 'other')
+        self.git('checkout', '-q', 'master')
+        self.write('shared file.txt', 'master\n')
+        self.git('commit', '-q', '-am', 'master')
+        self.git('merge', '-q', 'other', check=False)
+
+        status = self.status()
+        self.assertEqual(status['conflicts'], [{'path': 'shared file.txt', 'change': 'conflict'}])
+        self.assertEqual(status['staged'] + status['unstaged'], [])
+
+
+class FormatStatusTest(unittest.TestCase):
+    def test_clean(self):
+        status = parse_status('# branch.oid ' + HASH + '\0# branch.head main\0'
+                              '# branch.upstream origin/main\0# branch.ab +0 -0\0')
+        self.assertEqual(format_status(status), "On branch main\n"
+                                                "Your branch is up to date with 'origin/main'.\n\n"
+                                                "nothing to commit, working tree clean")
+
+    def test_sections_use_git_wording(self):
+        status = parse_status('# branch.head main\0# branch.upstream origin/main\0# branch.ab +2 -0\0'
+                              f'1 A. N... 000000 100644 100644 {HASH} {HASH} added.txt\0'
+                              f'2 R. N... 100644 100644 100644 {HASH} {HASH} R100 new.txt\0old.txt\0'
+                              f'1 .M N... 100644 100644 100644 {HASH} {HASH} changed.txt\0'
+                              '? notes.txt\0')
+        self.assertEqual(format_status(status).split('\n'), [
+            'On branch main',
+            "Your branch is ahead of 'origin/main' by 2 commits.",
+            '',
+            'Changes to be committed:',
+            '\tnew file:   added.txt',
+            '\trenamed:    old.txt -> new.txt',
+            '',
+            'Changes not staged for commit:',
+            '\tmodified:   changed.txt',
+            '',
+            'Untracked files:',
+            '\tnotes.txt',
+        ])
+
+    def test_diverged_and_unstaged_only(self):
+        status = parse_status('# branch.head main\0# branch.upstream origin/main\0# branch.ab +1 -3\0'
+                              f'1 .D N... 100644 100644 000000 {HASH} {HASH} gone.txt\0')
+        lines = format_status(status).split('\n')
+        self.assertEqual(lines[1:3], ["Your branch and 'origin/main' have diverged,",
+                                      'and have 1 and 3 different commits each, respectively.'])
+        self.assertIn('\tdeleted:    gone.txt', lines)
+        self.assertEqual(lines[-1], 'no changes added to commit')
+
+    def test_detached(self):
+        self.assertTrue(format_status(parse_status('# branch.head (detached)\0')).startswith('HEAD detached\n'))
+
+
+class ParseRemotesTest(unittest.TestCase):
+    def test_one_entry_per_remote(self):
+        output = ('origin\thttps://example.com/a.git (fetch)\n'
+                  'origin\tgit@example.com:a.git (push)\n'
+                  'upstream\t/srv/git/a.git (fetch)\n'
+                  'upstream\t/srv/git/a.git (push)\n')
+        self.assertEqual(parse_remotes(output), [{'name': 'origin', 'url': 'https://example.com/a.git'},
+                                                 {'name': 'upstream', 'url': '/srv/git/a.git'}])
+
+    def test_no_remotes(self):
+        self.assertEqual(parse_remotes(''), [])
+
+
+class ParseLogTest(GitRepoTestCase):
+    def test_fields_survive_separators_in_subject(self):
+        self.commit('first', timestamp=1600000000)
+        self.commit('second | with a pipe', timestamp=1600000060)
+        commits = parse_log(self.git('log', f'--pretty=format:{LOG_FORMAT}'))
+        self.assertEqual([commit['message'] for commit in commits], ['second | with a pipe', 'first'])
+        self.assertEqual([commit['timestamp'] for commit in commits], [1600000060, 1600000000])
+        self.assertEqual(commits[0]['author'], 'Test')
+        self.assertTrue(self.git('rev-parse', 'HEAD').startswith(commits[0]['hash']))
+
+    def test_empty_output(self):
+        self.assertEqual(parse_log(''), [])
+
+
+class RelativeDateTest(GitRepoTestCase):
+    COMMIT_TIME = 1500000000
+
+    # Seconds after the commit, chosen around every unit boundary git uses
+    OFFSETS = [0, 1, 89, 90, 91, 150, 5369, 5370, 5400, 3600 * 35, 3600 * 36, 86400 * 2, 86400 * 13,
+               86400 * 14, 86400 * 69, 86400 * 70, 86400 * 300, 86400 * 364, 86400 * 365, 86400 * 400,
+               86400 * 730, 86400 * 1000, 86400 * 1824, 86400 * 1825, 86400 * 4000]
+
+    def test_matches_git(self):
+        self.commit('dated', timestamp=self.COMMIT_TIME)
+        for offset in self.OFFSETS:
+            now = self.COMMIT_TIME + offset
+            expected = self.git('log', '-1', '--format=%ad', '--date=relative',
+                                env={'GIT_TEST_DATE_NOW': str(now)}).strip()
+            with self.subTest(offset=offset):
+                self.assertEqual(relative_date(self.COMMIT_TIME, now), expected)
+
+    def test_future(self):
+        self.assertEqual(relative_date(100, 50), 'in the future')
+
+
+class ParseBranchesTest(unittest.TestCase):
+    def test_markers(self):
+        output = ('* main\n'
+                  '+ feature\n'
+                  '  topic\n'
+                  '  remotes/origin/HEAD -> origin/main\n'
+                  '  remotes/origin/main\n')
+        branches = parse_branches(output)
+        self.assertEqual(branches['current'], 'main')
+        self.assertEqual(branches['worktrees'], ['feature'])
+        self.assertEqual(branches['branches'][:3], ['main', 'feature', 'topic'])
+        self.assertIn('remotes/origin/main', branches['branches'])
+
+    def test_no_branches(self):
+        self.assertEqual(parse_branches(''), {'branches': [], 'current': None, 'worktrees': []})
+
+
+class ParseBranchesFromGitTest(GitRepoTestCase):
+    def test_linked_worktree(self):
+        self.commit('initial')
+        self.git('branch', 'feature')
+        parent = tempfile.mkdtemp(prefix='lazygit-core-worktree-')
+        self.addCleanup(shutil.rmtree, parent, ignore_errors=True)
+        self.git('worktree', 'add', '-q', os.path.join(parent, 'feature'), 'feature')
+
+        branches = parse_branches(self.git('branch', '--all'))
+        self.assertEqual(branches['branches'], ['feature', 'master'])
+        self.assertEqual(branches['current'], 'master')
+        self.assertEqual(branches['worktrees'], ['feature'])
+
+
+if __name__ == '__main__':
+    unittest.main()
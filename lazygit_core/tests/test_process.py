@@ -0,0 +1,49 @@
+import subprocess
+import unittest
+from unittest import mock
+
+from lazygit_core import process
+
+
+class CancelTest(unittest.TestCase):
+    def test_cancel_before_git_starts_stops_it(self):
+        popen = subprocess.Popen
+
+        def cancel_then_start(*args, **kwargs):
+            # The cancel lands after the operation is registered but before its process exists
+            self.assertEqual(process.cancel('cancel-before-start'), 1)
+            return popen(*args, **kwargs)
+
+        with mock.patch.object(process.subprocess, 'Popen', cancel_then_start):
+            operation = process.start_git(['cat-file', '--batch'], operation_id='cancel-before-start',
+                                          timeout=60, stdin=subprocess.PIPE)
+        try:
+            # Left alone, cat-file --batch would wait for input until the deadline
+            operation.process.wait(10)
+        finally:
+            operation.process.stdin.close()
+        self.assertEqual(operation.state, 'cancelled')
+        with self.assertRaises(process.OperationCancelled):
+            process.finish(operation)
+        self.assertEqual(process.list_operations(), [])
+
+    def test_cancel_running(self):
+        operation = process.start_git(['cat-file', '--batch'], operation_id='cancel-running', timeout=60,
+                                      stdin=subprocess.PIPE)
+        self.assertEqual(operation.state, 'running')
+        self.assertEqual(process.cancel('cancel-running'), 1)
+        try:
+            operation.process.wait(10)
+        finally:
+            operation.process.stdin.close()
+        with self.assertRaises(process.OperationCancelled):
+            process.finish(operation)
+
+    def test_completed(self):
+        result = process.run_git(['--version'])
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(result.stdout.startswith(b'git version'))
+
+
+if __name__ == '__main__':
+    unittest.main()
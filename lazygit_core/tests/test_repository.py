@@ -0,0 +1,149 @@
+import os
+import time
+import unittest
+
+from lazygit_core.models import format_status
+from lazygit_core.repository import GitError, Repository, ResultCache
+from lazygit_core.tests.helpers import GitRepoTestCase
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_fingerprint_mismatch_is_a_miss(self):
+        cache = ResultCache(size=4)
+        cache.put('key', 'a', 1)
+        self.assertEqual(cache.get('key', 'a'), 1)
+        self.assertIsNone(cache.get('key', 'b'))
+        self.assertEqual(cache.stats(), {'entries': 1, 'size': 4, 'hits': 1, 'misses': 1})
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResultCache(size=2)
+        cache.put('a', 'f', 1)
+        cache.put('b', 'f', 2)
+        cache.get('a', 'f')
+        cache.put('c', 'f', 3)
+        self.assertIsNone(cache.get('b', 'f'))
+        self.assertEqual((cache.get('a', 'f'), cache.get('c', 'f')), (1, 3))
+
+    def test_clear(self):
+        cache = ResultCache()
+        cache.put('a', 'f', 1)
+        cache.clear()
+        self.assertIsNone(cache.get('a', 'f'))
+
+
+class RepositoryTest(GitRepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ResultCache()
+        self.repo = Repository(self.directory, cache=self.cache)
+
+    def test_is_repository(self):
+        self.assertTrue(self.repo.is_repository())
+        self.assertFalse(Repository(os.path.dirname(self.directory)).is_repository())
+
+    def test_empty_repository_has_empty_log(self):
+        self.assertEqual(self.repo.log(), [])
+
+    def test_log_is_cached_until_a_ref_moves(self):
+        self.commit('first', timestamp=1600000000)
+        first = self.repo.log(10, now=1600000060)
+        self.assertEqual([commit['message'] for commit in first], ['first'])
+        self.assertEqual(first[0]['date'], '60 seconds ago')
+
+        hits = self.cache.stats()['hits']
+        self.assertEqual(self.repo.log(10, now=1600000060), first)
+        self.assertEqual(self.cache.stats()['hits'], hits + 1)
+
+        self.commit('second', timestamp=1600000030)
+        self.assertEqual([commit['message'] for commit in self.repo.log(10)], ['second', 'first'])
+
+    def test_relative_dates_are_not_cached(self):
+        self.commit('first', timestamp=1600000000)
+        self.assertEqual(self.repo.log(now=1600000010)[0]['date'], '10 seconds ago')
+        self.assertEqual(self.repo.log(now=1600007200)[0]['date'], '2 hours ago')
+
+    def test_branches_follow_new_and_deleted_branches(self):
+        self.commit('initial')
+        self.assertEqual(self.repo.branches()['branches'], ['master'])
+        self.git('branch', 'topic')
+        self.assertEqual(self.repo.branches()['branches'], ['master', 'topic'])
+        self.git('branch', '-D', 'topic')
+        self.assertEqual(self.repo.branches()['branches'], ['master'])
+
+    def test_branches_follow_packed_refs(self):
+        self.commit('initial')
+        self.git('branch', 'topic')
+        self.assertIn('topic', self.repo.branches()['branches'])
+        # Packing moves the ref into packed-refs and removes the loose file
+        self.git('pack-refs', '--all')
+        self.git('update-ref', '-d', 'refs/heads/topic')
+        self.assertEqual(self.repo.branches()['branches'], ['master'])
+
+    def test_checkout_changes_current_branch(self):
+        self.commit('initial')
+        self.git('branch', 'topic')
+        self.assertEqual(self.repo.branches()['current'], 'master')
+        self.git('checkout', '-q', 'topic')
+        self.assertEqual(self.repo.branches()['current'], 'topic')
+
+    def test_status_is_only_cached_with_a_worktree_token(self):
+        self.commit('initial')
+        self.assertEqual(self.repo.status()['untracked'], [])
+        self.write('new.txt', 'x')
+        # Without a token every call runs git
+        self.assertEqual(len(self.repo.status()['untracked']), 1)
+
+        first = self.repo.status(worktree_token=1)
+        self.write('other.txt', 'x')
+        # Same token: the watcher saw no change, so the cached result is served
+        self.assertIs(self.repo.status(worktree_token=1), first)
+        self.assertEqual(len(self.repo.status(worktree_token=2)['untracked']), 2)
+
+    def test_status_token_result_moves_with_the_index(self):
+        self.commit('initial')
+        self.write('new.txt', 'x')
+        before = self.repo.status(worktree_token=1)
+        # Make sure the index is rewritten with a different mtime
+        time.sleep(0.01)
+        self.git('add', 'new.txt')
+        after = self.repo.status(worktree_token=1)
+        self.assertIsNot(after, before)
+        self.assertEqual(after['staged'], [{'path': 'new.txt', 'change': 'added'}])
+
+    def test_status_text_for_a_repository(self):
+        self.commit('initial')
+        self.write('new.txt', 'x')
+        self.git('add', 'new.txt')
+        text = format_status(self.repo.status())
+        self.assertTrue(text.startswith('On branch master\n'))
+        self.assertIn('Changes to be committed:\n\tnew file:   new.txt', text)
+
+    def test_remotes_follow_the_config(self):
+        self.assertEqual(self.repo.remotes(), [])
+        self.git('remote', 'add', 'origin', 'https://example.com/project.git')
+        self.assertEqual(self.repo.remotes(), [{'name': 'origin', 'url': 'https://example.com/project.git'}])
+
+        hits = self.cache.stats()['hits']
+        self.assertEqual(self.repo.remotes(), [{'name': 'origin', 'url': 'https://example.com/project.git'}])
+        self.assertEqual(self.cache.stats()['hits'], hits + 1)
+
+        # Make sure the config is rewritten with a different mtime
+        time.sleep(0.01)
+        self.git('remote', 'set-url', 'origin', '/srv/git/project.git')
+        self.assertEqual(self.repo.remotes(), [{'name': 'origin', 'url': '/srv/git/project.git'}])
+
+    def test_git_error(self):
+        with self.assertRaises(GitError):
+            self.repo.git('rev-parse', '--verify', 'no-such-ref')
+
+    def test_fingerprint(self):
+        self.commit('initial')
+        before = self.repo.fingerprint(refs=True)
+        self.assertEqual(self.repo.fingerprint(refs=True), before)
+        self.git('branch', 'topic')
+        self.assertNotEqual(self.repo.fingerprint(refs=True), before)
+        self.assertIsNone(Repository(os.path.dirname(self.directory)).fingerprint(refs=True))
+
+
+if __name__ == '__main__':
+    unittest.main()